@@ -0,0 +1,239 @@
+# Built-in imports
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Third-party imports
+from starlette.responses import JSONResponse
+
+# Local imports
+from config.logging_info import setup_logger
+from config.metrics import ADMISSION_WAIT, ADMISSIONS
+from config.settings import config
+
+# Set up logger
+logger = setup_logger("admission")
+
+# Only API routes are limited; health, readiness, metrics and docs always answer
+LIMITED_PATH_PREFIX = "/api/"
+
+# Client buckets kept; the least recently seen client is forgotten first
+MAX_TRACKED_CLIENTS = 10000
+
+# Weight of the newest request in the average service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float):
+        """
+        Args:
+            rate_per_minute: Sustained requests per minute
+            burst_seconds: Seconds of the rate a full bucket holds
+        """
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """Return a token taken for a request that was rejected elsewhere"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware limiting request rate and concurrent work.
+
+    Every API request takes a token from its client's bucket (keyed by peer
+    address) and from a global bucket; without one it is rejected with 429.
+    Requests that generate reports (everything but GET) then need one of
+    API_MAX_IN_FLIGHT slots. A request that would wait longer than
+    API_QUEUE_TIMEOUT for a slot, estimated from the queue length and the
+    recent service time or measured while waiting, is shed with 503, so an
+    overloaded worker fails fast instead of slowing down for everyone.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self.client_rate = config.api_rate_limit
+        self.global_rate = config.api_global_rate_limit
+        self.burst_seconds = config.api_rate_limit_burst_seconds
+        self.max_in_flight = config.api_max_in_flight
+        self.queue_timeout = config.api_queue_timeout
+
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._global = (
+            TokenBucket(self.global_rate, self.burst_seconds)
+            if self.global_rate > 0
+            else None
+        )
+        self._slots = (
+            asyncio.Semaphore(self.max_in_flight) if self.max_in_flight > 0 else None
+        )
+        self._waiting = 0
+        self._service_time = 0.0
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(LIMITED_PATH_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        retry_after, reason = self._take_tokens(client)
+        if retry_after:
+            ADMISSIONS.inc(outcome=reason)
+            await self._reject(
+                429, "Rate limit exceeded", retry_after, scope, receive, send
+            )
+            return
+
+        if self._slots is None or scope["method"] == "GET":
+            ADMISSIONS.inc(outcome="admitted")
+            await self.app(scope, receive, send)
+            return
+
+        # Shed at once if the queue ahead is already longer than the budget
+        expected_wait = self._expected_wait()
+        if expected_wait > self.queue_timeout:
+            ADMISSIONS.inc(outcome="shed")
+            logger.warning(
+                f"Shedding request to {scope['path']}: "
+                f"expected queue wait {expected_wait:.1f}s"
+            )
+            await self._reject(
+                503, "Server overloaded", expected_wait, scope, receive, send
+            )
+            return
+
+        start = time.monotonic()
+        self._waiting += 1
+        try:
+            has_slot = await self._acquire_slot()
+        finally:
+            self._waiting -= 1
+        if not has_slot:
+            ADMISSIONS.inc(outcome="shed")
+            logger.warning(
+                f"Shedding request to {scope['path']}: "
+                f"no slot within {self.queue_timeout}s"
+            )
+            await self._reject(
+                503, "Server overloaded", self.queue_timeout, scope, receive, send
+            )
+            return
+
+        admitted = time.monotonic()
+        ADMISSION_WAIT.observe(admitted - start)
+        ADMISSIONS.inc(outcome="admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
+            elapsed = time.monotonic() - admitted
+            delta = elapsed - self._service_time
+            self._service_time += SERVICE_TIME_SMOOTHING * delta
+
+    def _take_tokens(self, client: str) -> Tuple[float, str]:
+        """
+        Take a token from the client's and the global bucket, or return the seconds
+        to wait and why
+        """
+        with self._lock:
+            bucket: Optional[TokenBucket] = None
+            if self.client_rate > 0:
+                bucket = self._clients.get(client)
+                if bucket is None:
+                    bucket = self._clients[client] = TokenBucket(
+                        self.client_rate, self.burst_seconds
+                    )
+                    if len(self._clients) > MAX_TRACKED_CLIENTS:
+                        self._clients.popitem(last=False)
+                else:
+                    self._clients.move_to_end(client)
+                wait = bucket.try_acquire()
+                if wait:
+                    return wait, "client_rate_limited"
+
+            if self._global is not None:
+                wait = self._global.try_acquire()
+                if wait:
+                    if bucket is not None:
+                        bucket.refund()
+                    return wait, "global_rate_limited"
+        return 0.0, "admitted"
+
+    async def _acquire_slot(self) -> bool:
+        """
+        Wait up to queue_timeout for a slot
+
+        The acquire runs as its own task, which asyncio.wait leaves alone on a
+        timeout: asyncio.wait_for before Python 3.12 could time out just after
+        the acquire succeeded and leak that slot. An abandoned acquire that
+        already took a slot releases it; one still waiting is cancelled, and
+        Semaphore.acquire hands on a slot it was woken for when cancelled.
+
+        Returns:
+            bool: Whether a slot was taken
+        """
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait({acquire}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(acquire)
+            raise
+        if acquire.done():
+            return True
+        self._abandon(acquire)
+        return False
+
+    def _abandon(self, acquire: "asyncio.Future[bool]") -> None:
+        """Give up on a slot acquire without leaking the slot"""
+        if acquire.done():
+            self._slots.release()
+        else:
+            acquire.cancel()
+
+    def _expected_wait(self) -> float:
+        """Estimated seconds a new request waits for a slot"""
+        if not self._slots.locked():
+            return 0.0
+        return (self._waiting + 1) * self._service_time / self.max_in_flight
+
+    async def _reject(
+        self,
+        status_code: int,
+        detail: str,
+        retry_after: float,
+        scope: Dict[str, Any],
+        receive: Any,
+        send: Any
+    ) -> None:
+        """Send an error response telling the client when to retry"""
+        response = JSONResponse(
+            status_code=status_code,
+            content={"detail": detail},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
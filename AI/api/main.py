@@ -1,13 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
+import asyncio
 import os
 import sys
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
+from contextlib import asynccontextmanager
 
-# Configure logging
+# Configure logging for environment setup; replaced by the queued pipeline below
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -50,16 +54,62 @@ def setup_environment():
 # Set up the environment before importing other modules
 setup_environment()
 
-# Import router after environment is set up
-from api.patient_report import router as patient_report_router
+# Imported only after setup_environment() has put the AI directory on sys.path and
+# loaded .env, which config.settings reads at import time; hence the E402 waivers
+from api.patient_report import (  # noqa: E402
+    get_report_service, router as patient_report_router, report_job_queue
+)
+from api.admission import AdmissionMiddleware  # noqa: E402
+from config.metrics import MetricsMiddleware, registry as metrics_registry  # noqa: E402
+from config.logging_info import (  # noqa: E402
+    configure_root_logger, setup_logger, shutdown_logging
+)
+from config.settings import config  # noqa: E402
+
+# Route all logging, including third-party libraries, through the non-blocking pipeline
+configure_root_logger()
+logger = setup_logger("api")
+
+async def warm_up(app: FastAPI):
+    """Build the report service and warm its connections, then mark the app ready"""
+    start_time = time.perf_counter()
+    try:
+        # Building the service imports LangChain/LangGraph and compiles the agent
+        service = await asyncio.to_thread(get_report_service)
+        await service.warm_up()
+        await asyncio.to_thread(lambda: config.langfuse_handler)
+    except Exception as e:
+        logger.error(f"Warm-up failed, service stays not ready: {str(e)}")
+        return
+    
+    app.state.warmup_seconds = round(time.perf_counter() - start_time, 3)
+    app.state.ready = True
+    logger.info(f"Warm-up finished in {app.state.warmup_seconds}s")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and warm-up on startup and stop them on shutdown"""
+    app.state.ready = False
+    warm_up_task = asyncio.create_task(warm_up(app))
+    await report_job_queue.start()
+    yield
+    warm_up_task.cancel()
+    await report_job_queue.stop()
+    await asyncio.to_thread(config.shutdown_langfuse)
+    shutdown_logging()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Medical Report API",
     description="API for generating medical reports and condition-specific meal plans",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+# Rate-limit API requests and shed load beyond API_MAX_IN_FLIGHT; inside CORS so
+# rejections carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 origins = os.getenv("CORS_ORIGINS", "*").split(",")
 app.add_middleware(
@@ -70,6 +120,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record request latency for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Register routers
 app.include_router(patient_report_router)
 
@@ -89,6 +142,20 @@ async def health_check():
         "api_key_configured": api_key_available
     }
 
+# Readiness endpoint: 503 until warm-up has finished
+@app.get("/ready")
+async def readiness_check():
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "warmup_seconds": app.state.warmup_seconds}
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
 # Run the application if executed directly (development only)
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
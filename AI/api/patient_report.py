@@ -1,13 +1,29 @@
 import os
 import json
+import logging
+import re
+import threading
 import time
 import traceback
-from typing import Dict, Any
-from fastapi import APIRouter, BackgroundTasks, Request
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from models.request_models import PatientReportRequest, PatientReportResponse
-from services.medical_report import MedicalReportService
-from config.logging_info import setup_logger
+from models.request_models import (
+    ApprovedPlanRequest,
+    ApprovedPlanResponse,
+    BatchReportItem,
+    BatchReportRequest,
+    BatchReportResponse,
+    PatientReportRequest,
+    PatientReportResponse,
+    ReportJobResponse,
+)
+from services.idempotency import (
+    IdempotencyKeyReused, IdempotencyStore, IdempotentRequests, request_fingerprint
+)
+from services.report_jobs import ReportJobQueue
+from config.logging_info import log_payload, setup_logger
 from config.settings import config
 
 # Set up logger using the centralized logging setup
@@ -22,11 +38,19 @@ router = APIRouter(
 
 # Cache for service instance to avoid creating it for every request
 _service_instance = None
+# Held while the service is built, so warm-up and an early request cannot both
+# build it
+_service_lock = threading.Lock()
 
 def get_report_service():
     """Get or create the medical report service instance"""
     global _service_instance
-    if _service_instance is None:
+    if _service_instance is not None:
+        return _service_instance
+    
+    with _service_lock:
+        if _service_instance is not None:
+            return _service_instance
         # Get API key from config
         api_key = config.openai_api_key
         if not api_key:
@@ -34,21 +58,76 @@ def get_report_service():
             logger.error(error_msg)
             raise ValueError(error_msg)
         
+        # Imported here so the LangChain/LangGraph stack loads during warm-up,
+        # not at import
+        from services.medical_report import MedicalReportService
+        
         # Initialize service
         logger.info("Initializing MedicalReportService")
         _service_instance = MedicalReportService(api_key=api_key)
     
     return _service_instance
 
+# Queue for asynchronous report jobs, started and stopped by the app lifespan
+report_job_queue = ReportJobQueue(
+    service_factory=get_report_service,
+    db_path=config.report_job_db_path,
+    workers=config.report_job_workers,
+    job_ttl=config.report_job_ttl,
+    lease=config.report_job_lease,
+)
+
+# Responses replayed for retried requests carrying an Idempotency-Key, created on
+# first use
+_idempotent_requests = None
+
+def get_idempotent_requests() -> IdempotentRequests:
+    """Get or create the idempotent request runner"""
+    global _idempotent_requests
+    if _idempotent_requests is None:
+        _idempotent_requests = IdempotentRequests(
+            IdempotencyStore(config.idempotency_db_path, ttl=config.idempotency_ttl)
+        )
+    return _idempotent_requests
+
+def to_job_response(job: Dict[str, Any]) -> ReportJobResponse:
+    """Convert a stored job into its API response"""
+    return ReportJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        report=job["result"],
+        error=job["error"],
+    )
+
 def log_request_details(patient_data: Dict[str, Any]):
-    """Log detailed request information with PII included (for demo purposes)"""
-    logger.info(f"Processing patient report with data: {json.dumps(patient_data)}")
+    """Log sampled request details with PII included (for demo purposes)"""
+    log_payload(logger, "Processing patient report", patient_data)
 
 @router.post("/generate_report", response_model=PatientReportResponse)
 async def generate_report(
     request: Request,
+    response: Response,
     patient_data: PatientReportRequest,
-    background_tasks: BackgroundTasks
+    use_cache: bool = Query(
+        True, description="Reuse a report generated for the same clinical profile"
+    ),
+    mode: Optional[str] = Query(
+        None,
+        pattern="^(agent|single_shot|fan_out)$",
+        description="Generation mode: 'agent' (ReAct tool loop), 'single_shot' "
+                    "(one structured call) or 'fan_out' (one call per meal-plan day, "
+                    "run concurrently)",
+    ),
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Retries with the same key get the first request's result "
+                    "instead of a new generation",
+    ),
 ):
     """
     Generate a medical report for a patient
@@ -56,33 +135,75 @@ async def generate_report(
     This endpoint processes patient data and produces a comprehensive
     medical report using LangGraph's structured output capability.
     
+    Concurrent requests for the same clinical profile share one generation.
+    With an Idempotency-Key, a successful response is stored for
+    IDEMPOTENCY_TTL seconds and replayed to retries (marked with an
+    `Idempotent-Replayed: true` header).
+    
     Args:
         patient_data: Patient information including medical conditions,
                      demographics, allergies, etc.
+        use_cache: Set to false to force a fresh generation
+        mode: Generation mode, defaults to REPORT_GENERATION_MODE
+        idempotency_key: Optional client-chosen key identifying this request
     
     Returns:
         PatientReportResponse: Contains the structured medical report or error details
     """
     client_ip = request.client.host if request.client else "unknown"
     
+    # Convert pydantic model to dict for the service
+    patient_info = patient_data.model_dump()
+    
     # Log request receipt
     logger.info(f"Received report generation request from {client_ip}")
-    log_request_details(patient_data.model_dump())
+    log_request_details(patient_info)
+    
+    async def produce() -> Dict[str, Any]:
+        response = await generate_report_response(patient_info, use_cache, mode)
+        return response.model_dump()
     
+    if not idempotency_key:
+        return await generate_report_response(patient_info, use_cache, mode)
+    
+    fingerprint = request_fingerprint(
+        {"patient": patient_info, "use_cache": use_cache, "mode": mode}
+    )
+    try:
+        result, replayed = await get_idempotent_requests().run(
+            f"generate_report:{idempotency_key}",
+            fingerprint,
+            produce,
+            should_store=lambda r: r["success"],
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return PatientReportResponse(**result)
+
+async def generate_report_response(
+    patient_info: Dict[str, Any],
+    use_cache: bool,
+    mode: Optional[str]
+) -> PatientReportResponse:
+    """Generate a report and wrap the outcome in the endpoint's response"""
     start_time = time.time()
+    patient_name = patient_info.get("name")
     
     try:
         # Get service instance
         service = get_report_service()
         
         # Log processing start
-        logger.info(f"Starting report generation for patient: {patient_data.name}")
-        
-        # Convert pydantic model to dict for the service
-        patient_info = patient_data.model_dump()
+        logger.info(f"Starting report generation for patient: {patient_name}")
         
-        # Generate report
-        report = service.generate_report(patient_info)
+        # Generate report without blocking the event loop
+        stats: Dict[str, Any] = {}
+        report = await service.agenerate_report(
+            patient_info, use_cache=use_cache, mode=mode, stats=stats
+        )
         
         # Calculate processing time
         processing_time = time.time() - start_time
@@ -91,20 +212,22 @@ async def generate_report(
         report_dict = report.model_dump()
         
         # Log successful completion
-        logger.info(f"Successfully generated report for {patient_data.name} in {processing_time:.2f}s")
-        
-        # Add background task to log detailed report info
-        def log_report_details():
-            # Log report for audit purposes (keeping PII for demo)
-            logger.debug(f"Generated report content: {json.dumps(report_dict)}")
+        logger.info(
+            f"Successfully generated report for {patient_name} "
+            f"in {processing_time:.2f}s"
+        )
         
-        background_tasks.add_task(log_report_details)
+        # Log report for audit purposes (keeping PII for demo), sampled
+        log_payload(
+            logger, "Generated report content", report_dict, level=logging.DEBUG
+        )
         
         # Return successful response
         return PatientReportResponse(
             success=True,
             message=f"Report successfully generated in {processing_time:.2f} seconds",
-            report=report_dict
+            report=report_dict,
+            stats=stats
         )
         
     except Exception as e:
@@ -119,3 +242,320 @@ async def generate_report(
             message="Failed to generate medical report",
             error=error_message
         )
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/generate_report/stream")
+async def stream_report(
+    request: Request,
+    patient_data: PatientReportRequest,
+    use_cache: bool = Query(
+        True, description="Reuse a report generated for the same clinical profile"
+    ),
+):
+    """
+    Generate a medical report, streaming its sections as server-sent events
+    
+    Emits `patient_summary`, `condition_analysis` and one `meal_plan_day`
+    event per day as they are generated (single-shot mode), then a `report`
+    event with the same payload as `/generate_report`, or an `error` event.
+    
+    Args:
+        patient_data: Patient information including medical conditions,
+                     demographics, allergies, etc.
+        use_cache: Set to false to force a fresh generation
+    
+    Returns:
+        StreamingResponse: text/event-stream of report sections
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    logger.info(f"Received streaming report request from {client_ip}")
+    log_request_details(patient_data.model_dump())
+    
+    async def events():
+        start_time = time.time()
+        stats: Dict[str, Any] = {}
+        try:
+            service = get_report_service()
+            async for event, data in service.astream_report(
+                patient_data.model_dump(), use_cache=use_cache, stats=stats
+            ):
+                if event != "report":
+                    yield format_sse(event, data)
+                    continue
+                
+                processing_time = time.time() - start_time
+                logger.info(
+                    f"Successfully streamed report for {patient_data.name} "
+                    f"in {processing_time:.2f}s"
+                )
+                response = PatientReportResponse(
+                    success=True,
+                    message=(
+                        f"Report successfully generated in {processing_time:.2f} "
+                        "seconds"
+                    ),
+                    report=data,
+                    stats=stats,
+                )
+                yield format_sse("report", response.model_dump())
+        except Exception as e:
+            logger.error(f"Error streaming report: {str(e)}")
+            logger.error(f"Error traceback: {traceback.format_exc()}")
+            response = PatientReportResponse(
+                success=False,
+                message="Failed to generate medical report",
+                error=str(e)
+            )
+            yield format_sse("error", response.model_dump())
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate_report/batch", response_model=BatchReportResponse)
+async def generate_report_batch(
+    request: Request,
+    batch: BatchReportRequest,
+    stream: bool = Query(
+        False, description="Stream results as NDJSON in completion order"
+    ),
+    use_cache: bool = Query(
+        True, description="Reuse reports generated for the same clinical profile"
+    ),
+    mode: Optional[str] = Query(
+        None,
+        pattern="^(agent|single_shot|fan_out)$",
+        description="Generation mode: 'agent' (ReAct tool loop), 'single_shot' "
+                    "(one structured call) or 'fan_out' (one call per meal-plan day, "
+                    "run concurrently)",
+    ),
+):
+    """
+    Generate medical reports for a list of patients
+    
+    Reports are generated with bounded concurrency and patients sharing a
+    clinical profile are generated once. Each item reports its own success
+    or error.
+    
+    Args:
+        batch: Patients and optional concurrency limit
+        stream: Return an NDJSON stream of BatchReportItem lines as reports finish
+        use_cache: Set to false to force fresh generations
+        mode: Generation mode, defaults to REPORT_GENERATION_MODE
+    
+    Returns:
+        BatchReportResponse, or a StreamingResponse when stream is set
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    logger.info(
+        f"Received batch of {len(batch.patients)} report requests from {client_ip}"
+    )
+    
+    if len(batch.patients) > config.report_batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"Batch size {len(batch.patients)} exceeds the limit of "
+                f"{config.report_batch_max_size}"
+            ),
+        )
+    
+    service = get_report_service()
+    patients = [patient.model_dump() for patient in batch.patients]
+    results = service.agenerate_batch(
+        patients,
+        concurrency=batch.concurrency or config.report_batch_concurrency,
+        use_cache=use_cache,
+        mode=mode
+    )
+    
+    def to_item(index: int, report, error: Optional[str]) -> BatchReportItem:
+        return BatchReportItem(
+            index=index,
+            success=report is not None,
+            report=report.model_dump() if report is not None else None,
+            error=error
+        )
+    
+    if stream:
+        async def lines():
+            async for index, report, error in results:
+                yield to_item(index, report, error).model_dump_json() + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    start_time = time.time()
+    items = sorted(
+        [to_item(*result) async for result in results], key=lambda item: item.index
+    )
+    failures = sum(1 for item in items if not item.success)
+    processing_time = time.time() - start_time
+    logger.info(
+        f"Generated batch of {len(items)} reports ({failures} failed) "
+        f"in {processing_time:.2f}s"
+    )
+    
+    return BatchReportResponse(
+        success=failures == 0,
+        message=(
+            f"Generated {len(items) - failures}/{len(items)} reports "
+            f"in {processing_time:.2f} seconds"
+        ),
+        results=items,
+    )
+
+@router.get("/generate_report/cache/stats")
+async def report_cache_stats():
+    """Report profile cache hit rate and size"""
+    return get_report_service().report_cache.stats()
+
+@router.get("/generate_report/providers")
+async def report_provider_stats():
+    """Report per-provider latency, error rate and hedge rate"""
+    return get_report_service().provider_stats()
+
+# Markdown table row, e.g. "| Monday | Oatmeal (300 kcal) | ... |"
+TABLE_ROW = re.compile(r"^\s*\|(.*)\|\s*$")
+TABLE_SEPARATOR = re.compile(r"^[\s|:-]+$")
+# Calorie count closing a meal cell, e.g. "(350 kcal)"
+MEAL_CALORIES = re.compile(
+    r"\s*\((\d+(?:\.\d+)?)\s*k?cal(?:ories)?\)\s*$", re.IGNORECASE
+)
+# Note closing a meal column header, e.g. "Breakfast (kcal)"
+HEADER_NOTE = re.compile(r"\s*\(.*\)\s*$")
+
+def parse_markdown_meal_plan(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Meal plan of a markdown report: its first table with a Day column
+    
+    Every other column is a meal, e.g. "| Day | Breakfast (kcal) | Lunch (kcal) |";
+    a trailing calorie count in a cell becomes the meal's calories.
+    """
+    header, meal_plan = None, {}
+    for line in text.splitlines():
+        row = TABLE_ROW.match(line)
+        if row is None:
+            if meal_plan:
+                break
+            header = None
+            continue
+        
+        cells = [cell.strip() for cell in row.group(1).split("|")]
+        if header is None:
+            if cells[0].lower() in ("day", "days") and len(cells) > 1:
+                header = [HEADER_NOTE.sub("", cell) for cell in cells]
+            continue
+        if TABLE_SEPARATOR.match(line):
+            continue
+        
+        meals = []
+        for name, cell in zip(header[1:], cells[1:]):
+            if not cell:
+                continue
+            meal = {"meal": name, "description": MEAL_CALORIES.sub("", cell)}
+            calories = MEAL_CALORIES.search(cell)
+            if calories:
+                meal["calories"] = calories.group(1)
+            meals.append(meal)
+        if cells[0] and meals:
+            meal_plan[cells[0]] = meals
+    return meal_plan or None
+
+def extract_meal_plan(recommendation: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Meal plan of an approved report: JSON text (a report or its response) or
+    the markdown report with a day/meal table that BACKEND stores on approval
+    """
+    try:
+        data = json.loads(recommendation or "")
+    except ValueError:
+        return parse_markdown_meal_plan(recommendation or "")
+    if not isinstance(data, dict):
+        return None
+    return data.get("meal_plan") or (data.get("report") or {}).get("meal_plan")
+
+@router.post("/approved_plans", response_model=ApprovedPlanResponse, status_code=201)
+async def index_approved_plan(plan: ApprovedPlanRequest):
+    """
+    Index a doctor-approved meal plan for reuse
+    
+    Reports for later patients with the same condition and age band and a
+    similar dietary profile are adapted from the closest approved plan
+    instead of being generated from scratch.
+    
+    Args:
+        plan: The approved plan and the profile it was approved for
+    
+    Returns:
+        ApprovedPlanResponse: Identifier of the indexed plan
+    """
+    meal_plan = plan.meal_plan or extract_meal_plan(plan.recommendation)
+    if not meal_plan:
+        raise HTTPException(
+            status_code=422, detail="No structured meal plan found in the approved plan"
+        )
+    
+    profile = plan.model_dump(exclude={"plan_id", "meal_plan", "recommendation"})
+    plan_id = get_report_service().plan_library.add(
+        profile, meal_plan, plan_id=plan.plan_id
+    )
+    return ApprovedPlanResponse(plan_id=plan_id, days=len(meal_plan))
+
+@router.get("/approved_plans/stats")
+async def approved_plan_stats():
+    """Number of indexed approved meal plans, overall and per condition"""
+    return get_report_service().plan_library.stats()
+
+@router.post("/generate_report/jobs", response_model=ReportJobResponse, status_code=202)
+async def submit_report_job(request: Request, patient_data: PatientReportRequest):
+    """
+    Queue a medical report for asynchronous generation
+    
+    Returns immediately with a job id; poll
+    `/generate_report/jobs/{job_id}` for the status and the finished report.
+    
+    Args:
+        patient_data: Patient information including medical conditions,
+                     demographics, allergies, etc.
+    
+    Returns:
+        ReportJobResponse: The queued job
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    logger.info(f"Received report job request from {client_ip}")
+    log_request_details(patient_data.model_dump())
+    
+    job = await report_job_queue.submit(patient_data.model_dump())
+    return to_job_response(job)
+
+@router.get("/generate_report/jobs/metrics")
+async def report_job_metrics():
+    """Report job queue depth, worker utilisation and wait times"""
+    return await report_job_queue.metrics()
+
+@router.get("/generate_report/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    wait: float = Query(
+        0, ge=0, le=60, description="Seconds to long-poll for the job to finish"
+    ),
+):
+    """
+    Get the status of a report job, and its report once finished
+    
+    Args:
+        job_id: Job identifier returned when the job was queued
+        wait: Seconds to wait for the job to finish before responding
+    
+    Returns:
+        ReportJobResponse: The job's current state
+    """
+    job = await report_job_queue.get(job_id, wait=wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report job {job_id} not found")
+    return to_job_response(job)
@@ -0,0 +1,119 @@
+# Built-in imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Local imports (the script's directory is on sys.path)
+from load_test import OFFLINE_ENV, patient
+
+# AI service root, so "api.main" resolves when run from anywhere
+AI_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure() -> dict:
+    """Import the app, run its lifespan and time readiness and the first report"""
+    sys.path.insert(0, str(AI_DIR))
+    
+    start = time.perf_counter()
+    from api.main import app
+    import_seconds = time.perf_counter() - start
+    
+    # Third-party imports are timed as part of the app import above
+    from fastapi.testclient import TestClient
+    
+    start = time.perf_counter()
+    # The fake LLM answers instantly, so the first request measures the service's
+    # own cold path: agent construction, lazily imported modules and the first
+    # pass through the LLM client
+    from fake_llm import FakeLLMProfile, LatencyModel, install
+    install(FakeLLMProfile(latency=LatencyModel("fixed:0")))
+    with TestClient(app) as client:
+        startup_seconds = time.perf_counter() - start
+        
+        ready_start = time.perf_counter()
+        while client.get("/ready").status_code != 200:
+            if time.perf_counter() - ready_start > 60:
+                raise RuntimeError("Service did not become ready within 60s")
+            time.sleep(0.01)
+        ready_seconds = time.perf_counter() - start
+        
+        request_start = time.perf_counter()
+        response = client.post(
+            "/api/v1/generate_report", params={"use_cache": "false"}, json=patient(0)
+        )
+        response.raise_for_status()
+        if not response.json().get("success"):
+            raise RuntimeError(f"First request failed: {response.json().get('error')}")
+        first_request_seconds = time.perf_counter() - request_start
+    
+    return {
+        "import_seconds": round(import_seconds, 3),
+        "startup_seconds": round(startup_seconds, 3),
+        "ready_seconds": round(ready_seconds, 3),
+        "first_request_seconds": round(first_request_seconds, 4),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure AI service import time and first-request latency"
+    )
+    parser.add_argument(
+        "--max-import-seconds",
+        type=float,
+        default=None,
+        help="Fail if importing the app takes longer",
+    )
+    parser.add_argument(
+        "--max-first-request-seconds",
+        type=float,
+        default=None,
+        help="Fail if the first request after readiness takes longer",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(measure()))
+        return 0
+    
+    # Measure in a fresh interpreter so no module is already imported
+    env = {**OFFLINE_ENV, **os.environ}
+    output = subprocess.run(
+        [sys.executable, __file__, "--child"],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+    
+    failures = []
+    if (
+        args.max_import_seconds is not None
+        and results["import_seconds"] > args.max_import_seconds
+    ):
+        failures.append(
+            f"import took {results['import_seconds']}s "
+            f"(budget {args.max_import_seconds}s)"
+        )
+    if (
+        args.max_first_request_seconds is not None
+        and results["first_request_seconds"] > args.max_first_request_seconds
+    ):
+        failures.append(
+            f"first request took {results['first_request_seconds']}s "
+            f"(budget {args.max_first_request_seconds}s)"
+        )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
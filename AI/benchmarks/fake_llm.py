@@ -0,0 +1,386 @@
+# Built-in imports
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Third-party imports
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Tool calls the fake agent makes, one per round trip, before its final answer
+DEFAULT_TOOL_SCRIPT = [
+    {
+        "name": "check_condition_symptoms",
+        "args": {
+            "symptoms": ["fatigue", "increased thirst"],
+            "condition": "Type 2 Diabetes",
+        },
+    },
+    {
+        "name": "analyze_dietary_needs",
+        "args": {"condition": "Type 2 Diabetes", "allergies": ["dairy"]},
+    },
+    {
+        "name": "generate_three_day_meal_plan",
+        "args": {
+            "condition": "Type 2 Diabetes",
+            "dietary_preferences": ["low-carb"],
+            "allergies": ["dairy"],
+        },
+    },
+]
+
+# Structured responses by schema name; a replay file can add or replace them
+DEFAULT_RESPONSES = {
+    "MedicalReport": {
+        "name": "Sarah Johnson",
+        "condition": "Type 2 Diabetes",
+        "age": 12,
+        "gender": "Female",
+        "weight": 45.5,
+        "height": 150.3,
+        "allergies": ["dairy"],
+        "medications": ["Metformin 500mg"],
+        "symptoms": ["fatigue", "increased thirst"],
+        "dietary_preferences": ["low-carb"],
+        "meal_plan_days": 3,
+        "meal_plan": {
+            "Day 1": [
+                {
+                    "meal": "Breakfast",
+                    "description": "Scrambled eggs with spinach and whole grain toast",
+                    "calories": "350",
+                },
+                {
+                    "meal": "Lunch",
+                    "description": "Grilled chicken salad with olive oil dressing",
+                    "calories": "450",
+                },
+                {
+                    "meal": "Dinner",
+                    "description": "Baked salmon with quinoa and steamed broccoli",
+                    "calories": "550",
+                },
+            ],
+            "Day 2": [
+                {
+                    "meal": "Breakfast",
+                    "description": "Greek yogurt with berries and chia seeds",
+                    "calories": "300",
+                },
+                {
+                    "meal": "Lunch",
+                    "description": "Turkey and avocado lettuce wrap",
+                    "calories": "400",
+                },
+                {
+                    "meal": "Dinner",
+                    "description": "Lentil soup with a side salad",
+                    "calories": "500",
+                },
+            ],
+            "Day 3": [
+                {
+                    "meal": "Breakfast",
+                    "description": "Oatmeal with almond butter and apple slices",
+                    "calories": "350",
+                },
+                {
+                    "meal": "Lunch",
+                    "description": "Tuna salad with mixed greens",
+                    "calories": "420",
+                },
+                {
+                    "meal": "Dinner",
+                    "description": "Stir-fried tofu with vegetables and brown rice",
+                    "calories": "520",
+                },
+            ],
+        },
+    },
+    "MealPlanOutline": {
+        "days": [
+            {"theme": "Mediterranean", "main_foods": ["salmon", "quinoa"]},
+            {"theme": "Garden", "main_foods": ["lentils", "brown rice"]},
+            {"theme": "Home cooking", "main_foods": ["chicken", "sweet potato"]},
+        ],
+    },
+    "MealPlanDay": {
+        "meals": [
+            {
+                "meal": "Breakfast",
+                "description": "Scrambled eggs with spinach and whole grain toast",
+                "calories": "350",
+            },
+            {
+                "meal": "Lunch",
+                "description": "Grilled chicken salad with olive oil dressing",
+                "calories": "450",
+            },
+            {
+                "meal": "Dinner",
+                "description": "Baked salmon with quinoa and steamed broccoli",
+                "calories": "550",
+            },
+            {
+                "meal": "Snack",
+                "description": "Apple slices with sunflower seed butter",
+                "calories": "200",
+            },
+        ],
+    },
+    "ReplacementMeal": {
+        "meal": {
+            "meal": "Breakfast",
+            "description": "Chia pudding with oat milk and berries",
+            "calories": "320",
+        },
+    },
+}
+
+# Rough characters per token, used for token counts and output-rate latency
+CHARS_PER_TOKEN = 4
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution for fake LLM calls.
+
+    Specs: "fixed:0.5", "uniform:0.2,1.0", "lognormal:0.8,0.4" (median and
+    sigma) or "empirical" with a list of recorded latencies to sample from.
+    """
+
+    def __init__(
+        self,
+        spec: str = "fixed:0.05",
+        samples: Optional[List[float]] = None,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            spec: Distribution and its parameters in seconds
+            samples: Recorded latencies for the "empirical" distribution
+            seed: Random seed, so runs are reproducible
+        """
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        self.samples = samples or []
+        if kind == "empirical" and not self.samples:
+            raise ValueError(
+                "The empirical latency distribution needs recorded latencies"
+            )
+        if kind not in ("fixed", "uniform", "lognormal", "empirical"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Draw one latency in seconds"""
+        with self._lock:
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._random.uniform(self.params[0], self.params[1])
+            if self.kind == "lognormal":
+                return self._random.lognormvariate(
+                    math.log(self.params[0]), self.params[1]
+                )
+            return self._random.choice(self.samples)
+
+
+class FakeLLMProfile:
+    """Behaviour shared by every fake model created during a run"""
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        tokens_per_second: float = 0.0,
+        output_tokens: Optional[int] = None,
+        tool_script: Optional[List[Dict[str, Any]]] = None,
+        responses: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ):
+        """
+        Args:
+            latency: Time to first token of each call
+            tokens_per_second: Output rate added to the latency (0 disables)
+            output_tokens: Fixed completion token count (estimated from the output
+                if None)
+            tool_script: Tool calls the agent makes before answering
+            responses: Structured responses by schema name, cycled per call
+        """
+        self.latency = latency or LatencyModel()
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.tool_script = DEFAULT_TOOL_SCRIPT if tool_script is None else tool_script
+        self._responses: Dict[str, Iterator[Dict[str, Any]]] = {
+            name: itertools.cycle([response])
+            for name, response in DEFAULT_RESPONSES.items()
+        }
+        for name, recorded in (responses or {}).items():
+            self._responses[name] = itertools.cycle(recorded)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_replay(cls, path: str, **kwargs: Any) -> "FakeLLMProfile":
+        """
+        Build a profile replaying a recording
+
+        The file holds {"responses": {"MedicalReport": [...], ...}} and
+        optionally "latencies": [...] (seconds) and "tool_script": [...].
+        Responses are replayed in order, latencies sampled at random.
+        """
+        recording = json.loads(Path(path).read_text(encoding="utf-8"))
+        if recording.get("latencies") and "latency" not in kwargs:
+            kwargs["latency"] = LatencyModel(
+                "empirical", samples=recording["latencies"]
+            )
+        if "tool_script" in recording and "tool_script" not in kwargs:
+            kwargs["tool_script"] = recording["tool_script"]
+        return cls(responses=recording.get("responses", {}), **kwargs)
+
+    def structured_response(self, schema_name: str) -> Dict[str, Any]:
+        """Next response for a structured-output schema"""
+        with self._lock:
+            responses = self._responses.get(schema_name)
+            if responses is None:
+                raise KeyError(f"No fake response for schema {schema_name}")
+            return next(responses)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for ChatOpenAI and ChatGoogleGenerativeAI.
+
+    Bound to tools without a forced choice (the ReAct agent), it makes the
+    profile's scripted tool calls one per round trip and then answers. With a
+    forced tool choice (structured output), it returns the profile's response
+    for that schema. Every call sleeps for a sampled latency and reports
+    token usage estimated from the message sizes.
+    """
+
+    profile: Any = None
+    model_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(
+        self, tools: List[Any], tool_choice: Any = None, **kwargs: Any
+    ) -> Any:
+        """Bind tools like ChatOpenAI, so structured output and agents work unchanged"""
+        return self.bind(
+            tools=[convert_to_openai_tool(t) for t in tools],
+            tool_choice=tool_choice,
+            **kwargs,
+        )
+
+    def _respond(
+        self,
+        messages: List[BaseMessage],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Any = None,
+        **kwargs: Any,
+    ) -> AIMessage:
+        """Build the next response for a conversation"""
+        names = [t["function"]["name"] for t in tools or []]
+        if tools and tool_choice:
+            if isinstance(tool_choice, dict):
+                schema_name = tool_choice["function"]["name"]
+            else:
+                schema_name = names[0]
+            args = self.profile.structured_response(schema_name)
+            tool_calls = [{"name": schema_name, "args": args, "id": uuid.uuid4().hex}]
+            return self._with_usage(
+                AIMessage(content="", tool_calls=tool_calls), messages
+            )
+
+        step = sum(1 for m in messages if isinstance(m, ToolMessage))
+        script = [call for call in self.profile.tool_script if call["name"] in names]
+        if step < len(script):
+            call = script[step]
+            args = call.get("args", {})
+            tool_calls = [{"name": call["name"], "args": args, "id": uuid.uuid4().hex}]
+            return self._with_usage(
+                AIMessage(content="", tool_calls=tool_calls), messages
+            )
+        return self._with_usage(
+            AIMessage(content="The checks are complete; the report can be written."),
+            messages,
+        )
+
+    def _with_usage(self, message: AIMessage, messages: List[BaseMessage]) -> AIMessage:
+        """Attach token usage estimated from the prompt and response sizes"""
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        output_chars = len(str(message.content))
+        output_chars += sum(len(json.dumps(c["args"])) for c in message.tool_calls)
+        input_tokens = prompt_chars // CHARS_PER_TOKEN + 1
+        estimated = output_chars // CHARS_PER_TOKEN + 1
+        output_tokens = self.profile.output_tokens or estimated
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _latency(self, message: AIMessage) -> float:
+        """Seconds the call takes: sampled latency plus output time"""
+        latency = self.profile.latency.sample()
+        if self.profile.tokens_per_second:
+            output_tokens = message.usage_metadata["output_tokens"]
+            latency += output_tokens / self.profile.tokens_per_second
+        return latency
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._respond(messages, **kwargs)
+        time.sleep(self._latency(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._respond(messages, **kwargs)
+        await asyncio.sleep(self._latency(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def install(profile: FakeLLMProfile) -> None:
+    """
+    Replace ChatOpenAI and ChatGoogleGenerativeAI with fakes using profile
+
+    Must run before the service modules are imported, since they bind
+    ChatOpenAI at import time.
+    """
+    def factory(**kwargs: Any) -> FakeChatModel:
+        return FakeChatModel(
+            profile=profile, model_name=str(kwargs.get("model") or "fake")
+        )
+
+    import langchain_openai
+    langchain_openai.ChatOpenAI = factory
+    try:
+        import langchain_google_genai
+    except ImportError:
+        return
+    langchain_google_genai.ChatGoogleGenerativeAI = factory
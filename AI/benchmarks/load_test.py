@@ -0,0 +1,343 @@
+# Built-in imports
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# AI service root, so "api.main" resolves when run from anywhere
+AI_DIR = Path(__file__).resolve().parent.parent
+
+# Environment for an offline run; values already set take precedence
+OFFLINE_ENV = {
+    "OPENAI_API_KEY": "sk-load-test",
+    "GEMINI_API_KEY": "load-test",
+    "MODEL_NAME": "gpt-4o",
+    "LOG_LEVEL": "WARNING",
+    "REPORT_JOB_DB_PATH": ":memory:",
+    "PLAN_LIBRARY_DB_PATH": ":memory:",
+    "IDEMPOTENCY_DB_PATH": ":memory:",
+    # Admission control would reject most of a single-client benchmark
+    "API_RATE_LIMIT": "0",
+    "API_GLOBAL_RATE_LIMIT": "0",
+    "API_MAX_IN_FLIGHT": "0",
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def memory_mb() -> Dict[str, Optional[float]]:
+    """Current and peak resident memory of this process in MB, where reported"""
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is in KB on Linux and bytes on macOS
+        unit = 2**20 if sys.platform == "darwin" else 2**10
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    except ImportError:
+        pass
+    return {
+        "rss_mb": round(current, 1) if current is not None else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps at a fixed interval"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self.lags = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        """Stop measuring and summarise the lag in milliseconds"""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return {
+            "p50_ms": round(percentile(self.lags, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.lags, 99) * 1000, 2),
+            "max_ms": round(max(self.lags, default=0.0) * 1000, 2),
+        }
+
+
+def patient(index: int) -> Dict[str, Any]:
+    """A patient payload; the index varies the profile so reports are not shared"""
+    return {
+        "name": f"Load Test Patient {index}",
+        "condition": "Type 2 Diabetes",
+        "age": 5 + index % 13,
+        "gender": "Female" if index % 2 else "Male",
+        "weight": 30.0 + index % 50,
+        "height": 120.0 + index % 60,
+        "allergies": ["dairy"],
+        "medications": ["Metformin 500mg"],
+        "symptoms": ["fatigue", "increased thirst"],
+        "dietary_preferences": ["low-carb"],
+    }
+
+
+async def run_level(
+    client: Any, concurrency: int, requests: int, params: Dict[str, str], offset: int
+) -> Dict[str, Any]:
+    """Send requests with a fixed number in flight and summarise the results"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    failures = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(offset + index)
+
+    async def worker() -> None:
+        nonlocal failures
+        while not queue.empty():
+            index = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/v1/generate_report", params=params, json=patient(index)
+                )
+                status = str(response.status_code)
+                ok = response.status_code == 200 and response.json().get("success")
+            except Exception as e:
+                status, ok = type(e).__name__, False
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            failures += 0 if ok else 1
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    loop_lag = await monitor.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "failures": failures,
+        "statuses": statuses,
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(requests / duration, 2),
+        "latency_seconds": {
+            **{f"p{p}": round(percentile(latencies, p), 4) for p in PERCENTILES},
+            "max": round(max(latencies, default=0.0), 4),
+        },
+        "event_loop_lag": loop_lag,
+        "memory": memory_mb(),
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Start the app in-process with the fake LLM and run every concurrency level"""
+    sys.path.insert(0, str(AI_DIR))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from fake_llm import FakeLLMProfile, LatencyModel, install
+
+    profile_kwargs: Dict[str, Any] = {
+        "tokens_per_second": args.tokens_per_second,
+        "output_tokens": args.output_tokens,
+    }
+    if args.tool_script:
+        script = Path(args.tool_script).read_text(encoding="utf-8")
+        profile_kwargs["tool_script"] = json.loads(script)
+    if args.latency:
+        profile_kwargs["latency"] = LatencyModel(args.latency, seed=args.seed)
+    if args.replay:
+        profile = FakeLLMProfile.from_replay(args.replay, **profile_kwargs)
+    else:
+        profile_kwargs.setdefault("latency", LatencyModel("fixed:0.05", seed=args.seed))
+        profile = FakeLLMProfile(**profile_kwargs)
+    install(profile)
+
+    import httpx
+    from api.main import app
+
+    params = {"use_cache": str(args.use_cache).lower(), "mode": args.mode}
+    results = []
+    async with app.router.lifespan_context(app):
+        ready_start = time.perf_counter()
+        while not getattr(app.state, "ready", False):
+            if time.perf_counter() - ready_start > 60:
+                raise RuntimeError("Service did not become ready within 60s")
+            await asyncio.sleep(0.01)
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(
+            transport=transport, base_url="http://load-test", timeout=args.timeout
+        )
+        async with client:
+            # One request first, so lazy initialisation is not measured
+            await client.post(
+                "/api/v1/generate_report", params=params, json=patient(-1)
+            )
+            offset = 0
+            for concurrency in args.concurrency:
+                result = await run_level(
+                    client, concurrency, args.requests, params, offset
+                )
+                offset += args.requests
+                results.append(result)
+                latency = result["latency_seconds"]
+                print(
+                    f"concurrency={concurrency:<4} "
+                    f"throughput={result['throughput_rps']:>8.2f} req/s  "
+                    f"p50={latency['p50']:.3f}s  p95={latency['p95']:.3f}s  "
+                    f"p99={latency['p99']:.3f}s  "
+                    f"loop lag p99={result['event_loop_lag']['p99_ms']}ms  "
+                    f"rss={result['memory']['rss_mb']}MB  "
+                    f"failures={result['failures']}",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Load-test /api/v1/generate_report offline against a fake LLM"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=lambda s: [int(c) for c in s.split(",")],
+        default=[1, 8, 32],
+        help="Comma-separated concurrency levels",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=100, help="Requests per concurrency level"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["agent", "single_shot", "fan_out"],
+        default="agent",
+        help="Report generation mode",
+    )
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Allow the report cache and request coalescing",
+    )
+    parser.add_argument(
+        "--latency",
+        default=None,
+        help='LLM latency distribution, e.g. "fixed:0.05", "uniform:0.2,1", '
+        '"lognormal:0.8,0.4"',
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        default=0.0,
+        help="LLM output rate added to the latency (0 disables)",
+    )
+    parser.add_argument(
+        "--output-tokens",
+        type=int,
+        default=None,
+        help="Fixed completion tokens per call (estimated from the output by default)",
+    )
+    parser.add_argument(
+        "--tool-script",
+        default=None,
+        help="JSON file with the tool calls the agent makes ([{name, args}, ...])",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="JSON recording of responses and latencies to replay",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for sampled latencies"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=120.0, help="Per-request timeout in seconds"
+    )
+    parser.add_argument(
+        "--output", default=None, help="Also write the results as JSON to this file"
+    )
+    parser.add_argument(
+        "--max-p95-seconds",
+        type=float,
+        default=None,
+        help="Fail if any level's p95 latency is higher",
+    )
+    parser.add_argument(
+        "--min-throughput",
+        type=float,
+        default=None,
+        help="Fail if the highest level's throughput (req/s) is lower",
+    )
+    parser.add_argument(
+        "--max-loop-lag-ms",
+        type=float,
+        default=None,
+        help="Fail if any level's p99 event-loop lag is higher",
+    )
+    args = parser.parse_args()
+
+    for name, value in OFFLINE_ENV.items():
+        os.environ.setdefault(name, value)
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    failures = []
+    for result in results:
+        level = f"concurrency {result['concurrency']}"
+        if result["failures"]:
+            failures.append(
+                f"{level}: {result['failures']} failed requests ({result['statuses']})"
+            )
+        p95 = result["latency_seconds"]["p95"]
+        if args.max_p95_seconds is not None and p95 > args.max_p95_seconds:
+            failures.append(
+                f"{level}: p95 latency {p95}s (budget {args.max_p95_seconds}s)"
+            )
+        lag = result["event_loop_lag"]["p99_ms"]
+        if args.max_loop_lag_ms is not None and lag > args.max_loop_lag_ms:
+            failures.append(
+                f"{level}: p99 event-loop lag {lag}ms (budget {args.max_loop_lag_ms}ms)"
+            )
+    if args.min_throughput is not None and results:
+        throughput = results[-1]["throughput_rps"]
+        if throughput < args.min_throughput:
+            failures.append(
+                f"throughput {throughput} req/s (budget {args.min_throughput} req/s)"
+            )
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
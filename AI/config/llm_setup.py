@@ -1,18 +1,274 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from config.settings import config
 from typing import Any, List, Optional, Union, Tuple
 from config.logging_info import setup_logger
-from langchain_openai import ChatOpenAI as LangchainChatOpenAI
+from config.metrics import (
+    LLM_BREAKER_REJECTIONS, LLM_BREAKER_TRANSITIONS, LLM_FAILOVERS, LLM_FAILURES,
+    LLM_HEDGES, LLM_RETRIES
+)
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict
+import asyncio
+import json
+import random
+import threading
 import time
 
 
+class TokenCounter:
+    """
+    Local token counter based on tiktoken encodings.
+    
+    Encodings are loaded once per process and shared; counts of repeated text
+    (system prompts, tool schemas) are served from an LRU cache. Chat messages
+    add the per-message overhead of OpenAI's chat format. If the encoding
+    cannot be loaded (e.g. no network to fetch it), counts fall back to the
+    4-characters-per-token estimate.
+    """
+    
+    # Chat format overhead: per message, per name field, and the primed assistant reply
+    TOKENS_PER_MESSAGE = 3
+    TOKENS_PER_NAME = 1
+    REPLY_PRIMING = 3
+    
+    # Shared encodings and counters keyed by encoding or model name
+    _encodings: Dict[str, Any] = {}
+    _counters: Dict[str, "TokenCounter"] = {}
+    _registry_lock = threading.Lock()
+    _encoding_lock = threading.Lock()
+    
+    def __init__(self, model: str, cache_size: int = 4096):
+        """
+        Initialize the token counter.
+        
+        Args:
+            model: Model name used to select the encoding
+            cache_size: Number of distinct text fragments whose counts are cached
+        """
+        self.logger = setup_logger(__name__)
+        self.model = model
+        self.encoding = self._load_encoding(model)
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+    
+    @classmethod
+    def for_model(cls, model: str) -> "TokenCounter":
+        """Return the shared counter for model, creating it on first use"""
+        with cls._registry_lock:
+            if model not in cls._counters:
+                cls._counters[model] = cls(model)
+            return cls._counters[model]
+    
+    def _load_encoding(self, model: str):
+        """Resolve and load the model's encoding once, or None if unavailable"""
+        try:
+            import tiktoken
+        except ImportError:
+            self.logger.warning("tiktoken is not installed; estimating token counts")
+            return None
+        
+        try:
+            name = tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            o200k = model.startswith(("gpt-4o", "o1", "o3"))
+            name = "o200k_base" if o200k else "cl100k_base"
+        
+        with self._encoding_lock:
+            if name not in self._encodings:
+                try:
+                    self._encodings[name] = tiktoken.get_encoding(name)
+                except Exception as e:
+                    self.logger.warning(
+                        f"Failed to load tiktoken encoding {name}, "
+                        f"estimating token counts: {str(e)}"
+                    )
+                    self._encodings[name] = None
+            return self._encodings[name]
+    
+    def _count(self, text: str) -> int:
+        if self.encoding is None:
+            return len(text) // 4
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    def count_messages(self, messages: List[Any]) -> int:
+        """
+        Count the prompt tokens of a chat request.
+        
+        Args:
+            messages: LangChain messages or OpenAI-style dicts with role, content and
+                optional name
+            
+        Returns:
+            The number of prompt tokens, including chat format overhead
+        """
+        total = self.REPLY_PRIMING
+        for message in messages:
+            if isinstance(message, dict):
+                role = message.get("role", "")
+                content = message.get("content")
+                name = message.get("name")
+                tool_calls = message.get("tool_calls") or []
+            else:
+                role = getattr(message, "type", "")
+                content = getattr(message, "content", "")
+                name = getattr(message, "name", None)
+                tool_calls = getattr(message, "tool_calls", None) or []
+            
+            total += self.TOKENS_PER_MESSAGE + self.count(role)
+            total += self._count_content(content)
+            if name:
+                total += self.TOKENS_PER_NAME + self.count(name)
+            for tool_call in tool_calls:
+                function = tool_call.get("function") or tool_call
+                arguments = function.get("arguments", function.get("args", ""))
+                if not isinstance(arguments, str):
+                    arguments = json.dumps(arguments)
+                total += self.count(function.get("name", "")) + self.count(arguments)
+        return total
+    
+    def _count_content(self, content: Any) -> int:
+        """Count string content or the text parts of multi-part content"""
+        if isinstance(content, str):
+            return self.count(content)
+        total = 0
+        for part in content or []:
+            if isinstance(part, str):
+                total += self.count(part)
+            elif isinstance(part, dict) and part.get("type") == "text":
+                total += self.count(part.get("text", ""))
+        return total
+    
+    def cache_info(self):
+        """Hit/miss statistics of the fragment cache"""
+        return self.count.cache_info()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the provider's circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by all callers of the same model.
+    
+    Closed: calls pass through and consecutive failures are counted.
+    Open: calls fail fast with CircuitOpenError until the recovery timeout elapses.
+    Half-open: a single probe call is let through; success closes the circuit,
+    failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    # Shared breakers keyed by model name
+    _breakers: Dict[str, "CircuitBreaker"] = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(
+        self, name: str, failure_threshold: int = None, recovery_timeout: float = None
+    ):
+        """
+        Initialize the circuit breaker.
+        
+        Args:
+            name: Name of the protected provider or model
+            failure_threshold: Consecutive failures that open the circuit
+                (defaults to value in config)
+            recovery_timeout: Seconds to stay open before probing
+                (defaults to value in config)
+        """
+        self.logger = setup_logger(__name__)
+        self.name = name
+        self.failure_threshold = failure_threshold or config.breaker_failure_threshold
+        self.recovery_timeout = (
+            recovery_timeout
+            if recovery_timeout is not None
+            else config.breaker_recovery_timeout
+        )
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def for_name(cls, name: str) -> "CircuitBreaker":
+        """Return the shared breaker for name, creating it on first use"""
+        with cls._registry_lock:
+            if name not in cls._breakers:
+                cls._breakers[name] = cls(name)
+            return cls._breakers[name]
+    
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open after the recovery timeout"""
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                self._transition(self.HALF_OPEN)
+            return self._state
+    
+    def allow_request(self) -> bool:
+        """Whether a call may proceed; in half-open state only one probe at a time"""
+        state = self.state
+        with self._lock:
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+        LLM_BREAKER_REJECTIONS.inc(model=self.name)
+        return False
+    
+    def check(self) -> None:
+        """Raise CircuitOpenError if a call may not proceed"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit for {self.name} is open; failing fast")
+    
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit"""
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+    
+    def record_failure(self) -> None:
+        """Record a failed call; too many failures or a failed probe open the circuit"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                if self._state != self.OPEN:
+                    self._transition(self.OPEN)
+    
+    def release(self) -> None:
+        """Give back a probe slot for a call that ended without an outcome"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def _transition(self, state: str) -> None:
+        self.logger.warning(f"Circuit for {self.name}: {self._state} -> {state}")
+        self._state = state
+        LLM_BREAKER_TRANSITIONS.inc(model=self.name, state=state)
+
+
 class OpenAIChat:
     """
     Industry-grade wrapper for OpenAI's chat models with robust error handling and observability.
     
     Features:
     - Langfuse integration for tracking and monitoring
-    - Comprehensive error handling with retries
+    - Comprehensive error handling with jittered retries
+    - Circuit breaker shared across instances of the same model
+    - Async invocation that never blocks the event loop
     - Support for tool calling
     - Performance optimization
     """
@@ -70,6 +326,12 @@ class OpenAIChat:
         
         self.logger.info(f"Using model: {self.model}, temperature: {self.temperature}")
         
+        # Fail fast while the provider is down
+        self.breaker = CircuitBreaker.for_name(self.model)
+        
+        # Local tokenizer shared by all instances of the model
+        self.token_counter = TokenCounter.for_model(self.model)
+        
         # Initialize LLM with error handling
         try:
             # Create kwargs dict to handle model-specific parameters
@@ -90,6 +352,9 @@ class OpenAIChat:
             else:
                 self.logger.info(f"Model {self.model} doesn't support temperature parameter, skipping")
             
+            # Imported here so importing this module stays cheap
+            from langchain_openai import ChatOpenAI as LangchainChatOpenAI
+            
             self.llm = LangchainChatOpenAI(**llm_kwargs)
             self.logger.info("OpenAI LLM initialization successful")
         except Exception as e:
@@ -106,44 +371,130 @@ class OpenAIChat:
             
         Returns:
             The model's response
+            
+        Raises:
+            CircuitOpenError: If the circuit for this model is open
         """
         start_time = time.time()
         retry_count = 0
         max_retries = kwargs.pop('max_retries', self.max_retries)
+        self._drop_unsupported_params(kwargs)
         
-        # Remove temperature parameter if model doesn't support it
-        if self.model in self.NO_TEMPERATURE_MODELS and 'temperature' in kwargs:
-            self.logger.info(f"Removing unsupported temperature parameter for model {self.model}")
-            kwargs.pop('temperature')
-        
-        while retry_count <= max_retries:
+        while True:
+            self.breaker.check()
             try:
                 self.logger.info(f"Invoking OpenAI model: {self.model}")
                 response = self.llm.invoke(messages, **kwargs)
-                
-                # Log performance metrics
-                elapsed_time = time.time() - start_time
-                self.logger.info(f"OpenAI response received in {elapsed_time:.2f}s")
-                
-                # Check if response time exceeds threshold (10s)
-                if elapsed_time > 10:
-                    self.logger.warning(f"Response time exceeded threshold: {elapsed_time:.2f}s")
-                
-                return response
-                
             except Exception as e:
+                self.breaker.record_failure()
                 retry_count += 1
-                self.logger.warning(f"Error invoking OpenAI (attempt {retry_count}/{max_retries+1}): {str(e)}")
-                
-                # If we've exhausted retries, raise the exception
-                if retry_count > max_retries:
-                    self.logger.error(f"Failed to get response after {max_retries+1} attempts: {str(e)}")
-                    raise
-                
-                # Exponential backoff with jitter
-                backoff_time = min(2 ** retry_count + (0.1 * retry_count), 60)
-                self.logger.info(f"Retrying in {backoff_time:.2f}s...")
+                backoff_time = self._handle_failure(e, retry_count, max_retries)
                 time.sleep(backoff_time)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            
+            self.breaker.record_success()
+            self._log_response_time(start_time)
+            return response
+    
+    async def ainvoke(self, messages, **kwargs):
+        """
+        Asynchronously invoke the OpenAI chat model.
+        
+        Same retry and circuit-breaker behaviour as invoke, but backoff waits
+        with asyncio.sleep so other requests keep being served.
+        
+        Args:
+            messages: List of messages to send to the model
+            **kwargs: Additional parameters to pass to the model
+            
+        Returns:
+            The model's response
+            
+        Raises:
+            CircuitOpenError: If the circuit for this model is open
+        """
+        start_time = time.time()
+        retry_count = 0
+        max_retries = kwargs.pop('max_retries', self.max_retries)
+        self._drop_unsupported_params(kwargs)
+        
+        while True:
+            self.breaker.check()
+            try:
+                self.logger.info(f"Invoking OpenAI model asynchronously: {self.model}")
+                response = await self.llm.ainvoke(messages, **kwargs)
+            except Exception as e:
+                self.breaker.record_failure()
+                retry_count += 1
+                backoff_time = self._handle_failure(e, retry_count, max_retries)
+                await asyncio.sleep(backoff_time)
+                continue
+            except BaseException:
+                # Cancelled: no verdict on the provider, free the half-open probe slot
+                self.breaker.release()
+                raise
+            
+            self.breaker.record_success()
+            self._log_response_time(start_time)
+            return response
+    
+    def _drop_unsupported_params(self, kwargs: Dict[str, Any]) -> None:
+        """Remove temperature parameter if model doesn't support it"""
+        if self.model in self.NO_TEMPERATURE_MODELS and 'temperature' in kwargs:
+            self.logger.info(
+                f"Removing unsupported temperature parameter for model {self.model}"
+            )
+            kwargs.pop('temperature')
+    
+    def _handle_failure(
+        self, error: Exception, retry_count: int, max_retries: int
+    ) -> float:
+        """
+        Log a failed attempt and return the backoff before the next one.
+        
+        Raises the error once retries are exhausted or the circuit has opened,
+        since further attempts would be rejected anyway.
+        """
+        self.logger.warning(
+            f"Error invoking OpenAI (attempt {retry_count}/{max_retries+1}): "
+            f"{str(error)}"
+        )
+        
+        # If we've exhausted retries, raise the exception
+        if retry_count > max_retries:
+            self.logger.error(
+                f"Failed to get response after {max_retries+1} attempts: {str(error)}"
+            )
+            LLM_FAILURES.inc(model=self.model)
+            raise error
+        
+        if self.breaker.state == CircuitBreaker.OPEN:
+            self.logger.error(
+                f"Circuit for {self.model} opened, not retrying: {str(error)}"
+            )
+            LLM_FAILURES.inc(model=self.model)
+            raise error
+        
+        LLM_RETRIES.inc(model=self.model)
+        
+        # Exponential backoff with full jitter
+        backoff_time = random.uniform(0, min(2 ** retry_count, 60))
+        self.logger.info(f"Retrying in {backoff_time:.2f}s...")
+        return backoff_time
+    
+    def _log_response_time(self, start_time: float) -> None:
+        """Log the total response time, warning above the 10s threshold"""
+        elapsed_time = time.time() - start_time
+        self.logger.info(f"OpenAI response received in {elapsed_time:.2f}s")
+        
+        # Check if response time exceeds threshold (10s)
+        if elapsed_time > 10:
+            self.logger.warning(
+                f"Response time exceeded threshold: {elapsed_time:.2f}s"
+            )
     
     def bind_tools(self, tools, **kwargs):
         """
@@ -179,12 +530,7 @@ class OpenAIChat:
         Returns:
             The number of tokens in the text
         """
-        try:
-            return self.llm.get_num_tokens(text)
-        except Exception as e:
-            self.logger.error(f"Failed to get token count: {str(e)}")
-            # Fallback to approximate token count (1 token ≈ 4 chars)
-            return len(text) // 4
+        return self.token_counter.count(text)
     
     def get_num_tokens_from_messages(self, messages):
         """
@@ -194,32 +540,15 @@ class OpenAIChat:
             messages: The messages to tokenize
             
         Returns:
-            The number of tokens in the messages
+            The number of tokens in the messages, including chat format overhead
         """
-        try:
-            return self.llm.get_num_tokens_from_messages(messages)
-        except Exception as e:
-            self.logger.error(f"Failed to get token count from messages: {str(e)}")
-            
-            # More sophisticated fallback for token counting
-            # For models that don't support get_num_tokens_from_messages
-            total_text = ""
-            for message in messages:
-                if hasattr(message, "content"):
-                    # Add role prefix to better approximate token count
-                    role = getattr(message, "type", "unknown")
-                    total_text += f"{role}: {message.content}\n\n"
-            
-            # Estimate: 1 token ≈ 4 characters for English text
-            estimated_tokens = len(total_text) // 4
-            self.logger.info(f"Estimated token count using fallback method: {estimated_tokens}")
-            return estimated_tokens
+        return self.token_counter.count_messages(messages)
     
     def flush_langfuse(self):
-        """Flush any pending Langfuse events."""
+        """Request a background flush of pending Langfuse events; does not block."""
         if config.langfuse_handler:
             config.flush_langfuse()
-            self.logger.info("Flushed Langfuse events")
+            self.logger.info("Requested Langfuse flush")
 
 
 class GeminiChat:
@@ -277,6 +606,9 @@ class GeminiChat:
         
         # Initialize LLM
         try:
+            # Imported here so importing this module stays cheap
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            
             self.llm = ChatGoogleGenerativeAI(
                 model=self.model,
                 temperature=self.temperature,
@@ -291,7 +623,312 @@ class GeminiChat:
             raise ValueError(f"Failed to initialize LLM: {str(e)}")
     
     def flush_langfuse(self):
-        """Flush any pending Langfuse events."""
+        """Request a background flush of pending Langfuse events; does not block."""
         if config.langfuse_handler:
             config.flush_langfuse()
-            self.logger.info("Flushed Langfuse events")
\ No newline at end of file
+            self.logger.info("Requested Langfuse flush")
+
+class ProviderStats:
+    """Rolling latency and error statistics for one LLM provider"""
+    
+    def __init__(self, window: int = 200):
+        """
+        Initialize the statistics window.
+        
+        Args:
+            window: Number of recent calls the statistics are computed over
+        """
+        self._latencies = deque(maxlen=window)
+        self._errors = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, latency: Optional[float] = None, error: bool = False) -> None:
+        """Record one call; latency is omitted for calls that failed before answering"""
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self._errors.append(error)
+    
+    @property
+    def samples(self) -> int:
+        """Number of latency samples in the window"""
+        return len(self._latencies)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at percentile q (0-1), or None without samples"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+    
+    @property
+    def error_rate(self) -> float:
+        """Share of recent calls that failed"""
+        with self._lock:
+            return sum(self._errors) / len(self._errors) if self._errors else 0.0
+    
+    def score(self) -> float:
+        """Median latency penalised by the error rate; lower is better"""
+        median = self.percentile(0.5) or 0.0
+        return median * (1 + 4 * self.error_rate) + 60 * self.error_rate
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarise the statistics"""
+        return {
+            "samples": self.samples,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class HedgedChat:
+    """
+    Composite chat client that hedges slow calls and fails over across providers.
+    
+    Each call goes to the provider with the best recent latency and error rate.
+    If it has not answered once its latency percentile is exceeded, the same
+    request is sent to the next provider and whichever answers first wins; the
+    other call is cancelled. Errors fail over to the next provider immediately.
+    Hedging is capped at a share of recent calls so spend stays bounded.
+    
+    Providers are any runnables with the same input and output, e.g. the same
+    prompt bound to OpenAI and Gemini models, or two agents built on them.
+    """
+    
+    # Latency samples needed before a provider's statistics are trusted
+    MIN_SAMPLES = 20
+    
+    # Thread pool for hedged synchronous calls
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedged-chat")
+    
+    def __init__(
+        self,
+        providers: Dict[str, Any],
+        hedge_percentile: float = None,
+        max_hedge_ratio: float = None,
+        initial_hedge_delay: float = 10.0,
+        min_hedge_delay: float = 1.0,
+        window: int = 200
+    ):
+        """
+        Initialize the composite client.
+        
+        Args:
+            providers: Runnables keyed by provider name, in default priority order
+            hedge_percentile: Primary latency percentile after which to hedge
+                (defaults to value in config)
+            max_hedge_ratio: Maximum share of recent calls that may hedge
+                (defaults to value in config)
+            initial_hedge_delay: Seconds to wait before hedging until enough latency
+                samples exist
+            min_hedge_delay: Lower bound on the wait, so near-uniform latencies do not
+                spend the hedge budget
+            window: Number of recent calls used for statistics and the hedge budget
+        """
+        self.logger = setup_logger(__name__)
+        if len(providers) < 1:
+            raise ValueError("HedgedChat needs at least one provider")
+        
+        self.providers = dict(providers)
+        self.hedge_percentile = (
+            hedge_percentile
+            if hedge_percentile is not None
+            else config.hedge_percentile
+        )
+        self.max_hedge_ratio = (
+            max_hedge_ratio if max_hedge_ratio is not None else config.hedge_max_ratio
+        )
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.stats = {name: ProviderStats(window) for name in self.providers}
+        self._hedged = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.logger.info(
+            f"Initialized HedgedChat with providers: {', '.join(self.providers)}"
+        )
+    
+    def ranked_providers(self) -> List[str]:
+        """
+        Provider names ordered by score; providers without enough samples keep their
+        configured order
+        """
+        order = list(self.providers)
+        
+        def key(name: str) -> Tuple[float, int]:
+            stats = self.stats[name]
+            trusted = stats.samples >= self.MIN_SAMPLES
+            return (stats.score() if trusted else float("inf"), order.index(name))
+        
+        return sorted(order, key=key)
+    
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait on provider name before sending a hedge request"""
+        stats = self.stats[name]
+        if stats.samples < self.MIN_SAMPLES:
+            return self.initial_hedge_delay
+        return max(stats.percentile(self.hedge_percentile), self.min_hedge_delay)
+    
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return sum(self._hedged) < max(
+                1.0, self.max_hedge_ratio * len(self._hedged)
+            )
+    
+    def _finish_call(self, hedged: bool) -> None:
+        with self._lock:
+            self._hedged.append(hedged)
+    
+    def invoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs):
+        """
+        Invoke the providers with hedging and failover.
+        
+        A hedged-out synchronous call cannot be interrupted, so it finishes in
+        the background and its result is discarded.
+        
+        Args:
+            input: Input passed to the provider runnables
+            config: Optional runnable config (callbacks, tags, ...)
+            **kwargs: Additional parameters passed to the providers
+            
+        Returns:
+            The first successful response
+        """
+        remaining = self.ranked_providers()
+        pending = {}
+        last_error = None
+        hedged = False
+        
+        def launch():
+            name = remaining.pop(0)
+            future = self._executor.submit(
+                self.providers[name].invoke, input, config, **kwargs
+            )
+            pending[future] = (name, time.perf_counter())
+        
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if remaining and not hedged and self._may_hedge():
+                    name, started = next(iter(pending.values()))
+                    timeout = max(
+                        0.0, self.hedge_delay(name) - (time.perf_counter() - started)
+                    )
+                
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    LLM_HEDGES.inc(provider=remaining[0])
+                    self.logger.info(
+                        f"Primary slower than p{self.hedge_percentile * 100:.0f}, "
+                        f"hedging to {remaining[0]}"
+                    )
+                    launch()
+                    continue
+                
+                for future in done:
+                    name, started = pending.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        self.stats[name].record(time.perf_counter() - started)
+                        return future.result()
+                    self.stats[name].record(error=True)
+                    self.logger.warning(f"Provider {name} failed: {str(error)}")
+                    last_error = error
+                
+                if not pending and remaining:
+                    LLM_FAILOVERS.inc(provider=remaining[0])
+                    self.logger.info(f"Failing over to {remaining[0]}")
+                    launch()
+            raise last_error
+        finally:
+            self._abandon(pending)
+            self._finish_call(hedged)
+    
+    async def ainvoke(
+        self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs
+    ):
+        """
+        Asynchronously invoke the providers with hedging and failover.
+        
+        Args:
+            input: Input passed to the provider runnables
+            config: Optional runnable config (callbacks, tags, ...)
+            **kwargs: Additional parameters passed to the providers
+            
+        Returns:
+            The first successful response
+        """
+        remaining = self.ranked_providers()
+        pending = {}
+        last_error = None
+        hedged = False
+        
+        def launch():
+            name = remaining.pop(0)
+            task = asyncio.ensure_future(
+                self.providers[name].ainvoke(input, config, **kwargs)
+            )
+            pending[task] = (name, time.perf_counter())
+        
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if remaining and not hedged and self._may_hedge():
+                    name, started = next(iter(pending.values()))
+                    timeout = max(
+                        0.0, self.hedge_delay(name) - (time.perf_counter() - started)
+                    )
+                
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    LLM_HEDGES.inc(provider=remaining[0])
+                    self.logger.info(
+                        f"Primary slower than p{self.hedge_percentile * 100:.0f}, "
+                        f"hedging to {remaining[0]}"
+                    )
+                    launch()
+                    continue
+                
+                for task in done:
+                    name, started = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        self.stats[name].record(time.perf_counter() - started)
+                        return task.result()
+                    self.stats[name].record(error=True)
+                    self.logger.warning(f"Provider {name} failed: {str(error)}")
+                    last_error = error
+                
+                if not pending and remaining:
+                    LLM_FAILOVERS.inc(provider=remaining[0])
+                    self.logger.info(f"Failing over to {remaining[0]}")
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            self._abandon(pending)
+            self._finish_call(hedged)
+    
+    def _abandon(self, pending: Dict[Any, Tuple[str, float]]) -> None:
+        """Record losing calls' elapsed time, a lower bound on their latency"""
+        now = time.perf_counter()
+        for name, started in pending.values():
+            self.stats[name].record(now - started)
+    
+    def provider_stats(self) -> Dict[str, Any]:
+        """Per-provider statistics, current ranking and hedge rate"""
+        with self._lock:
+            hedge_rate = sum(self._hedged) / len(self._hedged) if self._hedged else 0.0
+        return {
+            "providers": {name: stats.to_dict() for name, stats in self.stats.items()},
+            "ranking": self.ranked_providers(),
+            "hedge_rate": round(hedge_rate, 4),
+        }
@@ -1,47 +1,213 @@
 # Built-in imports
+import atexit
+import json
 import logging
-from typing import Dict
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# Local imports
+from config.settings import config
 
 # Store logger instances
 _loggers: Dict[str, logging.Logger] = {}
 
+# Records waiting for the background writer; a full queue drops records instead of
+# blocking
+LOG_QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None)))
+_RECORD_ATTRIBUTES |= {"message", "asctime"}
+
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+_listener: Optional[QueueListener] = None
+# Writes straight to stderr once the pipeline is shut down
+_direct_handler: Optional[logging.Handler] = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format; a sampled payload is appended as JSON"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if hasattr(record, "payload"):
+            text += f" {json.dumps(record.payload, default=str)}"
+        return text
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the caller.
+
+    Records are formatted by the background writer thread rather than in
+    the caller, and are dropped (and counted) if the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records stay in-process, so formatting is left to the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _start_pipeline() -> logging.Handler:
+    """Create the shared queue handler and start the background writer thread"""
+    global _queue_handler, _listener
+
+    with _setup_lock:
+        if _queue_handler is None:
+            stream_handler = logging.StreamHandler(sys.stderr)
+            stream_handler.setFormatter(
+                JsonFormatter() if config.log_format == "json" else TextFormatter()
+            )
+
+            log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            _listener = QueueListener(log_queue, stream_handler)
+            _listener.start()
+            atexit.register(shutdown_logging)
+            _queue_handler = NonBlockingQueueHandler(log_queue)
+
+    return _direct_handler or _queue_handler
+
+
+def configure_root_logger() -> None:
+    """Replace the root logger's handlers with the non-blocking pipeline"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_start_pipeline())
+    root.setLevel(config.log_level)
+
+
+def shutdown_logging() -> None:
+    """
+    Write out queued records and stop the background writer thread
+
+    Loggers are switched to writing directly to stderr, so records logged
+    afterwards (lifespan teardown, atexit handlers) are not queued and lost.
+    """
+    global _listener, _direct_handler
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _direct_handler = _listener.handlers[0]
+        _listener = None
+
+        loggers = [logging.getLogger()] + [
+            logger
+            for logger in logging.Logger.manager.loggerDict.values()
+            if isinstance(logger, logging.Logger)
+        ]
+        for logger in loggers:
+            if _queue_handler in logger.handlers:
+                logger.removeHandler(_queue_handler)
+                logger.addHandler(_direct_handler)
+
+
+def dropped_log_records() -> int:
+    """Number of records dropped because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
 def setup_logger(name: str) -> logging.Logger:
     """
     Configure and return a logger with consistent formatting.
     Ensures only one logger instance exists per name.
-    
+
+    Records are handed to a queue and written by a background thread, as
+    JSON lines by default (LOG_FORMAT=text for the plain format).
+
     Args:
         name (str): Name of the logger, typically __name__ from calling module
-        
+
     Returns:
         logging.Logger: Configured logger instance
     """
     # If logger already exists, return it
     if name in _loggers:
         return _loggers[name]
-    
+
     # Create logger
     logger = logging.getLogger(name)
-    
+
     # Only configure if it hasn't been configured before
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Create handler and set level
-        handler = logging.StreamHandler()
-        handler.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        
-        # Add handler to logger
-        logger.addHandler(handler)
-        
+        logger.setLevel(config.log_level)
+
+        # Add the shared non-blocking handler
+        logger.addHandler(_start_pipeline())
+
         # Prevent propagation to root logger to avoid duplicate logs
         logger.propagate = False
-    
+
     # Store logger instance
     _loggers[name] = logger
-    
-    return logger
\ No newline at end of file
+
+    return logger
+
+
+def log_payload(
+    logger: logging.Logger,
+    message: str,
+    payload: Any,
+    level: int = logging.INFO,
+    sample_rate: Optional[float] = None
+) -> None:
+    """
+    Log a large payload for a sample of calls.
+
+    Nothing is done unless the level is enabled and the call is sampled;
+    the payload is serialized by the writer thread, so it must not be
+    mutated after logging.
+
+    Args:
+        logger: Logger to write to
+        message: Log message
+        payload: JSON-serializable payload attached to the record
+        level: Log level
+        sample_rate: Fraction of calls logged (defaults to LOG_SAMPLE_RATE)
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    rate = config.log_sample_rate if sample_rate is None else sample_rate
+    if rate < 1 and random.random() >= rate:
+        return
+
+    logger.log(level, message, extra={"payload": payload, "sample_rate": rate})
@@ -0,0 +1,331 @@
+# Built-in imports
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+# Third-party imports
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Default latency buckets in seconds, sized for LLM calls that take up to a minute
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _format_labels(
+    labelnames: Sequence[str], values: Tuple[str, ...], extra: str = ""
+) -> str:
+    """Render a Prometheus label set"""
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """Increase the counter for the given label values"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        """Render the counter in Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(
+                    f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                )
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation for the given label values"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        """Render the histogram in Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Create and register a counter"""
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram"""
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Default registry for the AI service
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "path", "status"],
+)
+LLM_CALL_LATENCY = registry.histogram(
+    "llm_call_duration_seconds", "Latency of individual LLM calls", ["model"]
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens used by LLM calls", ["model", "type"]
+)
+LLM_RETRIES = registry.counter(
+    "llm_retries_total", "LLM calls retried after an error", ["model"]
+)
+LLM_FAILURES = registry.counter(
+    "llm_failures_total", "LLM calls that raised an error", ["model"]
+)
+LLM_BREAKER_TRANSITIONS = registry.counter(
+    "llm_circuit_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ["model", "state"],
+)
+LLM_BREAKER_REJECTIONS = registry.counter(
+    "llm_circuit_breaker_rejections_total",
+    "LLM calls rejected while the circuit was open",
+    ["model"],
+)
+LLM_HEDGES = registry.counter(
+    "llm_hedges_total",
+    "Hedge requests sent to a secondary provider after a slow primary",
+    ["provider"],
+)
+LLM_FAILOVERS = registry.counter(
+    "llm_failovers_total",
+    "Requests sent to another provider after an error",
+    ["provider"],
+)
+TRACES = registry.counter(
+    "langfuse_traces_total",
+    "Traces by outcome: exported, sampled_out, dropped, failed or abandoned",
+    ["outcome"],
+)
+AGENT_STEPS = registry.histogram(
+    "report_llm_round_trips", "LLM round trips needed per generated report", ["mode"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+)
+TOOL_LATENCY = registry.histogram(
+    "tool_execution_duration_seconds", "Tool execution time", ["tool"],
+    buckets=(0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+REPORTS = registry.counter(
+    "reports_total", "Report generations by mode and outcome", ["mode", "outcome"]
+)
+CACHE_LOOKUPS = registry.counter(
+    "cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+ADMISSIONS = registry.counter(
+    "http_admissions_total",
+    "API requests by admission outcome: admitted, client_rate_limited, "
+    "global_rate_limited or shed",
+    ["outcome"],
+)
+ADMISSION_WAIT = registry.histogram(
+    "http_admission_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+MEAL_PLAN_FIXES = registry.counter(
+    "meal_plan_fixes_total",
+    "Meal plan dietary violations fixed, by action: substituted, regenerated or "
+    "removed",
+    ["action"],
+)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler recording LLM and tool metrics"""
+
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> (start time, model or tool name)
+        self._runs: Dict[UUID, Tuple[float, str]] = {}
+
+    @staticmethod
+    def _model_name(kwargs: Dict[str, Any]) -> str:
+        metadata = kwargs.get("metadata") or {}
+        params = kwargs.get("invocation_params") or {}
+        return (
+            metadata.get("ls_model_name")
+            or params.get("model_name")
+            or params.get("model")
+            or "unknown"
+        )
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Start timing a chat model call"""
+        self._runs[run_id] = (time.perf_counter(), self._model_name(kwargs))
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Start timing a completion model call"""
+        self._runs[run_id] = (time.perf_counter(), self._model_name(kwargs))
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record latency and token usage of a finished LLM call"""
+        start, model = self._runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            LLM_CALL_LATENCY.observe(time.perf_counter() - start, model=model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    LLM_TOKENS.inc(
+                        usage.get("input_tokens", 0), model=model, type="prompt"
+                    )
+                    LLM_TOKENS.inc(
+                        usage.get("output_tokens", 0), model=model, type="completion"
+                    )
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Record a failed LLM call"""
+        _, model = self._runs.pop(run_id, (None, "unknown"))
+        LLM_FAILURES.inc(model=model)
+
+    def on_tool_start(
+        self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Start timing a tool call"""
+        self._runs[run_id] = (
+            time.perf_counter(),
+            (serialized or {}).get("name", "unknown"),
+        )
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the execution time of a finished tool call"""
+        start, tool = self._runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            TOOL_LATENCY.observe(time.perf_counter() - start, tool=tool)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Forget a failed tool call"""
+        self._runs.pop(run_id, None)
+
+
+# Shared handler attached to every report generation
+metrics_callback = MetricsCallbackHandler()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                path=path,
+                status=status or 500,
+            )
@@ -2,7 +2,6 @@ import os
 from typing import Dict, List, Optional, Union, Any
 from dotenv import load_dotenv
 from pathlib import Path
-from langfuse.callback import CallbackHandler
 
 
 class Config:
@@ -54,6 +53,24 @@ class Config:
         self._timeout = None
         self._max_retries = 2
         
+        # Circuit breaker shared by all calls to the same model
+        # Consecutive failures before opening
+        self._breaker_failure_threshold = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        # Seconds before a probe
+        self._breaker_recovery_timeout = float(
+            os.getenv("LLM_BREAKER_RECOVERY_TIMEOUT", "30")
+        )
+        
+        # Multi-provider hedging (OpenAI primary, Gemini secondary)
+        self._llm_hedging = (
+            os.getenv("LLM_HEDGING", "False").lower() in ("true", "1", "t")
+        )
+        self._hedge_model_name = os.getenv("LLM_HEDGE_MODEL", "gemini-1.5-flash")
+        # Primary latency percentile before hedging
+        self._hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+        # Share of calls allowed to hedge
+        self._hedge_max_ratio = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))
+        
         # Pinecone Configuration
         self._pinecone_environment = os.getenv("PINECONE_ENVIRONMENT")
         self._pinecone_index_name = os.getenv("PINECONE_INDEX_NAME", "intellibus-kids-index")
@@ -61,6 +78,9 @@ class Config:
         # Debug settings
         self._debug = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
         self._log_level = os.getenv("LOG_LEVEL", "INFO")
+        self._log_format = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+        # Share of request/report payloads logged
+        self._log_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
         
         # System Prompts
         self._default_system_prompt = """
@@ -73,18 +93,74 @@ class Config:
         
         # API Configuration
         self._cors_origins = os.getenv("CORS_ORIGINS", "*").split(",")
-        self._api_rate_limit = int(os.getenv("API_RATE_LIMIT", "100"))  # Requests per minute
+        # Requests per minute per client
+        self._api_rate_limit = int(os.getenv("API_RATE_LIMIT", "100"))
+        # Requests per minute for all clients
+        self._api_global_rate_limit = int(os.getenv("API_GLOBAL_RATE_LIMIT", "1000"))
+        # Seconds of rate allowed in a burst
+        self._api_rate_limit_burst_seconds = float(
+            os.getenv("API_RATE_LIMIT_BURST_SECONDS", "10")
+        )
+        # Concurrent non-GET API requests per worker
+        self._api_max_in_flight = int(os.getenv("API_MAX_IN_FLIGHT", "64"))
+        # Seconds a request may wait for a slot before 503
+        self._api_queue_timeout = float(os.getenv("API_QUEUE_TIMEOUT", "5"))
+        
+        # Report generation
+        # In-flight reports per worker
+        self._report_max_concurrency = int(os.getenv("REPORT_MAX_CONCURRENCY", "32"))
+        # Reports in flight per batch
+        self._report_batch_concurrency = int(os.getenv("REPORT_BATCH_CONCURRENCY", "8"))
+        self._report_batch_max_size = int(os.getenv("REPORT_BATCH_MAX_SIZE", "500"))
+        # "agent", "single_shot" or "fan_out"
+        self._report_generation_mode = os.getenv("REPORT_GENERATION_MODE", "agent")
+        # Seconds a cached profile stays valid
+        self._report_cache_ttl = int(os.getenv("REPORT_CACHE_TTL", "86400"))
+        self._report_cache_max_size = int(os.getenv("REPORT_CACHE_MAX_SIZE", "1024"))
+        # Condition definitions; packaged config/conditions.json when unset
+        self._conditions_file = os.getenv("CONDITIONS_FILE")
+        # Allergen lexicon; packaged config/diet_lexicon.json when unset
+        self._diet_lexicon_file = os.getenv("DIET_LEXICON_FILE")
+        # Shopping-list lexicon; packaged config/food_lexicon.json when unset
+        self._food_lexicon_file = os.getenv("FOOD_LEXICON_FILE")
+        
+        # Report job queue
+        self._report_job_workers = int(os.getenv("REPORT_JOB_WORKERS", "4"))
+        self._report_job_db_path = os.getenv(
+            "REPORT_JOB_DB_PATH", "report_jobs.sqlite3"
+        )
+        # Seconds finished jobs are kept
+        self._report_job_ttl = int(os.getenv("REPORT_JOB_TTL", "86400"))
+        # Seconds a running job stays claimed by its process without a heartbeat
+        self._report_job_lease = int(os.getenv("REPORT_JOB_LEASE", "60"))
+        
+        # Idempotency-Key responses
+        self._idempotency_db_path = os.getenv(
+            "IDEMPOTENCY_DB_PATH", "idempotency.sqlite3"
+        )
+        # Seconds a finished response is replayed
+        self._idempotency_ttl = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+        
+        # Approved meal-plan library
+        self._plan_library_db_path = os.getenv(
+            "PLAN_LIBRARY_DB_PATH", "approved_plans.sqlite3"
+        )
+        # Dietary profile similarity needed to reuse a plan
+        self._plan_library_min_similarity = float(
+            os.getenv("PLAN_LIBRARY_MIN_SIMILARITY", "0.5")
+        )
         
-        # Initialize Langfuse handler if keys are available
+        # Langfuse trace sampling and export
+        # Head-sampled share of traces
+        self._langfuse_sample_rate = float(os.getenv("LANGFUSE_SAMPLE_RATE", "0.05"))
+        # Slower traces are always kept
+        self._langfuse_slow_seconds = float(os.getenv("LANGFUSE_SLOW_SECONDS", "20"))
+        # Traces waiting for export
+        self._langfuse_buffer_size = int(os.getenv("LANGFUSE_BUFFER_SIZE", "1000"))
+        
+        # Langfuse handler is created on first use; importing langfuse is slow
         self._langfuse_handler = None
-        if self._langfuse_public_key and self._langfuse_secret_key:
-            try:
-                self._langfuse_handler = CallbackHandler(
-                    public_key=self._langfuse_public_key,
-                    secret_key=self._langfuse_secret_key
-                )
-            except Exception as e:
-                print(f"Failed to initialize Langfuse handler: {str(e)}")
+        self._langfuse_handler_loaded = False
         
         self._initialized = True
     
@@ -176,6 +252,48 @@ class Config:
             raise ValueError("Max retries must be non-negative")
         self._max_retries = value
     
+    @property
+    def breaker_failure_threshold(self) -> int:
+        """Get consecutive LLM failures that open the circuit breaker."""
+        return self._breaker_failure_threshold
+    
+    @property
+    def breaker_recovery_timeout(self) -> float:
+        """Get seconds an open circuit breaker waits before probing the provider."""
+        return self._breaker_recovery_timeout
+    
+    @property
+    def llm_hedging(self) -> bool:
+        """Get whether slow or failed LLM calls are hedged to a second provider."""
+        return self._llm_hedging
+    
+    @llm_hedging.setter
+    def llm_hedging(self, value: bool) -> None:
+        """Set whether slow or failed LLM calls are hedged to a second provider."""
+        self._llm_hedging = value
+    
+    @property
+    def hedge_model_name(self) -> str:
+        """Get model name of the secondary (Gemini) provider."""
+        return self._hedge_model_name
+    
+    @property
+    def hedge_percentile(self) -> float:
+        """Get primary latency percentile after which a hedge request is sent."""
+        return self._hedge_percentile
+    
+    @hedge_percentile.setter
+    def hedge_percentile(self, value: float) -> None:
+        """Set primary latency percentile after which a hedge request is sent."""
+        if not 0 < value < 1:
+            raise ValueError("Hedge percentile must be between 0 and 1")
+        self._hedge_percentile = value
+    
+    @property
+    def hedge_max_ratio(self) -> float:
+        """Get maximum share of calls that may send a hedge request."""
+        return self._hedge_max_ratio
+    
     # Pinecone Configuration properties
     @property
     def pinecone_environment(self) -> Optional[str]:
@@ -211,6 +329,23 @@ class Config:
             raise ValueError(f"Log level must be one of {valid_levels}")
         self._log_level = value
     
+    @property
+    def log_format(self) -> str:
+        """Get log output format."""
+        return self._log_format
+    
+    @property
+    def log_sample_rate(self) -> float:
+        """Get share of request and report payloads that are logged."""
+        return self._log_sample_rate
+    
+    @log_sample_rate.setter
+    def log_sample_rate(self, value: float) -> None:
+        """Set share of request and report payloads that are logged."""
+        if not 0 <= value <= 1:
+            raise ValueError("Log sample rate must be between 0 and 1")
+        self._log_sample_rate = value
+    
     # System Prompts properties
     @property
     def default_system_prompt(self) -> str:
@@ -230,20 +365,187 @@ class Config:
     
     @property
     def api_rate_limit(self) -> int:
-        """Get API rate limit."""
+        """Get API rate limit per client in requests per minute."""
         return self._api_rate_limit
     
+    @property
+    def api_global_rate_limit(self) -> int:
+        """Get API rate limit for all clients in requests per minute."""
+        return self._api_global_rate_limit
+    
+    @property
+    def api_rate_limit_burst_seconds(self) -> float:
+        """Get seconds of the rate limit a client may use in one burst."""
+        return self._api_rate_limit_burst_seconds
+    
+    @property
+    def api_max_in_flight(self) -> int:
+        """Get maximum number of concurrent non-GET API requests."""
+        return self._api_max_in_flight
+    
+    @property
+    def api_queue_timeout(self) -> float:
+        """Get seconds a request may wait for a concurrency slot."""
+        return self._api_queue_timeout
+    
+    # Report generation properties
+    @property
+    def report_max_concurrency(self) -> int:
+        """Get maximum number of reports generated concurrently."""
+        return self._report_max_concurrency
+    
+    @report_max_concurrency.setter
+    def report_max_concurrency(self, value: int) -> None:
+        """Set maximum number of reports generated concurrently."""
+        if value < 1:
+            raise ValueError("Report max concurrency must be at least 1")
+        self._report_max_concurrency = value
+    
+    @property
+    def report_batch_concurrency(self) -> int:
+        """Get default number of reports generated concurrently per batch."""
+        return self._report_batch_concurrency
+    
+    @property
+    def report_batch_max_size(self) -> int:
+        """Get maximum number of patients per batch request."""
+        return self._report_batch_max_size
+    
+    @property
+    def report_generation_mode(self) -> str:
+        """Get default report generation mode."""
+        return self._report_generation_mode
+    
+    @report_generation_mode.setter
+    def report_generation_mode(self, value: str) -> None:
+        """Set default report generation mode."""
+        valid_modes = ["agent", "single_shot", "fan_out"]
+        if value not in valid_modes:
+            raise ValueError(f"Report generation mode must be one of {valid_modes}")
+        self._report_generation_mode = value
+    
+    @property
+    def report_cache_ttl(self) -> int:
+        """Get seconds a cached report profile stays valid."""
+        return self._report_cache_ttl
+    
+    @property
+    def report_cache_max_size(self) -> int:
+        """Get maximum number of cached report profiles."""
+        return self._report_cache_max_size
+    
+    @property
+    def conditions_file(self) -> Optional[str]:
+        """Get path of the condition definitions file (None for the packaged file)."""
+        return self._conditions_file
+    
+    @property
+    def diet_lexicon_file(self) -> Optional[str]:
+        """Get path of the allergen and restriction lexicon (None for packaged file)."""
+        return self._diet_lexicon_file
+    
+    @property
+    def food_lexicon_file(self) -> Optional[str]:
+        """Get path of the shopping-list food lexicon (None for the packaged file)."""
+        return self._food_lexicon_file
+    
+    # Report job queue properties
+    @property
+    def report_job_workers(self) -> int:
+        """Get number of report job workers."""
+        return self._report_job_workers
+    
+    @property
+    def report_job_db_path(self) -> str:
+        """Get path of the report job database."""
+        return self._report_job_db_path
+    
+    @property
+    def report_job_ttl(self) -> int:
+        """Get seconds finished report jobs are kept."""
+        return self._report_job_ttl
+    
+    @property
+    def report_job_lease(self) -> int:
+        """Get seconds a running report job stays claimed without a heartbeat."""
+        return self._report_job_lease
+    
+    # Idempotency properties
+    @property
+    def idempotency_db_path(self) -> str:
+        """Get path of the idempotent response database."""
+        return self._idempotency_db_path
+    
+    @property
+    def idempotency_ttl(self) -> int:
+        """Get seconds a response stored under an Idempotency-Key is replayed."""
+        return self._idempotency_ttl
+    
+    # Approved meal-plan library properties
+    @property
+    def plan_library_db_path(self) -> str:
+        """Get path of the approved meal-plan library database."""
+        return self._plan_library_db_path
+    
+    @property
+    def plan_library_min_similarity(self) -> float:
+        """Get minimum dietary profile similarity for reusing an approved plan."""
+        return self._plan_library_min_similarity
+    
     # Add Langfuse handler property
+    @property
+    def langfuse_sample_rate(self) -> float:
+        """Get share of traces sent to Langfuse regardless of outcome."""
+        return self._langfuse_sample_rate
+    
+    @property
+    def langfuse_slow_seconds(self) -> float:
+        """Get duration above which a trace is always sent to Langfuse."""
+        return self._langfuse_slow_seconds
+    
+    @property
+    def langfuse_buffer_size(self) -> int:
+        """Get maximum number of traces waiting for export."""
+        return self._langfuse_buffer_size
+    
     @property
     def langfuse_handler(self):
-        """Get Langfuse callback handler."""
+        """
+        Get the sampled Langfuse callback handler, initialized on first access if keys
+        are available.
+        
+        Traces are sampled and exported by a background thread (see config.tracing).
+        """
+        if not self._langfuse_handler_loaded:
+            self._langfuse_handler_loaded = True
+            if self._langfuse_public_key and self._langfuse_secret_key:
+                try:
+                    from langfuse.callback import CallbackHandler
+                    from config.tracing import SampledTraceHandler
+                    
+                    self._langfuse_handler = SampledTraceHandler(
+                        exporter=CallbackHandler(
+                            public_key=self._langfuse_public_key,
+                            secret_key=self._langfuse_secret_key
+                        ),
+                        sample_rate=self._langfuse_sample_rate,
+                        slow_seconds=self._langfuse_slow_seconds,
+                        buffer_size=self._langfuse_buffer_size
+                    )
+                except Exception as e:
+                    print(f"Failed to initialize Langfuse handler: {str(e)}")
         return self._langfuse_handler
     
     def flush_langfuse(self):
-        """Flush Langfuse events."""
+        """Request a background flush of Langfuse events; does not block."""
         if self._langfuse_handler:
             self._langfuse_handler.flush()
     
+    def shutdown_langfuse(self, timeout: float = 5.0):
+        """Export pending traces and stop the Langfuse export thread."""
+        if self._langfuse_handler:
+            self._langfuse_handler.shutdown(timeout)
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert configuration to dictionary.
@@ -262,12 +564,44 @@ class Config:
             "max_tokens": self._max_tokens,
             "timeout": self._timeout,
             "max_retries": self._max_retries,
+            "breaker_failure_threshold": self._breaker_failure_threshold,
+            "breaker_recovery_timeout": self._breaker_recovery_timeout,
+            "llm_hedging": self._llm_hedging,
+            "hedge_model_name": self._hedge_model_name,
+            "hedge_percentile": self._hedge_percentile,
+            "hedge_max_ratio": self._hedge_max_ratio,
             "pinecone_environment": self._pinecone_environment,
             "pinecone_index_name": self._pinecone_index_name,
             "debug": self._debug,
             "log_level": self._log_level,
+            "log_format": self._log_format,
+            "log_sample_rate": self._log_sample_rate,
+            "langfuse_sample_rate": self._langfuse_sample_rate,
+            "langfuse_slow_seconds": self._langfuse_slow_seconds,
+            "langfuse_buffer_size": self._langfuse_buffer_size,
             "cors_origins": self._cors_origins,
-            "api_rate_limit": self._api_rate_limit
+            "api_rate_limit": self._api_rate_limit,
+            "api_global_rate_limit": self._api_global_rate_limit,
+            "api_rate_limit_burst_seconds": self._api_rate_limit_burst_seconds,
+            "api_max_in_flight": self._api_max_in_flight,
+            "api_queue_timeout": self._api_queue_timeout,
+            "report_max_concurrency": self._report_max_concurrency,
+            "report_batch_concurrency": self._report_batch_concurrency,
+            "report_batch_max_size": self._report_batch_max_size,
+            "report_generation_mode": self._report_generation_mode,
+            "report_cache_ttl": self._report_cache_ttl,
+            "report_cache_max_size": self._report_cache_max_size,
+            "conditions_file": self._conditions_file,
+            "diet_lexicon_file": self._diet_lexicon_file,
+            "food_lexicon_file": self._food_lexicon_file,
+            "report_job_workers": self._report_job_workers,
+            "report_job_db_path": self._report_job_db_path,
+            "report_job_ttl": self._report_job_ttl,
+            "report_job_lease": self._report_job_lease,
+            "idempotency_db_path": self._idempotency_db_path,
+            "idempotency_ttl": self._idempotency_ttl,
+            "plan_library_db_path": self._plan_library_db_path,
+            "plan_library_min_similarity": self._plan_library_min_similarity
         }
     
     def validate(self) -> List[str]:
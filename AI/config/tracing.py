@@ -0,0 +1,287 @@
+# Built-in imports
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Set, Tuple
+from uuid import UUID
+
+# Third-party imports
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Local imports
+from config.logging_info import setup_logger
+from config.metrics import TRACES
+
+# Set up logger
+logger = setup_logger("tracing")
+
+# Callback events buffered and replayed onto the exporting handler
+START_EVENTS = (
+    "on_chain_start", "on_llm_start", "on_chat_model_start", "on_tool_start",
+    "on_retriever_start",
+)
+END_EVENTS = (
+    "on_chain_end", "on_llm_end", "on_tool_end", "on_retriever_end",
+)
+ERROR_EVENTS = (
+    "on_chain_error", "on_llm_error", "on_tool_error", "on_retriever_error",
+)
+OTHER_EVENTS = (
+    "on_agent_action", "on_agent_finish", "on_text", "on_retry",
+)
+# Only each LLM run's first token is kept; Langfuse uses it for time to first token
+TOKEN_EVENT = "on_llm_new_token"
+
+# Events kept per trace; a runaway agent loop is truncated rather than buffered
+# without bound
+MAX_EVENTS_PER_TRACE = 2000
+
+# Traces whose root never finishes (e.g. cancelled requests) are discarded after
+# this many seconds
+STALE_TRACE_SECONDS = 600
+
+
+class _Trace:
+    """Buffered callback events of one root run"""
+
+    __slots__ = (
+        "started", "sampled", "error", "events", "truncated", "runs", "first_tokens",
+    )
+
+    def __init__(self, sampled: bool):
+        self.started = time.monotonic()
+        self.sampled = sampled
+        self.error = False
+        # (event, args, kwargs, wall-clock time the callback fired)
+        self.events: List[Tuple[str, tuple, Dict[str, Any], float]] = []
+        self.truncated = False
+        self.runs: List[UUID] = []
+        self.first_tokens: Set[UUID] = set()
+
+
+class SampledTraceHandler(BaseCallbackHandler):
+    """
+    Callback handler that samples whole traces and exports them in the background.
+
+    Events are buffered per root run in the caller, which costs a list append,
+    with the time they fired; they are replayed with that time, so exported
+    spans keep their real start, end and time to first token.
+    When the root run finishes, the trace is kept if it was head-sampled, raised
+    an error anywhere, or was slower than the slow threshold. Kept traces go to
+    a bounded queue; a background thread replays them onto the exporting handler
+    (the Langfuse CallbackHandler). When the queue is full, traces are dropped
+    and counted, so a slow tracing backend never slows down generation.
+    """
+
+    run_inline = True
+
+    def __init__(
+        self,
+        exporter: Any,
+        sample_rate: float,
+        slow_seconds: float,
+        buffer_size: int
+    ):
+        """
+        Initialize the handler and start the export thread
+
+        Args:
+            exporter: Callback handler the kept traces are replayed onto
+            sample_rate: Share of traces kept regardless of outcome
+            slow_seconds: Traces at least this slow are always kept
+            buffer_size: Maximum kept traces waiting for export
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self._traces: Dict[UUID, _Trace] = {}
+        self._roots: Dict[UUID, UUID] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._flush_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._export_loop, name="trace-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def _record(self, event: str, args: tuple, kwargs: Dict[str, Any]) -> None:
+        """Buffer one callback event under its root run"""
+        recorded = time.time()
+        run_id = kwargs["run_id"]
+        parent_run_id = kwargs.get("parent_run_id")
+
+        with self._lock:
+            if event in START_EVENTS:
+                root_id = self._roots.get(parent_run_id) if parent_run_id else None
+                if root_id is None:
+                    root_id = run_id
+                    self._prune_stale()
+                    self._traces[root_id] = _Trace(
+                        sampled=random.random() < self.sample_rate
+                    )
+                self._roots[run_id] = root_id
+                if root_id in self._traces:
+                    self._traces[root_id].runs.append(run_id)
+            else:
+                root_id = self._roots.get(run_id)
+
+            trace = self._traces.get(root_id) if root_id else None
+            if trace is None:
+                return
+
+            if event == TOKEN_EVENT:
+                if run_id in trace.first_tokens:
+                    return
+                trace.first_tokens.add(run_id)
+            if event in ERROR_EVENTS:
+                trace.error = True
+            if len(trace.events) < MAX_EVENTS_PER_TRACE:
+                trace.events.append((event, args, kwargs, recorded))
+            else:
+                trace.truncated = True
+
+            if run_id != root_id or event not in END_EVENTS + ERROR_EVENTS:
+                return
+
+            # Root run finished: decide whether to keep the trace
+            del self._traces[root_id]
+            for run in trace.runs:
+                self._roots.pop(run, None)
+
+        duration = time.monotonic() - trace.started
+        if not (trace.sampled or trace.error or duration >= self.slow_seconds):
+            TRACES.inc(outcome="sampled_out")
+            return
+
+        if trace.truncated:
+            logger.warning(
+                f"Trace {root_id} truncated to {MAX_EVENTS_PER_TRACE} events"
+            )
+        try:
+            self._queue.put_nowait(trace.events)
+        except queue.Full:
+            TRACES.inc(outcome="dropped")
+
+    def _prune_stale(self) -> None:
+        """Discard traces whose root run never finished; caller holds the lock"""
+        cutoff = time.monotonic() - STALE_TRACE_SECONDS
+        stale = [
+            root_id for root_id, trace in self._traces.items() if trace.started < cutoff
+        ]
+        for root_id in stale:
+            for run in self._traces.pop(root_id).runs:
+                self._roots.pop(run, None)
+            TRACES.inc(outcome="abandoned")
+
+    def _export_loop(self) -> None:
+        """Replay kept traces onto the exporter until shut down"""
+        while True:
+            try:
+                events = self._queue.get(timeout=1)
+            except queue.Empty:
+                events = None
+
+            if events is not None:
+                self._export(events)
+                self._queue.task_done()
+
+            if self._flush_requested.is_set() and self._queue.empty():
+                self._flush_requested.clear()
+                self._flush_exporter()
+
+            if events is None and self._stopping.is_set():
+                return
+
+    def _export(self, events: List[Tuple[str, tuple, Dict[str, Any], float]]) -> None:
+        """Replay one trace's events onto the exporter at their recorded times"""
+        try:
+            for event, args, kwargs, recorded in events:
+                method = getattr(self.exporter, event, None)
+                if method is None:
+                    continue
+                # An ended run is dropped from the exporter's runs, so look it up first
+                observation = self._observation(kwargs["run_id"])
+                method(*args, **kwargs)
+                self._stamp(event, kwargs["run_id"], observation, recorded)
+            TRACES.inc(outcome="exported")
+        except Exception as e:
+            TRACES.inc(outcome="failed")
+            logger.warning(f"Failed to export trace: {str(e)}")
+
+    def _observation(self, run_id: UUID) -> Any:
+        """The exporter's span or generation for a run, if it has one"""
+        runs = getattr(self.exporter, "runs", None)
+        return runs.get(run_id) if isinstance(runs, dict) else None
+
+    def _stamp(
+        self, event: str, run_id: UUID, observation: Any, recorded: float
+    ) -> None:
+        """
+        Correct a replayed event's timestamp to the time it was recorded
+
+        The Langfuse CallbackHandler stamps spans, generations and their ends
+        with the current time, so replayed later every span would get the
+        export time and a near-zero duration. The recorded time is set
+        afterwards through the public update() of the span, generation or
+        trace the event created or ended.
+        """
+        timestamp = datetime.fromtimestamp(recorded, timezone.utc)
+        if event in START_EVENTS:
+            observation = self._observation(run_id)
+            if observation is not None:
+                observation.update(start_time=timestamp)
+            # The root run also opens the trace, which is named after it
+            trace = getattr(self.exporter, "trace", None)
+            if trace is not None and trace.id == str(run_id):
+                trace.update(timestamp=timestamp)
+        elif observation is None:
+            return
+        elif event in END_EVENTS + ERROR_EVENTS:
+            observation.update(end_time=timestamp)
+        elif event == TOKEN_EVENT:
+            observation.update(completion_start_time=timestamp)
+
+    def _flush_exporter(self) -> None:
+        flush = getattr(self.exporter, "flush", None)
+        if flush is None:
+            return
+        try:
+            flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush traces: {str(e)}")
+
+    def flush(self) -> None:
+        """Ask the export thread to flush the queued traces; does not block"""
+        self._flush_requested.set()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Export queued traces, flush the exporter and stop the export thread
+
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        self._flush_requested.set()
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(
+                f"Trace export did not finish within {timeout}s; "
+                f"{self._queue.qsize()} traces pending"
+            )
+
+
+def _make_recorder(event: str):
+    def record(self: SampledTraceHandler, *args: Any, **kwargs: Any) -> None:
+        self._record(event, args, kwargs)
+
+    record.__name__ = event
+    record.__doc__ = f"Buffer a {event} event"
+    return record
+
+
+for _event in START_EVENTS + END_EVENTS + ERROR_EVENTS + OTHER_EVENTS + (TOKEN_EVENT,):
+    setattr(SampledTraceHandler, _event, _make_recorder(_event))
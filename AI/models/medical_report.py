@@ -1,5 +1,8 @@
 from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
+
+from models.report import Ingredients
 
 class MedicalReport(BaseModel):
     """Pydantic model for structured medical report response"""
@@ -33,4 +36,39 @@ class MedicalReport(BaseModel):
     meal_plan: Optional[Dict[str, List[Dict[str, str]]]] = Field(
         description="Meal plan for the specified number of days based on condition and preferences",
         default=None,
-    ) 
\ No newline at end of file
+    )
+    # Shopping list aggregated from the meal plan by the service, never by the LLM
+    ingredients: SkipJsonSchema[Optional[Ingredients]] = Field(
+        description="Ingredients needed for the meal plan, by category, "
+                    "with summed quantities",
+        default=None,
+    )
+
+
+class ReplacementMeal(BaseModel):
+    """Pydantic model for a single meal regenerated to meet dietary constraints"""
+    meal: Dict[str, str] = Field(
+        description="The replacement meal, with the same keys as the original meal"
+    )
+
+
+class PlannedDay(BaseModel):
+    """Pydantic model for the outline of one meal-plan day"""
+    theme: str = Field(description="Short theme or cuisine for the day")
+    main_foods: List[str] = Field(
+        description="Main proteins and grains of the day, not used on any other day",
+        default_factory=list
+    )
+
+
+class MealPlanOutline(BaseModel):
+    """Pydantic model for the planning call that gives each day distinct main foods"""
+    days: List[PlannedDay] = Field(description="One outline per day, in order")
+
+
+class MealPlanDay(BaseModel):
+    """Pydantic model for the meals of one meal-plan day, generated on its own"""
+    meals: List[Dict[str, str]] = Field(
+        description="The day's meals (breakfast, lunch, dinner and snacks), "
+                    "each with the same keys"
+    )
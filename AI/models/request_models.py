@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class PatientReportRequest(BaseModel):
@@ -31,4 +31,92 @@ class PatientReportResponse(BaseModel):
     success: bool = Field(description="Whether the report generation was successful")
     message: str = Field(description="Information message about the report generation")
     report: Optional[dict] = Field(description="The generated medical report", default=None)
-    error: Optional[str] = Field(description="Error message if any", default=None) 
\ No newline at end of file
+    error: Optional[str] = Field(description="Error message if any", default=None)
+    stats: Optional[dict] = Field(
+        description="Generation stats: mode, LLM round trips, tool calls, tokens and "
+                    "latency",
+        default=None,
+    )
+
+class BatchReportRequest(BaseModel):
+    """Request model for batch report generation"""
+    patients: List[PatientReportRequest] = Field(
+        description="Patients to generate reports for", min_length=1
+    )
+    concurrency: Optional[int] = Field(
+        description="Maximum reports generated at once "
+                    "(defaults to REPORT_BATCH_CONCURRENCY)",
+        default=None,
+        ge=1,
+    )
+
+class BatchReportItem(BaseModel):
+    """Result for one patient of a batch report request"""
+    index: int = Field(description="Position of the patient in the request")
+    success: bool = Field(description="Whether the report generation was successful")
+    report: Optional[dict] = Field(
+        description="The generated medical report", default=None
+    )
+    error: Optional[str] = Field(description="Error message if any", default=None)
+
+class BatchReportResponse(BaseModel):
+    """Response model for batch report generation"""
+    success: bool = Field(description="Whether every report was generated successfully")
+    message: str = Field(description="Information message about the batch")
+    results: List[BatchReportItem] = Field(
+        description="Per-patient results in request order", default_factory=list
+    )
+
+class ReportJobResponse(BaseModel):
+    """Response model for an asynchronous report generation job"""
+    job_id: str = Field(description="Identifier of the report job")
+    status: str = Field(description="Job status: queued, running, succeeded or failed")
+    created_at: float = Field(description="Unix time the job was queued")
+    started_at: Optional[float] = Field(
+        description="Unix time a worker started the job", default=None
+    )
+    finished_at: Optional[float] = Field(
+        description="Unix time the job finished", default=None
+    )
+    report: Optional[dict] = Field(
+        description="The generated medical report", default=None
+    )
+    error: Optional[str] = Field(
+        description="Error message if the job failed", default=None
+    )
+
+class ApprovedPlanRequest(BaseModel):
+    """Request model for indexing a doctor-approved meal plan"""
+    plan_id: Optional[str] = Field(
+        description="Identifier of the plan, e.g. the approved request's id; replaces "
+                    "a plan with the same id",
+        default=None,
+    )
+    condition: str = Field(
+        description="Primary medical condition of the patient the plan was approved for"
+    )
+    age: Optional[int] = Field(description="Patient's age in years", default=None)
+    allergies: List[str] = Field(
+        description="List of patient's allergies", default_factory=list
+    )
+    medications: List[str] = Field(
+        description="List of patient's current medications", default_factory=list
+    )
+    dietary_preferences: List[str] = Field(
+        description="List of patient's dietary preferences or restrictions",
+        default_factory=list
+    )
+    meal_plan: Optional[Dict[str, List[Dict[str, str]]]] = Field(
+        description="Approved meal plan (day -> list of meals)",
+        default=None
+    )
+    recommendation: Optional[str] = Field(
+        description="Approved report as JSON text or markdown with a day/meal "
+                    "table, used when meal_plan is omitted",
+        default=None
+    )
+
+class ApprovedPlanResponse(BaseModel):
+    """Response model for an indexed approved meal plan"""
+    plan_id: str = Field(description="Identifier of the indexed plan")
+    days: int = Field(description="Number of days in the indexed plan")
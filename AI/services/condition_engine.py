@@ -0,0 +1,194 @@
+# Built-in imports
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from config.settings import config
+from services.text_matcher import PhraseMatcher, plural_variants
+
+# Condition definitions shipped with the service
+DEFAULT_CONDITIONS_FILE = (
+    Path(__file__).resolve().parent.parent / "config" / "conditions.json"
+)
+
+
+class ConditionEngine:
+    """
+    Data-driven condition knowledge: symptom scoring and dietary rules.
+
+    All symptom phrases and synonyms of all conditions are compiled into one
+    Aho-Corasick matcher, so a patient's symptoms are scored against every
+    condition in a single pass. Condition names and aliases are compiled into
+    a second matcher used to recognise the patient's stated condition.
+    """
+
+    def __init__(self, definitions: Dict[str, Any]):
+        """
+        Compile condition definitions
+
+        Args:
+            definitions: Parsed conditions file ({"conditions": [...]})
+        """
+        self.conditions: Dict[str, Dict[str, Any]] = {}
+        self.symptom_matcher = PhraseMatcher()
+        self.alias_matcher = PhraseMatcher()
+
+        for condition in definitions["conditions"]:
+            condition_id = condition["id"]
+            self.conditions[condition_id] = condition
+            self.alias_matcher.add_all(
+                [condition["name"], *condition.get("aliases", [])], condition_id
+            )
+
+            for symptom in condition["symptoms"]:
+                for phrase in [symptom["name"], *symptom.get("synonyms", [])]:
+                    for variant in plural_variants(phrase):
+                        self.symptom_matcher.add(
+                            variant, (condition_id, symptom["name"])
+                        )
+
+        self.symptom_matcher.build()
+        self.alias_matcher.build()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "ConditionEngine":
+        """Load and compile a conditions file (defaults to the packaged definitions)"""
+        with open(path or DEFAULT_CONDITIONS_FILE, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def identify_conditions(self, condition: str) -> List[str]:
+        """
+        Recognise known conditions in the patient's stated condition
+
+        Args:
+            condition: Free-text condition, e.g. "Type 2 Diabetes and IBS"
+
+        Returns:
+            List[str]: Ids of the recognised conditions, in order of mention
+        """
+        identified: List[str] = []
+        for match in self.alias_matcher.find(condition or ""):
+            for condition_id in match.values:
+                if condition_id not in identified:
+                    identified.append(condition_id)
+        return identified
+
+    def score_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        """
+        Score every condition against the patient's symptoms
+
+        Args:
+            symptoms: Free-text symptoms
+
+        Returns:
+            List[Dict]: Conditions with at least one matched symptom, best first,
+            each with its score (matched share of symptom weight), level and matched
+            symptoms
+        """
+        matched: Dict[str, List[str]] = {}
+        for text in symptoms or []:
+            for match in self.symptom_matcher.find(text):
+                for condition_id, symptom_name in match.values:
+                    names = matched.setdefault(condition_id, [])
+                    if symptom_name not in names:
+                        names.append(symptom_name)
+
+        results = []
+        for condition_id, names in matched.items():
+            condition = self.conditions[condition_id]
+            weights = {s["name"]: s.get("weight", 1) for s in condition["symptoms"]}
+            score = sum(weights[name] for name in names) / sum(weights.values())
+            strong = len(names) >= condition.get("strong_match_count", 3)
+            results.append({
+                "condition": condition_id,
+                "name": condition["name"],
+                "score": round(score, 3),
+                "level": "strong" if strong else "possible",
+                "matched_symptoms": names,
+            })
+        return sorted(
+            results, key=lambda r: (r["level"] == "strong", r["score"]), reverse=True
+        )
+
+    def summarize_symptoms(self, symptoms: List[str], condition: str = "") -> str:
+        """
+        Describe which conditions the symptoms point to, for the report prompt
+
+        The patient's stated conditions are always reported on, even without
+        matching symptoms; other conditions are mentioned only if they match.
+
+        Args:
+            symptoms: Free-text symptoms
+            condition: Patient's stated condition
+
+        Returns:
+            str: Symptom check result
+        """
+        scores = {
+            result["condition"]: result for result in self.score_symptoms(symptoms)
+        }
+        stated = self.identify_conditions(condition)
+
+        findings = []
+        for condition_id in stated + [c for c in scores if c not in stated]:
+            name = self.conditions[condition_id]["name"]
+            result = scores.get(condition_id)
+            if result is None:
+                findings.append(f"No clear {name} symptoms detected.")
+            elif result["level"] == "strong":
+                findings.append(
+                    f"Multiple symptoms consistent with {name} detected "
+                    f"({', '.join(result['matched_symptoms'])}; "
+                    f"score {result['score']})."
+                )
+            else:
+                findings.append(
+                    f"Some symptoms may be related to {name} "
+                    f"({', '.join(result['matched_symptoms'])}; "
+                    f"score {result['score']})."
+                )
+
+        return " ".join(findings) or "No clear symptoms of known conditions detected."
+
+    def dietary_advice(self, condition: str, allergies: List[str]) -> str:
+        """
+        Dietary recommendations for the patient's stated conditions and allergies
+
+        Args:
+            condition: Patient's stated condition
+            allergies: Patient's allergies
+
+        Returns:
+            str: Dietary advice
+        """
+        advice = "General dietary recommendations: "
+        for condition_id in self.identify_conditions(condition):
+            definition = self.conditions[condition_id]
+            rules = definition.get("dietary_rules", {})
+            advice += f"{definition['name']}: {rules.get('guidance', '')} "
+            if rules.get("prefer"):
+                advice += f"Prefer: {', '.join(rules['prefer'])}. "
+            if rules.get("limit"):
+                advice += f"Limit: {', '.join(rules['limit'])}. "
+
+        if allergies:
+            advice += f"Avoid foods containing: {', '.join(allergies)}. "
+        return advice
+
+    def foods_to_limit(self, condition: str) -> List[str]:
+        """Foods to limit for the patient's stated conditions"""
+        foods: List[str] = []
+        for condition_id in self.identify_conditions(condition):
+            rules = self.conditions[condition_id].get("dietary_rules", {})
+            for food in rules.get("limit", []):
+                if food not in foods:
+                    foods.append(food)
+        return foods
+
+
+@lru_cache(maxsize=1)
+def get_condition_engine() -> ConditionEngine:
+    """Return the shared engine, compiled from CONDITIONS_FILE on first use"""
+    return ConditionEngine.from_file(config.conditions_file)
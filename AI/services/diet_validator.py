@@ -0,0 +1,343 @@
+# Built-in imports
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Local imports
+from config.settings import config
+from services.text_matcher import PhraseMatch, PhraseMatcher, normalize, plural_variants
+
+# Allergen and restriction lexicon shipped with the service
+DEFAULT_LEXICON_FILE = (
+    Path(__file__).resolve().parent.parent / "config" / "diet_lexicon.json"
+)
+
+# Matcher value kinds
+INGREDIENT = "ingredient"
+SAFE_PREFIX = "prefix"
+
+
+class DietViolation(NamedTuple):
+    """An ingredient in a meal that the patient must avoid"""
+    day: str
+    meal_index: int
+    field: str
+    text: str
+    ingredient: str
+    group: str
+    reason: str
+
+
+class MealPlanRepair(NamedTuple):
+    """Result of repairing a meal plan by ingredient substitution"""
+    meal_plan: Dict[str, List[Dict[str, Any]]]
+    substituted: List[DietViolation]
+    unresolved: List[DietViolation]
+
+
+class DietaryConstraints:
+    """Food groups one patient must avoid, with the reason for each"""
+
+    def __init__(self, groups: Dict[str, str], custom: Optional[PhraseMatcher] = None):
+        """
+        Args:
+            groups: Excluded group id -> reason, e.g. {"milk": "allergy: dairy"}
+            custom: Matcher for allergies not in the lexicon, if any
+        """
+        self.groups = groups
+        self.custom = custom
+
+    def __bool__(self) -> bool:
+        return bool(self.groups)
+
+
+def _pluralize(phrase: str) -> str:
+    """Regular plural of a phrase"""
+    return next(iter(plural_variants(phrase) - {phrase}), phrase)
+
+
+def _number_variants(phrase: str) -> Set[str]:
+    """Phrase with its plural and, if it looks plural, singular (berries -> berry)"""
+    variants = plural_variants(phrase)
+    if phrase.endswith("ies"):
+        variants.add(phrase[:-3] + "y")
+    if phrase.endswith("es"):
+        variants.add(phrase[:-2])
+    if phrase.endswith("s"):
+        variants.add(phrase[:-1])
+    return variants
+
+
+class DietValidator:
+    """
+    Checks generated meal plans against allergies and dietary restrictions.
+
+    Every ingredient of every food group in the lexicon (including derived
+    ingredients such as whey for milk), together with safe phrases such as
+    "almond milk" and safe prefixes such as "dairy-free", is compiled into
+    one Aho-Corasick matcher. Leftmost-longest matching lets "peanut butter"
+    win over "butter", so a whole meal plan is checked in one pass over its
+    text. Violations are repaired by substitution where the lexicon has a
+    substitute; the rest are reported so only those meals are regenerated.
+    """
+
+    def __init__(self, lexicon: Dict[str, Any]):
+        """
+        Compile the lexicon
+
+        Args:
+            lexicon: Parsed lexicon file ({"groups": [...], "restrictions": [...]})
+        """
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.ingredient_matcher = PhraseMatcher()
+        self.allergy_matcher = PhraseMatcher()
+        self.restriction_matcher = PhraseMatcher()
+        self.restrictions: Dict[str, List[str]] = {}
+
+        for group in lexicon["groups"]:
+            group_id = group["id"]
+            self.groups[group_id] = group
+            self.allergy_matcher.add_all(
+                [group["name"], *group.get("aliases", [])], group_id
+            )
+
+            for ingredient in group["ingredients"]:
+                for variant in plural_variants(ingredient):
+                    self.ingredient_matcher.add(
+                        variant, (INGREDIENT, group_id, ingredient)
+                    )
+            # Safe phrases carry no value; matching them only shadows the shorter
+            # ingredient inside
+            for phrase in group.get("safe", []):
+                for variant in plural_variants(phrase):
+                    self.ingredient_matcher.add(variant)
+            for prefix in group.get("safe_prefixes", []):
+                self.ingredient_matcher.add(prefix, (SAFE_PREFIX, group_id))
+
+        for restriction in lexicon.get("restrictions", []):
+            self.restrictions[restriction["id"]] = restriction["excludes"]
+            self.restriction_matcher.add_all(
+                [restriction["id"], *restriction["aliases"]], restriction["id"]
+            )
+
+        self.ingredient_matcher.build()
+        self.allergy_matcher.build()
+        self.restriction_matcher.build()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "DietValidator":
+        """Load and compile a lexicon file (defaults to the packaged lexicon)"""
+        with open(path or DEFAULT_LEXICON_FILE, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def constraints_for(
+        self, allergies: List[str], dietary_preferences: List[str]
+    ) -> DietaryConstraints:
+        """
+        Resolve a patient's allergies and preferences into excluded food groups
+
+        Allergies not covered by the lexicon are matched literally (with plurals).
+
+        Args:
+            allergies: Patient's allergies, e.g. ["dairy", "shellfish"]
+            dietary_preferences: Patient's preferences, e.g. ["vegan", "low-carb"]
+
+        Returns:
+            DietaryConstraints: Excluded groups and their reasons
+        """
+        groups: Dict[str, str] = {}
+        custom = PhraseMatcher()
+
+        for allergy in allergies or []:
+            matches = self.allergy_matcher.find(allergy)
+            for match in matches:
+                for group_id in match.values:
+                    groups.setdefault(group_id, f"allergy: {allergy}")
+            phrase = normalize(allergy)
+            if not matches and phrase:
+                group_id = f"custom:{phrase}"
+                groups.setdefault(group_id, f"allergy: {allergy}")
+                for variant in _number_variants(phrase):
+                    custom.add(variant, (INGREDIENT, group_id, phrase))
+
+        for preference in dietary_preferences or []:
+            for match in self.restriction_matcher.find(preference):
+                for restriction_id in match.values:
+                    for group_id in self.restrictions[restriction_id]:
+                        groups.setdefault(group_id, f"preference: {preference}")
+
+        return DietaryConstraints(groups, custom if len(custom) else None)
+
+    def scan(
+        self, text: str, constraints: DietaryConstraints
+    ) -> List[Tuple[PhraseMatch, str, str]]:
+        """
+        Find the ingredients in a text that the constraints exclude
+
+        Args:
+            text: Text to check, e.g. a meal description
+            constraints: Patient's dietary constraints
+
+        Returns:
+            List[Tuple[PhraseMatch, str, str]]: (match, group id, lexicon ingredient)
+                in text order
+        """
+        hits: List[Tuple[PhraseMatch, str, str]] = []
+        shielded: set = set()
+        previous_end: Optional[int] = None
+
+        for match in self.ingredient_matcher.find(text):
+            # A safe prefix ("dairy-free", "vegan") only covers the next ingredient
+            adjacent = (
+                previous_end is not None
+                and not text[previous_end:match.start].strip(" -")
+            )
+            for value in match.values:
+                if value[0] == INGREDIENT and value[1] in constraints.groups:
+                    if not (adjacent and value[1] in shielded):
+                        hits.append((match, value[1], value[2]))
+            shielded = {value[1] for value in match.values if value[0] == SAFE_PREFIX}
+            previous_end = match.end
+
+        if constraints.custom is not None:
+            for match in constraints.custom.find(text):
+                for _, group_id, phrase in match.values:
+                    hits.append((match, group_id, phrase))
+            hits.sort(key=lambda hit: hit[0].start)
+        return hits
+
+    def find_violations(
+        self,
+        meal_plan: Optional[Dict[str, List[Dict[str, Any]]]],
+        constraints: DietaryConstraints
+    ) -> List[DietViolation]:
+        """
+        Check every text field of every meal in a meal plan
+
+        Args:
+            meal_plan: Meal plan of a MedicalReport (day -> list of meals)
+            constraints: Patient's dietary constraints
+
+        Returns:
+            List[DietViolation]: All violations, in plan order
+        """
+        violations: List[DietViolation] = []
+        if not constraints:
+            return violations
+        for day, meals in (meal_plan or {}).items():
+            for index, meal in enumerate(meals or []):
+                violations.extend(self._meal_violations(day, index, meal, constraints))
+        return violations
+
+    def repair(
+        self,
+        meal_plan: Optional[Dict[str, List[Dict[str, Any]]]],
+        constraints: DietaryConstraints
+    ) -> MealPlanRepair:
+        """
+        Substitute excluded ingredients where the lexicon has a substitute
+
+        Args:
+            meal_plan: Meal plan of a MedicalReport (day -> list of meals)
+            constraints: Patient's dietary constraints
+
+        Returns:
+            MealPlanRepair: Repaired copy of the plan, the substitutions made and
+            the violations that could not be substituted
+        """
+        repaired: Dict[str, List[Dict[str, Any]]] = {}
+        substituted: List[DietViolation] = []
+        unresolved: List[DietViolation] = []
+
+        for day, meals in (meal_plan or {}).items():
+            repaired[day] = []
+            for index, meal in enumerate(meals or []):
+                meal, fixed = self._substitute_meal(day, index, meal, constraints)
+                substituted.extend(fixed)
+                # A substitute can itself be excluded (e.g. oat milk when gluten-free)
+                unresolved.extend(self._meal_violations(day, index, meal, constraints))
+                repaired[day].append(meal)
+
+        return MealPlanRepair(repaired, substituted, unresolved)
+
+    def _meal_violations(
+        self,
+        day: str,
+        index: int,
+        meal: Dict[str, Any],
+        constraints: DietaryConstraints
+    ) -> List[DietViolation]:
+        """Violations in the text fields of one meal"""
+        violations = []
+        for field, text in meal.items():
+            if not isinstance(text, str):
+                continue
+            for match, group_id, ingredient in self.scan(text, constraints):
+                violations.append(DietViolation(
+                    day, index, field, text[match.start:match.end], ingredient,
+                    group_id, constraints.groups[group_id]
+                ))
+        return violations
+
+    def _substitute_meal(
+        self,
+        day: str,
+        index: int,
+        meal: Dict[str, Any],
+        constraints: DietaryConstraints
+    ) -> Tuple[Dict[str, Any], List[DietViolation]]:
+        """Replace substitutable excluded ingredients in one meal"""
+        if not constraints:
+            return meal, []
+
+        repaired: Dict[str, Any] = {}
+        fixed: List[DietViolation] = []
+        for field, text in meal.items():
+            if not isinstance(text, str):
+                repaired[field] = text
+                continue
+
+            # Group hits by match; one phrase can belong to several excluded groups
+            hits: Dict[PhraseMatch, List[Tuple[str, str]]] = {}
+            for match, group_id, ingredient in self.scan(text, constraints):
+                hits.setdefault(match, []).append((group_id, ingredient))
+
+            # Right to left, so earlier offsets stay valid
+            for match in sorted(hits, key=lambda m: m.start, reverse=True):
+                if len(hits[match]) != 1:
+                    continue
+                group_id, ingredient = hits[match][0]
+                substitute = self._substitute_for(match, group_id, ingredient)
+                if substitute is None:
+                    continue
+                original = text[match.start:match.end]
+                if original[:1].isupper():
+                    substitute = substitute[:1].upper() + substitute[1:]
+                text = text[:match.start] + substitute + text[match.end:]
+                fixed.append(DietViolation(
+                    day, index, field, original, ingredient, group_id,
+                    constraints.groups[group_id]
+                ))
+            repaired[field] = text
+
+        fixed.reverse()
+        return repaired, fixed
+
+    def _substitute_for(
+        self, match: PhraseMatch, group_id: str, ingredient: str
+    ) -> Optional[str]:
+        """Substitute for a matched ingredient, pluralized if the match was plural"""
+        substitutes = self.groups.get(group_id, {}).get("substitutes", {})
+        substitute = substitutes.get(ingredient)
+        if substitute is None:
+            return None
+        if match.phrase != normalize(ingredient):
+            substitute = _pluralize(substitute)
+        return substitute
+
+
+@lru_cache(maxsize=1)
+def get_diet_validator() -> DietValidator:
+    """Return the shared validator, compiled from DIET_LEXICON_FILE on first use"""
+    return DietValidator.from_file(config.diet_lexicon_file)
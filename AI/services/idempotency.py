@@ -0,0 +1,169 @@
+# Built-in imports
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Local imports
+from config.logging_info import setup_logger
+from config.metrics import CACHE_LOOKUPS
+
+# Set up logger
+logger = setup_logger("idempotency")
+
+
+class IdempotencyKeyReused(ValueError):
+    """An Idempotency-Key was sent again with a different request"""
+
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    """Hash of a request's content, to detect a key reused for a different request"""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class IdempotencyStore:
+    """SQLite-backed store of finished responses by idempotency key, with a TTL"""
+
+    def __init__(self, db_path: str, ttl: float):
+        """
+        Open (and create if needed) the store
+
+        Args:
+            db_path: Path of the SQLite database file
+            ttl: Seconds a stored response is replayed
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS idempotent_responses (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored fingerprint and response for key, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, response FROM idempotent_responses "
+                "WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "fingerprint": row["fingerprint"],
+            "response": json.loads(row["response"]),
+        }
+
+    def set(self, key: str, fingerprint: str, response: Dict[str, Any]) -> None:
+        """Store the response for key"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotent_responses "
+                "(key, fingerprint, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, fingerprint, json.dumps(response), now),
+            )
+            # Delete expired responses at most once a minute
+            if now - self._last_prune >= 60:
+                self._last_prune = now
+                self._conn.execute(
+                    "DELETE FROM idempotent_responses WHERE created_at < ?",
+                    (now - self.ttl,),
+                )
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class IdempotentRequests:
+    """
+    Runs requests at most once per idempotency key.
+
+    A finished response is stored and replayed for the TTL; a request
+    retried while the first is still running awaits the same result. Only
+    responses accepted by `should_store` (e.g. successful ones) are kept,
+    so a retry after a failure runs again.
+    """
+
+    def __init__(self, store: IdempotencyStore):
+        """
+        Args:
+            store: Store of finished responses
+        """
+        self.store = store
+        self._inflight: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        produce: Callable[[], Awaitable[Dict[str, Any]]],
+        should_store: Callable[[Dict[str, Any]], bool]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return the response for key, producing it only if there is none yet
+
+        Args:
+            key: Idempotency key, scoped by the caller (e.g. per route)
+            fingerprint: Fingerprint of the request content
+            produce: Coroutine function producing the response
+            should_store: Whether a produced response is stored for replay
+
+        Returns:
+            Tuple[Dict, bool]: The response and whether it was replayed
+
+        Raises:
+            IdempotencyKeyReused: If the key was used for a different request
+        """
+        stored = self.store.get(key)
+        if stored is None and key in self._inflight:
+            stored_fingerprint, task = self._inflight[key]
+        elif stored is not None:
+            stored_fingerprint, task = stored["fingerprint"], None
+        else:
+            stored_fingerprint, task = None, None
+
+        if stored_fingerprint is not None and stored_fingerprint != fingerprint:
+            raise IdempotencyKeyReused(
+                "Idempotency-Key was already used for a different request"
+            )
+
+        result = "miss" if stored_fingerprint is None else "hit"
+        CACHE_LOOKUPS.inc(cache="idempotency", result=result)
+        if stored is not None:
+            logger.info(f"Replaying stored response for idempotency key {key}")
+            return stored["response"], True
+        if task is not None:
+            logger.info(f"Awaiting in-flight request for idempotency key {key}")
+            return await asyncio.shield(task), True
+
+        async def produce_and_store() -> Dict[str, Any]:
+            response = await produce()
+            if should_store(response):
+                self.store.set(key, fingerprint, response)
+            return response
+
+        # Run as a task so the response is stored even if the caller disconnects
+        task = asyncio.create_task(produce_and_store())
+        self._inflight[key] = (fingerprint, task)
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), False
@@ -0,0 +1,228 @@
+# Built-in imports
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Local imports
+from config.settings import config
+from models.report import Ingredients
+from services.text_matcher import PhraseMatcher, normalize, plural_variants
+
+# Food lexicon shipped with the service
+DEFAULT_FOOD_LEXICON_FILE = (
+    Path(__file__).resolve().parent.parent / "config" / "food_lexicon.json"
+)
+
+# Characters before a food searched for its quantity ("2 cups of cooked quinoa")
+QUANTITY_WINDOW = 40
+
+# Words joining two foods; a quantity before one never belongs to the next
+# ("150g salmon with rice")
+CONJUNCTION = r"(?!(?:and|with|on|or|plus|over)\b)"
+
+# A number or number word, an optional unit, "of" and up to two adjectives,
+# right before the food
+QUANTITY_PATTERN = re.compile(
+    r"(?P<amount>\d+(?:\.\d+)?(?:/\d+)?|[½¼¾⅓⅔]"
+    r"|\b(?:a|an|one|two|three|four|five|six|seven|eight|nine|ten|half)\b)"
+    rf"\s*(?P<unit>{CONJUNCTION}[a-z]+\.?)?\s+(?P<of>of\s+)?(?:{CONJUNCTION}[a-z-]+\s+){{0,2}}$",
+    re.IGNORECASE,
+)
+
+# A quantity in parentheses right after the food ("chicken breast (120g)")
+QUANTITY_AFTER_PATTERN = re.compile(
+    r"^\s*\(\s*(?P<amount>\d+(?:\.\d+)?(?:/\d+)?|[½¼¾⅓⅔])"
+    r"\s*(?P<unit>[a-z]+\.?)?\s*\)",
+    re.IGNORECASE,
+)
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "half": 0.5,
+}
+UNICODE_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+
+# Base units shown as a larger unit from this amount on
+LARGER_UNITS = {"g": (1000, "kg"), "ml": (1000, "l")}
+
+# Meal fields that never name ingredients
+SKIPPED_FIELDS = {"meal", "day", "time", "calories"}
+
+
+def _parse_amount(text: str) -> float:
+    """Numeric value of a quantity such as "2", "1.5", "1/2", "½" or "two" """
+    text = text.lower()
+    if text in NUMBER_WORDS:
+        return NUMBER_WORDS[text]
+    if text in UNICODE_FRACTIONS:
+        return UNICODE_FRACTIONS[text]
+    if "/" in text:
+        numerator, denominator = text.split("/")
+        return float(numerator) / float(denominator) if float(denominator) else 0.0
+    return float(text)
+
+
+def _format_amount(amount: float) -> str:
+    """Render an amount without trailing zeros"""
+    return f"{amount:.2f}".rstrip("0").rstrip(".")
+
+
+class IngredientAggregator:
+    """
+    Builds a meal plan's shopping list without the LLM.
+
+    Every food name and alias in the lexicon is compiled into one
+    Aho-Corasick matcher, so each meal is scanned once. A quantity written
+    right before a food ("150g salmon", "2 cups of quinoa", "two eggs"), or
+    in parentheses right after it ("chicken breast (120g)"), is
+    converted to a base unit (grams, millilitres or a count) and summed per
+    food across the plan. Each food is filed under its lexicon category, so
+    the same meal plan always yields the same list.
+    """
+
+    def __init__(self, lexicon: Dict[str, Any]):
+        """
+        Compile the lexicon
+
+        Args:
+            lexicon: Parsed lexicon file
+                ({"categories": [...], "units": [...], "foods": [...]})
+        """
+        self.categories: List[str] = lexicon["categories"]
+        self.units: Dict[str, Tuple[str, float]] = {}
+        self.food_matcher = PhraseMatcher()
+
+        for unit in lexicon["units"]:
+            for alias in unit["aliases"]:
+                self.units[alias.lower()] = (unit["base"], unit["factor"])
+
+        for food in lexicon["foods"]:
+            if food["category"] not in self.categories:
+                raise ValueError(
+                    f"Unknown category {food['category']} for {food['name']}"
+                )
+            for phrase in [food["name"], *food.get("aliases", [])]:
+                for variant in plural_variants(normalize(phrase)):
+                    self.food_matcher.add(variant, (food["name"], food["category"]))
+        self.food_matcher.build()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "IngredientAggregator":
+        """Load and compile a lexicon file (defaults to the packaged lexicon)"""
+        with open(path or DEFAULT_FOOD_LEXICON_FILE, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def aggregate(
+        self, meal_plan: Optional[Dict[str, List[Dict[str, Any]]]]
+    ) -> Ingredients:
+        """
+        Collect the foods of a meal plan into a categorized shopping list
+
+        Args:
+            meal_plan: Meal plan of a MedicalReport (day -> list of meals)
+
+        Returns:
+            Ingredients: Foods per category, alphabetical, with summed quantities
+                where given
+        """
+        # food name -> (category, base unit -> summed amount)
+        foods: Dict[str, Tuple[str, Dict[str, float]]] = {}
+        for meals in (meal_plan or {}).values():
+            for meal in meals or []:
+                for field, text in meal.items():
+                    if field.lower() in SKIPPED_FIELDS or not isinstance(text, str):
+                        continue
+                    for name, category, quantity in self.scan(text):
+                        amounts = foods.setdefault(name, (category, {}))[1]
+                        if quantity is not None:
+                            base, amount = quantity
+                            amounts[base] = amounts.get(base, 0.0) + amount
+
+        items: Dict[str, List[str]] = {category: [] for category in self.categories}
+        for name in sorted(foods, key=str.lower):
+            category, amounts = foods[name]
+            items[category].append(self._format_item(name, amounts))
+        categories = Ingredients.model_fields
+        return Ingredients(**{field: items.get(field, []) for field in categories})
+
+    def scan(self, text: str) -> List[Tuple[str, str, Optional[Tuple[str, float]]]]:
+        """
+        Find the foods in a text with their quantities
+
+        Args:
+            text: Text to scan, e.g. a meal description
+
+        Returns:
+            List[Tuple]: (food name, category, (base unit, amount) or None)
+                in text order
+        """
+        found = []
+        previous_end = 0
+        for match in self.food_matcher.find(text):
+            # The search stops at the previous food, so its quantity is never reused
+            window_start = max(previous_end, match.start - QUANTITY_WINDOW)
+            quantity = self._quantity_before(text[window_start:match.start])
+            if quantity is None:
+                quantity = self._quantity_after(text[match.end:])
+            previous_end = match.end
+            for name, category in match.values:
+                found.append((name, category, quantity))
+        return found
+
+    def _quantity_before(self, prefix: str) -> Optional[Tuple[str, float]]:
+        """Quantity written right before a food, converted to its base unit"""
+        quantity = QUANTITY_PATTERN.search(prefix)
+        if quantity is None:
+            return None
+
+        amount = _parse_amount(quantity.group("amount"))
+        unit = (quantity.group("unit") or "").lower().rstrip(".")
+        if unit in self.units:
+            base, factor = self.units[unit]
+            return base, amount * factor
+        # A word that is not a unit is an adjective ("2 large eggs"), unless followed
+        # by "of" ("a side of")
+        if quantity.group("of"):
+            return None
+        return "count", amount
+
+    def _quantity_after(self, suffix: str) -> Optional[Tuple[str, float]]:
+        """Quantity in parentheses right after a food, converted to its base unit"""
+        quantity = QUANTITY_AFTER_PATTERN.match(suffix)
+        if quantity is None:
+            return None
+
+        amount = _parse_amount(quantity.group("amount"))
+        unit = (quantity.group("unit") or "").lower().rstrip(".")
+        if not unit:
+            return "count", amount
+        if unit in self.units:
+            base, factor = self.units[unit]
+            return base, amount * factor
+        # Anything else, e.g. "(350 kcal)", is not an amount of the food
+        return None
+
+    def _format_item(self, name: str, amounts: Dict[str, float]) -> str:
+        """Render a food with its quantities, e.g. "Salmon (450 g)" or "Eggs (4)" """
+        parts = []
+        for base in sorted(amounts):
+            amount = amounts[base]
+            if base in LARGER_UNITS and amount >= LARGER_UNITS[base][0]:
+                factor, larger = LARGER_UNITS[base]
+                parts.append(f"{_format_amount(amount / factor)} {larger}")
+            elif base in LARGER_UNITS:
+                parts.append(f"{round(amount)} {base}")
+            elif base == "count":
+                parts.append(_format_amount(amount))
+            else:
+                unit = base if amount == 1 else base + "s"
+                parts.append(f"{_format_amount(amount)} {unit}")
+        return f"{name} ({', '.join(parts)})" if parts else name
+
+
+@lru_cache(maxsize=1)
+def get_ingredient_aggregator() -> IngredientAggregator:
+    """Return the shared aggregator, compiled from FOOD_LEXICON_FILE on first use"""
+    return IngredientAggregator.from_file(config.food_lexicon_file)
@@ -1,13 +1,95 @@
-from typing import Dict, Any, List
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.tools import tool
-from models.medical_report import MedicalReport
+from models.medical_report import (
+    MealPlanDay,
+    MealPlanOutline,
+    MedicalReport,
+    PlannedDay,
+    ReplacementMeal,
+)
+from config.llm_setup import GeminiChat, HedgedChat
 from config.logging_info import setup_logger
+from config.metrics import (
+    AGENT_STEPS, CACHE_LOOKUPS, MEAL_PLAN_FIXES, REPORTS, metrics_callback
+)
+from config.settings import config
+from services.condition_engine import get_condition_engine
+from services.diet_validator import (
+    DietaryConstraints, DietViolation, MealPlanRepair, get_diet_validator
+)
+from services.ingredient_aggregator import get_ingredient_aggregator
+from services.plan_library import ApprovedPlanLibrary
+from services.report_cache import PATIENT_FIELDS, ReportCache, profile_key
 
 # Set up logger
 logger = setup_logger("medical_report_service")
 
+# Generation modes
+AGENT_MODE = "agent"
+SINGLE_SHOT_MODE = "single_shot"
+FAN_OUT_MODE = "fan_out"
+GENERATION_MODES = (AGENT_MODE, SINGLE_SHOT_MODE, FAN_OUT_MODE)
+
+# Days generated in fan-out mode, matching the 3-day limit in the prompts
+FAN_OUT_DAYS = 3
+
+# Stats modes of reports adapted from an approved meal plan, or shared with a
+# concurrent identical request
+LIBRARY_MODE = "library"
+COALESCED_MODE = "coalesced"
+
+# Report fields streamed together as the patient summary section
+PATIENT_SUMMARY_FIELDS = [
+    "name", "condition", "age", "gender", "weight", "height",
+    "allergies", "medications", "symptoms", "dietary_preferences",
+]
+
+class GenerationStatsHandler(BaseCallbackHandler):
+    """Callback handler counting LLM round trips, tool calls and tokens of a report"""
+    
+    run_inline = True
+    
+    def __init__(self):
+        self.llm_round_trips = 0
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+    
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        """Count a finished LLM call and its token usage"""
+        self.llm_round_trips += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+    
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        """Count a finished tool call"""
+        self.tool_calls += 1
+    
+    def to_dict(self, mode: str, latency: float) -> Dict[str, Any]:
+        """Summarise the collected stats"""
+        return {
+            "mode": mode,
+            "llm_round_trips": self.llm_round_trips,
+            "tool_calls": self.tool_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "latency": round(latency, 3),
+        }
+
 class MedicalReportService:
     """Service for generating structured medical reports using LangGraph"""
     
@@ -23,37 +105,24 @@ class MedicalReportService:
         logger.info(f"Initializing LLM with model: {model}")
         self.llm = ChatOpenAI(api_key=api_key, model=model, temperature=0)
         
+        # Compiled condition knowledge shared by the medical tools
+        self.condition_engine = get_condition_engine()
+        engine = self.condition_engine
+        
         @tool
-        def check_diabetes_symptoms(symptoms: List[str]) -> str:
-            """Check if symptoms match common diabetes indicators."""
-            diabetes_symptoms = [
-                "frequent urination", "increased thirst", "extreme hunger",
-                "unexplained weight loss", "fatigue", "blurred vision"
-            ]
-            matches = [s for s in symptoms if any(ds in s.lower() for ds in diabetes_symptoms)]
-            
-            result = ""
-            if len(matches) >= 3:
-                result = "Multiple symptoms consistent with diabetes detected."
-            elif len(matches) > 0:
-                result = "Some symptoms may be related to diabetes."
-            else:
-                result = "No clear diabetes symptoms detected."
-                
-            logger.debug(f"Diabetes symptom check: {result} (matched {len(matches)}/{len(symptoms)} symptoms)")
+        def check_condition_symptoms(symptoms: List[str], condition: str = "") -> str:
+            """
+            Check which known conditions (including the patient's stated condition)
+            the symptoms point to.
+            """
+            result = engine.summarize_symptoms(symptoms, condition)
+            logger.debug(f"Condition symptom check: {result}")
             return result
         
         @tool
         def analyze_dietary_needs(condition: str, allergies: List[str]) -> str:
             """Analyze dietary needs based on condition and allergies."""
-            dietary_advice = "General dietary recommendations: "
-            
-            if "diabetes" in condition.lower():
-                dietary_advice += "Low-carb diet recommended. Monitor sugar intake. "
-            
-            if allergies:
-                dietary_advice += f"Avoid foods containing: {', '.join(allergies)}. "
-            
+            dietary_advice = engine.dietary_advice(condition, allergies)
             logger.debug(f"Dietary analysis for {condition} with allergies {allergies}: {dietary_advice}")
             return dietary_advice
         
@@ -71,13 +140,23 @@ class MedicalReportService:
                 
             if allergies:
                 meal_plan_guidance += f"Avoid these allergens: {', '.join(allergies)}. "
+            
+            foods_to_limit = engine.foods_to_limit(condition)
+            if foods_to_limit:
+                limits = ", ".join(foods_to_limit)
+                meal_plan_guidance += f"Limit these foods for the condition: {limits}. "
                 
             meal_plan_guidance += "The meal plan should include breakfast, lunch, dinner, and snacks for each day."
             
             logger.debug(f"Meal plan guidance created: {meal_plan_guidance}")
             return meal_plan_guidance
         
-        self.tools = [check_diabetes_symptoms, analyze_dietary_needs, generate_three_day_meal_plan]
+        self.tools = [
+            check_condition_symptoms,
+            analyze_dietary_needs,
+            generate_three_day_meal_plan,
+        ]
+        self.tools_by_name = {t.name: t for t in self.tools}
         logger.info(f"Initialized {len(self.tools)} medical tools")
         
         # Custom system prompt for accurate medical report generation
@@ -92,6 +171,21 @@ class MedicalReportService:
         Structure the meal plan with days 1-3 only, providing breakfast, lunch, dinner, and snacks for each day.
         """
         
+        # Single-shot prompt: tool results are computed locally and sent along
+        self.single_shot_system_prompt = """
+        You are a medical assistant creating structured patient reports.
+        Generate accurate, detailed medical information based on the patient details
+        provided. The results of the clinical checks have already been computed and
+        are included with the patient details.
+        The output should be a complete medical report with all required fields
+        populated.
+        
+        IMPORTANT: When generating meal plans, you MUST limit them to exactly 3 days.
+        Do not create meal plans for more than 3 days under any circumstances.
+        Structure the meal plan with days 1-3 only, providing breakfast, lunch,
+        dinner, and snacks for each day.
+        """
+        
         # Create the React agent with structured output
         logger.info("Creating ReAct agent with structured output")
         self.agent = create_react_agent(
@@ -99,33 +193,1001 @@ class MedicalReportService:
             tools=self.tools,
             response_format=(self.system_prompt, MedicalReport),
         )
+        
+        # Structured-output model for single-shot generation
+        self.structured_llm = self.llm.with_structured_output(MedicalReport)
+        
+        # Hedge slow or failed calls to a second provider when one is configured
+        self.fallback_llm = self._build_fallback_llm()
+        if self.fallback_llm is not None:
+            self.agent = HedgedChat({
+                "openai": self.agent,
+                "gemini": create_react_agent(
+                    self.fallback_llm,
+                    tools=self.tools,
+                    response_format=(self.system_prompt, MedicalReport),
+                ),
+            })
+            self.structured_llm = HedgedChat({
+                "openai": self.structured_llm,
+                "gemini": self.fallback_llm.with_structured_output(MedicalReport),
+            })
+        
+        # Fan-out generation: a short planning call, then one small structured call
+        # per meal-plan day
+        self.outline_llm = self.llm.with_structured_output(MealPlanOutline)
+        self.day_llm = self.llm.with_structured_output(MealPlanDay)
+        if self.fallback_llm is not None:
+            self.outline_llm = HedgedChat({
+                "openai": self.outline_llm,
+                "gemini": self.fallback_llm.with_structured_output(MealPlanOutline),
+            })
+            self.day_llm = HedgedChat({
+                "openai": self.day_llm,
+                "gemini": self.fallback_llm.with_structured_output(MealPlanDay),
+            })
+        
+        # JSON-schema variant yields partial dicts while streaming, which the
+        # Pydantic parser cannot
+        self.streaming_structured_llm = self.llm.with_structured_output(
+            MedicalReport.model_json_schema()
+        )
+        
+        # Meal plans are checked locally against allergies and dietary restrictions;
+        # only meals that substitution cannot fix are regenerated, one small call each
+        self.diet_validator = get_diet_validator()
+        self.meal_llm = self.llm.with_structured_output(ReplacementMeal)
+        
+        # Shopping lists are aggregated from the final meal plan locally, so the LLM
+        # never writes them
+        self.ingredient_aggregator = get_ingredient_aggregator()
+        
+        # Callbacks attached to every generation: metrics, plus sampled Langfuse
+        # tracing if configured
+        self.callbacks = [metrics_callback] + (
+            [config.langfuse_handler] if config.langfuse_handler else []
+        )
+        
+        # Created lazily so it binds to the event loop that serves requests
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        
+        # In-flight generations keyed by mode and clinical profile, shared by
+        # concurrent duplicates
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Generated clinical sections keyed by canonical patient profile
+        self.report_cache = ReportCache(
+            ttl=config.report_cache_ttl, max_size=config.report_cache_max_size
+        )
+        
+        # Doctor-approved meal plans, adapted for similar patients instead of
+        # generating from scratch
+        self.plan_library = ApprovedPlanLibrary(config.plan_library_db_path)
         logger.info("MedicalReportService initialization complete")
     
-    def generate_report(self, patient_info: Dict[str, Any]) -> MedicalReport:
+    def generate_report(
+        self,
+        patient_info: Dict[str, Any],
+        use_cache: bool = True,
+        mode: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> MedicalReport:
         """
         Generate a structured medical report based on patient information
         
         Args:
             patient_info: Dictionary containing patient information
+            use_cache: Whether to reuse a report generated for the same clinical profile
+            mode: "agent" (ReAct tool loop), "single_shot" or "fan_out"
+                (defaults to config)
+            stats: Optional dict filled with round trips, tokens and latency
+            
+        Returns:
+            MedicalReport: Structured medical report
+        """
+        patient_name = patient_info.get("name", "Unknown Patient")
+        mode = self._resolve_mode(mode)
+        logger.info(f"Generating report for patient: {patient_name} (mode: {mode})")
+        start_time = time.time()
+        
+        cached = self._get_cached_report(patient_info) if use_cache else None
+        if cached is not None:
+            self._record_stats(stats, GenerationStatsHandler(), "cache", start_time)
+            return cached
+        
+        handler = GenerationStatsHandler()
+        run_config = {"callbacks": [handler, *self.callbacks]}
+        
+        match = self._find_library_plan(patient_info) if use_cache else None
+        if match is not None:
+            meal_plan = self._enforce_diet(
+                match["meal_plan"], patient_info, run_config["callbacks"]
+            )
+            report = self._library_report(patient_info, meal_plan)
+            self._record_stats(stats, handler, LIBRARY_MODE, start_time)
+            self._cache_report(patient_info, report)
+            return report
+        
+        try:
+            if mode == SINGLE_SHOT_MODE:
+                logger.info("Invoking structured output model")
+                report = self.structured_llm.invoke(
+                    self._build_single_shot_messages(patient_info), config=run_config
+                )
+            elif mode == FAN_OUT_MODE:
+                logger.info("Generating meal-plan days in parallel")
+                report = self._generate_fan_out(patient_info, run_config)
+            else:
+                logger.info("Invoking LangGraph agent")
+                response = self.agent.invoke(
+                    self._build_agent_inputs(patient_info), config=run_config
+                )
+                report = response["structured_response"]
+            if report.meal_plan:
+                meal_plan = self._enforce_diet(
+                    report.meal_plan, patient_info, run_config["callbacks"]
+                )
+                report = report.model_copy(update={"meal_plan": meal_plan})
+            report = self._with_ingredients(report)
+        except Exception:
+            REPORTS.inc(mode=mode, outcome="failure")
+            raise
+        
+        logger.info(f"Report generation successful for patient: {patient_name}")
+        self._record_stats(stats, handler, mode, start_time)
+        self._cache_report(patient_info, report)
+        return report
+    
+    async def agenerate_report(
+        self,
+        patient_info: Dict[str, Any],
+        use_cache: bool = True,
+        mode: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> MedicalReport:
+        """
+        Generate a structured medical report without blocking the event loop
+        
+        At most config.report_max_concurrency reports are generated at once;
+        further calls wait for a free slot.
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            use_cache: Whether to reuse a report generated for the same clinical profile
+            mode: "agent" (ReAct tool loop), "single_shot" or "fan_out"
+                (defaults to config)
+            stats: Optional dict filled with round trips, tokens and latency
             
         Returns:
             MedicalReport: Structured medical report
         """
         patient_name = patient_info.get("name", "Unknown Patient")
-        logger.info(f"Generating report for patient: {patient_name}")
+        mode = self._resolve_mode(mode)
+        logger.info(f"Generating report for patient: {patient_name} (mode: {mode})")
+        start_time = time.time()
+        
+        cached = self._get_cached_report(patient_info) if use_cache else None
+        if cached is not None:
+            self._record_stats(stats, GenerationStatsHandler(), "cache", start_time)
+            return cached
+        
+        handler = GenerationStatsHandler()
+        if not use_cache:
+            report, used_mode = await self._agenerate_uncached(
+                patient_info, mode, handler, use_library=False
+            )
+            self._record_stats(stats, handler, used_mode, start_time)
+            return report
+        
+        # Concurrent requests for the same profile await one generation
+        key = f"{mode}:{profile_key(patient_info)}"
+        task = self._inflight.get(key)
+        CACHE_LOOKUPS.inc(cache="inflight", result="miss" if task is None else "hit")
+        if task is not None:
+            logger.info(f"Joining in-flight generation for patient: {patient_name}")
+            report, _ = await asyncio.shield(task)
+            self._record_stats(
+                stats, GenerationStatsHandler(), COALESCED_MODE, start_time
+            )
+            return self._apply_patient_fields(
+                report.model_dump(exclude=PATIENT_FIELDS), patient_info
+            )
+        
+        # Run as a task so a disconnecting caller does not cancel the generation
+        # others await
+        task = asyncio.create_task(
+            self._agenerate_uncached(patient_info, mode, handler, use_library=True)
+        )
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._forget_inflight(key, done))
+        report, used_mode = await asyncio.shield(task)
+        self._record_stats(stats, handler, used_mode, start_time)
+        return report
+    
+    async def _agenerate_uncached(
+        self,
+        patient_info: Dict[str, Any],
+        mode: str,
+        handler: GenerationStatsHandler,
+        use_library: bool
+    ) -> Tuple[MedicalReport, str]:
+        """
+        Generate a report from an approved plan or the LLM and cache it
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            mode: "agent", "single_shot" or "fan_out"
+            handler: Stats handler attached to the LLM calls
+            use_library: Whether to adapt a close approved meal plan
+            
+        Returns:
+            Tuple[MedicalReport, str]: The report and the mode that produced it
+        """
+        run_config = {"callbacks": [handler, *self.callbacks]}
+        
+        match = self._find_library_plan(patient_info) if use_library else None
+        if match is not None:
+            meal_plan = await self._aenforce_diet(
+                match["meal_plan"], patient_info, run_config["callbacks"]
+            )
+            report = self._library_report(patient_info, meal_plan)
+            self._cache_report(patient_info, report)
+            return report, LIBRARY_MODE
+        
+        try:
+            async with self._get_semaphore():
+                if mode == SINGLE_SHOT_MODE:
+                    logger.info("Invoking structured output model asynchronously")
+                    report = await self.structured_llm.ainvoke(
+                        self._build_single_shot_messages(patient_info),
+                        config=run_config,
+                    )
+                elif mode == FAN_OUT_MODE:
+                    logger.info("Generating meal-plan days concurrently")
+                    report = await self._agenerate_fan_out(patient_info, run_config)
+                else:
+                    logger.info("Invoking LangGraph agent asynchronously")
+                    response = await self.agent.ainvoke(
+                        self._build_agent_inputs(patient_info), config=run_config
+                    )
+                    report = response["structured_response"]
+                if report.meal_plan:
+                    meal_plan = await self._aenforce_diet(
+                        report.meal_plan, patient_info, run_config["callbacks"]
+                    )
+                    report = report.model_copy(update={"meal_plan": meal_plan})
+                report = self._with_ingredients(report)
+        except Exception:
+            REPORTS.inc(mode=mode, outcome="failure")
+            raise
+        
+        name = patient_info.get("name", "Unknown Patient")
+        logger.info(f"Report generation successful for patient: {name}")
+        self._cache_report(patient_info, report)
+        return report, mode
+    
+    def _forget_inflight(self, key: str, task: asyncio.Task) -> None:
+        """Remove a finished generation from the in-flight map"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so it is not reported as unhandled when every caller
+        # has gone
+        if not task.cancelled():
+            task.exception()
+    
+    async def astream_report(
+        self,
+        patient_info: Dict[str, Any],
+        use_cache: bool = True,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate a report in single-shot mode, yielding sections as they complete
+        
+        Yields ("patient_summary", ...), ("condition_analysis", ...), one
+        ("meal_plan_day", ...) per day and finally ("report", ...) with the
+        validated MedicalReport as a dict.
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            use_cache: Whether to reuse a report generated for the same clinical profile
+            stats: Optional dict filled with round trips, tokens and latency
+            
+        Yields:
+            Tuple[str, Dict]: Section type and section data
+        """
+        patient_name = patient_info.get("name", "Unknown Patient")
+        logger.info(f"Streaming report for patient: {patient_name}")
+        start_time = time.time()
+        checks = self._run_local_checks(patient_info)
+        
+        handler = GenerationStatsHandler()
+        callbacks = [handler, *self.callbacks]
+        
+        cached = self._get_cached_report(patient_info) if use_cache else None
+        cached_mode = "cache"
+        use_library = use_cache and cached is None
+        match = self._find_library_plan(patient_info) if use_library else None
+        if match is not None:
+            meal_plan = await self._aenforce_diet(
+                match["meal_plan"], patient_info, callbacks
+            )
+            cached = self._library_report(patient_info, meal_plan)
+            cached_mode = LIBRARY_MODE
+            self._cache_report(patient_info, cached)
+        if cached is not None:
+            self._record_stats(stats, handler, cached_mode, start_time)
+            report = cached.model_dump()
+            yield "patient_summary", {
+                field: report.get(field) for field in PATIENT_SUMMARY_FIELDS
+            }
+            yield "condition_analysis", checks
+            for day, meals in (report.get("meal_plan") or {}).items():
+                yield "meal_plan_day", {"day": day, "meals": meals}
+            yield "report", report
+            return
+        
+        partial: Dict[str, Any] = {}
+        summary_sent = False
+        days_sent = 0
+        # Days are checked against the patient's dietary constraints before sending
+        safe_days: Dict[str, List[Dict[str, Any]]] = {}
+        
+        try:
+            async with self._get_semaphore():
+                messages = self._build_single_shot_messages(patient_info, checks)
+                async for partial in self.streaming_structured_llm.astream(
+                    messages, config={"callbacks": callbacks}
+                ):
+                    if not isinstance(partial, dict):
+                        continue
+                
+                    # Fields arrive in schema order, so a later field means the
+                    # summary is complete
+                    if not summary_sent and any(
+                        key not in PATIENT_SUMMARY_FIELDS for key in partial
+                    ):
+                        summary_sent = True
+                        yield "patient_summary", {
+                            field: partial.get(field)
+                            for field in PATIENT_SUMMARY_FIELDS
+                        }
+                        yield "condition_analysis", checks
+                
+                    # Every day except the last one still being written is complete
+                    days = list((partial.get("meal_plan") or {}).items())
+                    while days_sent < len(days) - 1:
+                        day, meals = days[days_sent]
+                        days_sent += 1
+                        safe = await self._aenforce_diet(
+                            {day: meals}, patient_info, callbacks
+                        )
+                        safe_days.update(safe)
+                        yield "meal_plan_day", {"day": day, "meals": safe_days[day]}
         
+            report = MedicalReport.model_validate(partial)
+        except Exception:
+            REPORTS.inc(mode=SINGLE_SHOT_MODE, outcome="failure")
+            raise
+        final = report.model_dump()
+        if not summary_sent:
+            yield "patient_summary", {
+                field: final.get(field) for field in PATIENT_SUMMARY_FIELDS
+            }
+            yield "condition_analysis", checks
+        for day, meals in list((final.get("meal_plan") or {}).items())[days_sent:]:
+            safe = await self._aenforce_diet({day: meals}, patient_info, callbacks)
+            safe_days.update(safe)
+            yield "meal_plan_day", {"day": day, "meals": safe_days[day]}
+        if final.get("meal_plan"):
+            final["meal_plan"] = {day: safe_days[day] for day in final["meal_plan"]}
+        report = self._with_ingredients(MedicalReport.model_validate(final))
+        final = report.model_dump()
+        
+        logger.info(f"Report streaming successful for patient: {patient_name}")
+        self._record_stats(stats, handler, SINGLE_SHOT_MODE, start_time)
+        self._cache_report(patient_info, report)
+        yield "report", final
+    
+    async def agenerate_batch(
+        self,
+        patients: List[Dict[str, Any]],
+        concurrency: int,
+        use_cache: bool = True,
+        mode: Optional[str] = None
+    ) -> AsyncIterator[Tuple[int, Optional[MedicalReport], Optional[str]]]:
+        """
+        Generate reports for many patients with bounded concurrency
+        
+        Patients sharing a clinical profile are generated once; the others get
+        that report with their own details applied. Results are yielded as
+        they finish, not in input order.
+        
+        Args:
+            patients: List of patient information dictionaries
+            concurrency: Maximum number of reports generated at once for this batch
+            use_cache: Whether to reuse reports generated for the same clinical profile
+            mode: "agent", "single_shot" or "fan_out" (defaults to config)
+            
+        Yields:
+            Tuple: (index in patients, report or None, error message or None)
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, patient_info in enumerate(patients):
+            groups.setdefault(profile_key(patient_info), []).append(index)
+        logger.info(
+            f"Generating batch of {len(patients)} reports "
+            f"({len(groups)} unique profiles)"
+        )
+        
+        limiter = asyncio.Semaphore(concurrency)
+        
+        async def generate_group(indexes: List[int]):
+            async with limiter:
+                try:
+                    report = await self.agenerate_report(
+                        patients[indexes[0]], use_cache=use_cache, mode=mode
+                    )
+                    return indexes, report, None
+                except Exception as e:
+                    logger.error(f"Batch report generation failed: {str(e)}")
+                    return indexes, None, str(e)
+        
+        tasks = [
+            asyncio.create_task(generate_group(indexes)) for indexes in groups.values()
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indexes, report, error = await next_done
+                sections = report.model_dump(exclude=PATIENT_FIELDS) if report else None
+                for index in indexes:
+                    if report is None:
+                        yield index, None, error
+                    elif index == indexes[0]:
+                        yield index, report, None
+                    else:
+                        copy = self._apply_patient_fields(sections, patients[index])
+                        yield index, copy, None
+        finally:
+            # Stop outstanding work if the consumer goes away
+            for task in tasks:
+                task.cancel()
+    
+    def _resolve_mode(self, mode: Optional[str]) -> str:
+        """Validate the requested generation mode, falling back to config"""
+        mode = mode or config.report_generation_mode
+        if mode not in GENERATION_MODES:
+            raise ValueError(
+                f"Generation mode must be one of {GENERATION_MODES}, got '{mode}'"
+            )
+        return mode
+    
+    def _record_stats(
+        self,
+        stats: Optional[Dict[str, Any]],
+        handler: GenerationStatsHandler,
+        mode: str,
+        start_time: float
+    ) -> None:
+        """Log the generation stats and copy them into the caller's dict"""
+        summary = handler.to_dict(mode, time.time() - start_time)
+        logger.info(
+            f"Report stats: mode={summary['mode']}, "
+            f"round trips={summary['llm_round_trips']}, "
+            f"tool calls={summary['tool_calls']}, tokens={summary['total_tokens']}, "
+            f"latency={summary['latency']:.2f}s"
+        )
+        REPORTS.inc(mode=mode, outcome="success")
+        if mode not in ("cache", COALESCED_MODE):
+            AGENT_STEPS.observe(summary["llm_round_trips"], mode=mode)
+        if stats is not None:
+            stats.update(summary)
+    
+    def _get_cached_report(
+        self, patient_info: Dict[str, Any]
+    ) -> Optional[MedicalReport]:
+        """
+        Build a report from cached clinical sections for the patient's profile
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            
+        Returns:
+            Optional[MedicalReport]: The report with this patient's details, or None
+                on a miss
+        """
+        sections = self.report_cache.get(profile_key(patient_info))
+        CACHE_LOOKUPS.inc(cache="report", result="miss" if sections is None else "hit")
+        if sections is None:
+            return None
+        
+        name = patient_info.get("name", "Unknown Patient")
+        logger.info(f"Report cache hit for patient: {name}")
+        return self._apply_patient_fields(sections, patient_info)
+    
+    def _find_library_plan(
+        self, patient_info: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up the closest approved meal plan for the patient's profile
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            
+        Returns:
+            Optional[Dict]: The approved plan, or None without a close enough match
+        """
+        match = self.plan_library.find(patient_info, config.plan_library_min_similarity)
+        CACHE_LOOKUPS.inc(cache="library", result="miss" if match is None else "hit")
+        if match is not None:
+            logger.info(
+                f"Adapting approved meal plan {match['id']} "
+                f"(similarity {match['similarity']})"
+            )
+        return match
+    
+    def _library_report(
+        self, patient_info: Dict[str, Any], meal_plan: Dict[str, List[Dict[str, Any]]]
+    ) -> MedicalReport:
+        """Build a report from an approved meal plan adapted to the patient"""
+        report = self._apply_patient_fields(
+            {"meal_plan_days": len(meal_plan), "meal_plan": meal_plan}, patient_info
+        )
+        return self._with_ingredients(report)
+    
+    def _with_ingredients(self, report: MedicalReport) -> MedicalReport:
+        """Attach the shopping list aggregated from the report's final meal plan"""
+        if not report.meal_plan:
+            return report
+        ingredients = self.ingredient_aggregator.aggregate(report.meal_plan)
+        return report.model_copy(update={"ingredients": ingredients})
+    
+    def _apply_patient_fields(
+        self, sections: Dict[str, Any], patient_info: Dict[str, Any]
+    ) -> MedicalReport:
+        """Combine a report's clinical sections with a patient's own details"""
+        patient_fields = {
+            key: value for key, value in patient_info.items() if key in PATIENT_FIELDS
+        }
+        return MedicalReport(**{**sections, **patient_fields})
+    
+    def _cache_report(
+        self, patient_info: Dict[str, Any], report: MedicalReport
+    ) -> None:
+        """Store a generated report's clinical sections under the patient's profile"""
+        self.report_cache.set(
+            profile_key(patient_info), report.model_dump(exclude=PATIENT_FIELDS)
+        )
+    
+    def _repair_meal_plan(
+        self,
+        meal_plan: Dict[str, List[Dict[str, Any]]],
+        patient_info: Dict[str, Any]
+    ) -> Tuple[DietaryConstraints, Optional[MealPlanRepair]]:
+        """
+        Check a meal plan against the patient's allergies and preferences and
+        substitute what can be
+        
+        Args:
+            meal_plan: Generated meal plan (day -> list of meals)
+            patient_info: Dictionary containing patient information
+            
+        Returns:
+            Tuple: The patient's constraints and the repair, or None if the patient has
+                no constraints
+        """
+        constraints = self.diet_validator.constraints_for(
+            patient_info.get("allergies") or [],
+            patient_info.get("dietary_preferences") or [],
+        )
+        if not constraints:
+            return constraints, None
+        
+        repair = self.diet_validator.repair(meal_plan, constraints)
+        if repair.substituted:
+            MEAL_PLAN_FIXES.inc(len(repair.substituted), action="substituted")
+            logger.info(
+                "Substituted in meal plan: "
+                + ", ".join(f"{v.text} ({v.reason})" for v in repair.substituted)
+            )
+        return constraints, repair
+    
+    def _unresolved_meals(
+        self, repair: MealPlanRepair
+    ) -> Dict[Tuple[str, int], List[DietViolation]]:
+        """Group the violations substitution could not fix by meal"""
+        meals: Dict[Tuple[str, int], List[DietViolation]] = {}
+        for violation in repair.unresolved:
+            key = (violation.day, violation.meal_index)
+            meals.setdefault(key, []).append(violation)
+        return meals
+    
+    def _build_meal_messages(
+        self,
+        meal: Dict[str, Any],
+        violations: List[DietViolation],
+        patient_info: Dict[str, Any]
+    ) -> List[tuple]:
+        """Build the messages for regenerating one meal that breaks the constraints"""
+        allergies = ", ".join(patient_info.get("allergies") or []) or "None"
+        preferences = ", ".join(patient_info.get("dietary_preferences") or []) or "None"
+        prompt = f"Condition: {patient_info.get('condition') or 'Unknown'}\n"
+        prompt += f"Allergies: {allergies}\n"
+        prompt += f"Dietary Preferences: {preferences}\n\n"
+        prompt += f"Meal to replace: {json.dumps(meal)}\n"
+        prompt += "It contains ingredients the patient must avoid: "
+        prompt += ", ".join(f"{v.text} ({v.reason})" for v in violations) + ".\n"
+        prompt += (
+            "Create a replacement meal without them, with the same keys and a similar "
+            "style and nutritional value."
+        )
+        return [
+            ("system", "You are a dietitian fixing one meal of a patient's meal plan."),
+            ("user", prompt),
+        ]
+    
+    def _apply_replacement(
+        self,
+        meal_plan: Dict[str, List[Optional[Dict[str, Any]]]],
+        day: str,
+        index: int,
+        replacement: Optional[Dict[str, Any]],
+        constraints: DietaryConstraints
+    ) -> None:
+        """
+        Put a regenerated meal into the plan, or mark the meal for removal if it still
+        breaks the constraints
+        """
+        if replacement and not self.diet_validator.find_violations(
+            {day: [replacement]}, constraints
+        ):
+            meal_plan[day][index] = replacement
+            MEAL_PLAN_FIXES.inc(action="regenerated")
+            return
+        
+        logger.warning(
+            f"Removing meal {index + 1} of {day}: "
+            "no replacement meets the dietary constraints"
+        )
+        meal_plan[day][index] = None
+        MEAL_PLAN_FIXES.inc(action="removed")
+    
+    def _enforce_diet(
+        self,
+        meal_plan: Dict[str, List[Dict[str, Any]]],
+        patient_info: Dict[str, Any],
+        callbacks: List[BaseCallbackHandler]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Make a meal plan meet the patient's allergies and dietary preferences
+        
+        Excluded ingredients are substituted locally where possible; only the
+        meals that still break a constraint are regenerated. Meals that cannot
+        be fixed are removed.
+        
+        Args:
+            meal_plan: Generated meal plan (day -> list of meals)
+            patient_info: Dictionary containing patient information
+            callbacks: Callbacks for the regeneration calls
+            
+        Returns:
+            Dict: The meal plan with every meal meeting the constraints
+        """
+        constraints, repair = self._repair_meal_plan(meal_plan, patient_info)
+        if repair is None:
+            return meal_plan
+        
+        for (day, index), violations in self._unresolved_meals(repair).items():
+            meal = repair.meal_plan[day][index]
+            try:
+                replacement = self.meal_llm.invoke(
+                    self._build_meal_messages(meal, violations, patient_info),
+                    config={"callbacks": callbacks},
+                ).meal
+            except Exception as e:
+                logger.warning(f"Meal regeneration failed: {str(e)}")
+                replacement = None
+            self._apply_replacement(
+                repair.meal_plan, day, index, replacement, constraints
+            )
+        
+        return {
+            day: [meal for meal in meals if meal is not None]
+            for day, meals in repair.meal_plan.items()
+        }
+    
+    async def _aenforce_diet(
+        self,
+        meal_plan: Dict[str, List[Dict[str, Any]]],
+        patient_info: Dict[str, Any],
+        callbacks: List[BaseCallbackHandler]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Make a meal plan meet the dietary constraints, regenerating concurrently"""
+        constraints, repair = self._repair_meal_plan(meal_plan, patient_info)
+        if repair is None:
+            return meal_plan
+        
+        unresolved = self._unresolved_meals(repair)
+        results = await asyncio.gather(
+            *(
+                self.meal_llm.ainvoke(
+                    self._build_meal_messages(
+                        repair.meal_plan[day][index], violations, patient_info
+                    ),
+                    config={"callbacks": callbacks},
+                )
+                for (day, index), violations in unresolved.items()
+            ),
+            return_exceptions=True,
+        )
+        for (day, index), result in zip(unresolved, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Meal regeneration failed: {str(result)}")
+            replacement = None if isinstance(result, Exception) else result.meal
+            self._apply_replacement(
+                repair.meal_plan, day, index, replacement, constraints
+            )
+        
+        return {
+            day: [meal for meal in meals if meal is not None]
+            for day, meals in repair.meal_plan.items()
+        }
+    
+    async def warm_up(self) -> None:
+        """Open a pooled LLM connection so the first request skips connection setup"""
+        client = getattr(self.llm, "root_async_client", None)
+        if client is None:
+            return
+        
+        start_time = time.time()
+        try:
+            await asyncio.wait_for(client.models.list(), timeout=10)
+            logger.info(
+                f"LLM connection pool warmed in {time.time() - start_time:.2f}s"
+            )
+        except Exception as e:
+            logger.warning(f"LLM connection warm-up failed: {str(e)}")
+    
+    def provider_stats(self) -> Dict[str, Any]:
+        """Per-provider latency and error statistics of the hedged generation paths"""
+        if self.fallback_llm is None:
+            return {"hedging": False}
+        return {
+            "hedging": True,
+            AGENT_MODE: self.agent.provider_stats(),
+            SINGLE_SHOT_MODE: self.structured_llm.provider_stats(),
+            FAN_OUT_MODE: self.day_llm.provider_stats(),
+        }
+    
+    def _build_fallback_llm(self):
+        """Create the secondary Gemini model if hedging is enabled and configured"""
+        if not config.llm_hedging:
+            return None
+        if not config.google_api_key:
+            logger.warning(
+                "LLM hedging is enabled but GEMINI_API_KEY is not set; hedging disabled"
+            )
+            return None
+        try:
+            return GeminiChat(model=config.hedge_model_name, temperature=0).llm
+        except ValueError as e:
+            logger.error(
+                f"Failed to initialize hedge model, hedging disabled: {str(e)}"
+            )
+            return None
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent in-flight reports"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(config.report_max_concurrency)
+        return self._semaphore
+    
+    def _build_agent_inputs(self, patient_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the agent input state for a patient
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            
+        Returns:
+            Dict: Agent inputs with the formatted patient description
+        """
         # Format the patient information as a message to the agent
         patient_description = self._format_patient_info(patient_info)
         logger.debug("Patient description formatted for LLM")
+        return {"messages": [("user", patient_description)]}
+    
+    def _run_local_checks(self, patient_info: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Run the deterministic medical tools locally instead of through the LLM
         
-        # Invoke the agent with the formatted message
-        logger.info("Invoking LangGraph agent")
-        inputs = {"messages": [("user", patient_description)]}
-        response = self.agent.invoke(inputs)
+        Args:
+            patient_info: Dictionary containing patient information
+            
+        Returns:
+            Dict[str, str]: Tool results keyed by check name
+        """
+        tools = self.tools_by_name
+        condition = patient_info.get("condition") or ""
+        allergies = patient_info.get("allergies") or []
+        preferences = patient_info.get("dietary_preferences") or []
+        return {
+            "symptom_check": tools["check_condition_symptoms"].invoke(
+                {"symptoms": patient_info.get("symptoms") or [], "condition": condition}
+            ),
+            "dietary_needs": tools["analyze_dietary_needs"].invoke(
+                {"condition": condition, "allergies": allergies}
+            ),
+            "meal_plan_guidance": tools["generate_three_day_meal_plan"].invoke(
+                {
+                    "condition": condition,
+                    "dietary_preferences": preferences,
+                    "allergies": allergies,
+                }
+            ),
+        }
+    
+    def _build_single_shot_messages(
+        self,
+        patient_info: Dict[str, Any],
+        checks: Optional[Dict[str, str]] = None
+    ) -> List[tuple]:
+        """
+        Build the messages for a single structured-output call
         
-        logger.info(f"Report generation successful for patient: {patient_name}")
-        # Return the structured response
-        return response["structured_response"]
+        Args:
+            patient_info: Dictionary containing patient information
+            checks: Precomputed local check results (computed if omitted)
+            
+        Returns:
+            List[tuple]: System and user messages with the local check results included
+        """
+        checks = checks or self._run_local_checks(patient_info)
+        prompt = self._format_patient_info(patient_info)
+        prompt += "\n\nClinical check results:\n"
+        prompt += "\n".join(
+            f"- {name.replace('_', ' ').capitalize()}: {result}"
+            for name, result in checks.items()
+        )
+        return [("system", self.single_shot_system_prompt), ("user", prompt)]
+    
+    def _generate_fan_out(
+        self, patient_info: Dict[str, Any], run_config: Dict[str, Any]
+    ) -> MedicalReport:
+        """
+        Generate a report from an outline call and one call per day, run in parallel
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            run_config: Runnable config with the callbacks for every call
+            
+        Returns:
+            MedicalReport: The merged report
+        """
+        checks = self._run_local_checks(patient_info)
+        outline = self._fan_out_days(
+            self.outline_llm.invoke(
+                self._build_outline_messages(patient_info, checks), config=run_config
+            )
+        )
+        with ThreadPoolExecutor(max_workers=len(outline)) as executor:
+            days = list(
+                executor.map(
+                    lambda index: self.day_llm.invoke(
+                        self._build_day_messages(patient_info, checks, outline, index),
+                        config=run_config,
+                    ),
+                    range(len(outline)),
+                )
+            )
+        return self._merge_fan_out(patient_info, days)
+    
+    async def _agenerate_fan_out(
+        self, patient_info: Dict[str, Any], run_config: Dict[str, Any]
+    ) -> MedicalReport:
+        """Generate a report from an outline call and one call per day, concurrently"""
+        checks = self._run_local_checks(patient_info)
+        outline = self._fan_out_days(
+            await self.outline_llm.ainvoke(
+                self._build_outline_messages(patient_info, checks), config=run_config
+            )
+        )
+        days = await asyncio.gather(
+            *(
+                self.day_llm.ainvoke(
+                    self._build_day_messages(patient_info, checks, outline, index),
+                    config=run_config,
+                )
+                for index in range(len(outline))
+            )
+        )
+        return self._merge_fan_out(patient_info, days)
+    
+    def _fan_out_days(self, outline: MealPlanOutline) -> List[PlannedDay]:
+        """Exactly FAN_OUT_DAYS day outlines, padding a short outline with open days"""
+        days = list(outline.days[:FAN_OUT_DAYS])
+        days += [
+            PlannedDay(theme="Varied", main_foods=[])
+            for _ in range(FAN_OUT_DAYS - len(days))
+        ]
+        return days
+    
+    def _build_outline_messages(
+        self, patient_info: Dict[str, Any], checks: Dict[str, str]
+    ) -> List[tuple]:
+        """Build the messages for the planning call that outlines every day"""
+        prompt = self._format_patient_info(patient_info)
+        prompt += "\n\nClinical check results:\n"
+        prompt += "\n".join(
+            f"- {name.replace('_', ' ').capitalize()}: {result}"
+            for name, result in checks.items()
+        )
+        prompt += f"\n\nOutline a {FAN_OUT_DAYS}-day meal plan: for each day give "
+        prompt += "a short theme and its main proteins and grains. Use different main "
+        prompt += "foods on every day. Do not write the meals themselves."
+        system = "You are a dietitian planning a varied meal plan for a patient."
+        return [("system", system), ("user", prompt)]
+    
+    def _build_day_messages(
+        self,
+        patient_info: Dict[str, Any],
+        checks: Dict[str, str],
+        outline: List[PlannedDay],
+        index: int
+    ) -> List[tuple]:
+        """
+        Build the messages for generating one meal-plan day
+        
+        The other days' main foods are included so days generated in parallel
+        do not repeat each other.
+        
+        Args:
+            patient_info: Dictionary containing patient information
+            checks: Local check results
+            outline: Outline of every day
+            index: Index of the day to generate
+            
+        Returns:
+            List[tuple]: System and user messages
+        """
+        planned = outline[index]
+        other_foods = sorted({
+            food
+            for i, day in enumerate(outline) if i != index
+            for food in day.main_foods
+        })
+        allergies = ", ".join(patient_info.get("allergies") or []) or "None"
+        medications = ", ".join(patient_info.get("medications") or []) or "None"
+        preferences = ", ".join(patient_info.get("dietary_preferences") or []) or "None"
+        
+        prompt = f"Condition: {patient_info.get('condition') or 'Unknown'}\n"
+        prompt += f"Age: {patient_info.get('age')}\n"
+        prompt += f"Allergies: {allergies}\n"
+        prompt += f"Medications: {medications}\n"
+        prompt += f"Dietary Preferences: {preferences}\n\n"
+        prompt += f"Dietary needs: {checks['dietary_needs']}\n"
+        prompt += "Meal plan guidance (for the whole plan): "
+        prompt += f"{checks['meal_plan_guidance']}\n\n"
+        prompt += f"Write the meals for Day {index + 1} of {len(outline)}. "
+        prompt += f"Theme: {planned.theme}.\n"
+        if planned.main_foods:
+            prompt += f"Build the day around: {', '.join(planned.main_foods)}.\n"
+        if other_foods:
+            prompt += f"Other days already use {', '.join(other_foods)}; "
+            prompt += "do not make these the main food of any meal.\n"
+        prompt += "Give breakfast, lunch, dinner and snacks, "
+        prompt += "each with a description and calorie count."
+        system = "You are a dietitian writing one day of a patient's meal plan."
+        return [("system", system), ("user", prompt)]
+    
+    def _merge_fan_out(
+        self, patient_info: Dict[str, Any], days: List[MealPlanDay]
+    ) -> MedicalReport:
+        """Merge the generated days and the patient's details into a validated report"""
+        meal_plan = {f"Day {index + 1}": day.meals for index, day in enumerate(days)}
+        return self._apply_patient_fields(
+            {"meal_plan_days": len(meal_plan), "meal_plan": meal_plan}, patient_info
+        )
     
     def _format_patient_info(self, patient_info: Dict[str, Any]) -> str:
         """
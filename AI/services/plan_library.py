@@ -0,0 +1,242 @@
+# Built-in imports
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+# Local imports
+from config.logging_info import setup_logger
+from services.condition_engine import get_condition_engine
+from services.diet_validator import get_diet_validator
+from services.text_matcher import normalize
+
+# Set up logger
+logger = setup_logger("plan_library")
+
+# Age bands; plans are only reused within a band (portions and foods differ for
+# children)
+AGE_BANDS = ((13, "child"), (18, "teen"), (65, "adult"))
+
+
+def _age_band(age: Any) -> str:
+    """Map an age onto its band"""
+    try:
+        age = float(age)
+    except (TypeError, ValueError):
+        return "unknown"
+    for limit, band in AGE_BANDS:
+        if age < limit:
+            return band
+    return "senior"
+
+
+def condition_key(condition: Optional[str]) -> str:
+    """Known conditions in a free-text condition, else the normalized text"""
+    identified = get_condition_engine().identify_conditions(condition or "")
+    return ",".join(sorted(identified)) if identified else normalize(condition or "")
+
+
+def medication_key(medications: Optional[List[str]]) -> str:
+    """
+    Normalized medication set of a profile
+
+    Plans are only reused for exactly the same medications: the dietary
+    safety checks do not cover drug-food interactions (e.g. vitamin K with
+    warfarin), so an approval does not carry over to other medications.
+    """
+    return json.dumps(sorted({normalize(m) for m in medications or [] if normalize(m)}))
+
+
+def profile_features(patient_info: Dict[str, Any]) -> Set[str]:
+    """
+    Dietary features of a profile compared between patients
+
+    Args:
+        patient_info: Dictionary containing patient information
+
+    Returns:
+        Set[str]: Excluded food groups and normalized preferences
+    """
+    constraints = get_diet_validator().constraints_for(
+        patient_info.get("allergies") or [],
+        patient_info.get("dietary_preferences") or [],
+    )
+    features = {f"exclude:{group}" for group in constraints.groups}
+    preferences = [normalize(p) for p in patient_info.get("dietary_preferences") or []]
+    features.update(f"preference:{p}" for p in preferences if p)
+    return features
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two feature sets (1.0 when both are empty)"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ApprovedPlanLibrary:
+    """
+    SQLite-backed library of doctor-approved meal plans.
+
+    Plans are indexed by the recognized conditions, age band and medications
+    of the patient they were approved for, plus their dietary features
+    (excluded food groups and preferences). A lookup scans only the plans
+    with the same condition, age band and medications and returns the one
+    whose features are most similar.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the library database
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS approved_plans (
+                id TEXT PRIMARY KEY,
+                condition_key TEXT NOT NULL,
+                age_band TEXT NOT NULL,
+                medication_key TEXT NOT NULL DEFAULT '',
+                features TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                meal_plan TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._migrate()
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_approved_plans_key "
+            "ON approved_plans (condition_key, age_band, medication_key)"
+        )
+
+    def _migrate(self) -> None:
+        """Move medications from the features to the key in a library made before it"""
+        rows = self._conn.execute("PRAGMA table_info(approved_plans)").fetchall()
+        if "medication_key" in {row["name"] for row in rows}:
+            return
+        self._conn.execute(
+            "ALTER TABLE approved_plans "
+            "ADD COLUMN medication_key TEXT NOT NULL DEFAULT ''"
+        )
+        rows = self._conn.execute("SELECT id, profile FROM approved_plans").fetchall()
+        for row in rows:
+            profile = json.loads(row["profile"])
+            self._conn.execute(
+                "UPDATE approved_plans SET medication_key = ?, features = ? "
+                "WHERE id = ?",
+                (
+                    medication_key(profile.get("medications")),
+                    json.dumps(sorted(profile_features(profile))),
+                    row["id"],
+                ),
+            )
+        self._conn.execute("DROP INDEX IF EXISTS idx_approved_plans_profile")
+
+    def add(
+        self,
+        patient_info: Dict[str, Any],
+        meal_plan: Dict[str, List[Dict[str, Any]]],
+        plan_id: Optional[str] = None
+    ) -> str:
+        """
+        Index an approved meal plan; a plan with the same id is replaced
+
+        Args:
+            patient_info: Profile of the patient the plan was approved for
+            meal_plan: Approved meal plan (day -> list of meals)
+            plan_id: Identifier, e.g. the approved request's id (generated if omitted)
+
+        Returns:
+            str: The plan id
+        """
+        plan_id = plan_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO approved_plans "
+                "(id, condition_key, age_band, medication_key, features, profile, "
+                "meal_plan, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    plan_id,
+                    condition_key(patient_info.get("condition")),
+                    _age_band(patient_info.get("age")),
+                    medication_key(patient_info.get("medications")),
+                    json.dumps(sorted(profile_features(patient_info))),
+                    json.dumps(patient_info),
+                    json.dumps(meal_plan),
+                    time.time(),
+                ),
+            )
+        logger.info(f"Indexed approved meal plan {plan_id}")
+        return plan_id
+
+    def find(
+        self, patient_info: Dict[str, Any], min_similarity: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the most similar approved plan for a patient with the same condition,
+        age band and medications
+
+        Args:
+            patient_info: Dictionary containing patient information
+            min_similarity: Minimum feature similarity for a match
+
+        Returns:
+            Optional[Dict]: The plan (id, meal_plan, profile, similarity), or None
+                without a close match
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, features, profile, meal_plan FROM approved_plans "
+                "WHERE condition_key = ? AND age_band = ? AND medication_key = ? "
+                "ORDER BY created_at DESC",
+                (
+                    condition_key(patient_info.get("condition")),
+                    _age_band(patient_info.get("age")),
+                    medication_key(patient_info.get("medications")),
+                ),
+            ).fetchall()
+        if not rows:
+            return None
+
+        features = profile_features(patient_info)
+        best, best_score = None, -1.0
+        for row in rows:
+            score = similarity(features, set(json.loads(row["features"])))
+            if score > best_score:
+                best, best_score = row, score
+        if best_score < min_similarity:
+            return None
+
+        return {
+            "id": best["id"],
+            "meal_plan": json.loads(best["meal_plan"]),
+            "profile": json.loads(best["profile"]),
+            "similarity": round(best_score, 3),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the number of indexed plans, overall and per condition"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT condition_key, COUNT(*) AS n FROM approved_plans "
+                "GROUP BY condition_key"
+            ).fetchall()
+        by_condition = {row["condition_key"]: row["n"] for row in rows}
+        return {"plans": sum(by_condition.values()), "plans_by_condition": by_condition}
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,133 @@
+# Built-in imports
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+# Fields copied from the request onto a cached report
+PATIENT_FIELDS = {
+    "name", "condition", "age", "gender", "weight", "height",
+    "allergies", "medications", "symptoms", "dietary_preferences",
+}
+
+# Bucket widths for the clinical profile key
+AGE_BUCKET_YEARS = 2
+WEIGHT_BUCKET_KG = 5
+HEIGHT_BUCKET_CM = 5
+
+
+def _normalize(text: Any) -> str:
+    """Lowercase text and collapse punctuation and whitespace"""
+    return re.sub(r"[^a-z0-9]+", " ", str(text or "").lower()).strip()
+
+
+def _normalize_all(values: Optional[Iterable[Any]]) -> List[str]:
+    """Normalize, deduplicate and sort a list of free-text values"""
+    return sorted({_normalize(value) for value in values or [] if _normalize(value)})
+
+
+def _bucket(value: Any, width: float) -> Optional[int]:
+    """Map a measurement onto its bucket index"""
+    try:
+        return int(float(value) // width)
+    except (TypeError, ValueError):
+        return None
+
+
+def profile_key(patient_info: Dict[str, Any]) -> str:
+    """
+    Build the cache key for a patient's clinical profile
+
+    Patients with the same normalized condition, allergies, dietary
+    preferences and medications, and the same age/weight/height buckets,
+    share a key.
+
+    Args:
+        patient_info: Dictionary containing patient information
+
+    Returns:
+        str: Hex digest identifying the clinical profile
+    """
+    profile = {
+        "condition": _normalize(patient_info.get("condition")),
+        "allergies": _normalize_all(patient_info.get("allergies")),
+        "dietary_preferences": _normalize_all(patient_info.get("dietary_preferences")),
+        "medications": _normalize_all(patient_info.get("medications")),
+        "age": _bucket(patient_info.get("age"), AGE_BUCKET_YEARS),
+        "weight": _bucket(patient_info.get("weight"), WEIGHT_BUCKET_KG),
+        "height": _bucket(patient_info.get("height"), HEIGHT_BUCKET_CM),
+    }
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode()).hexdigest()
+
+
+class ReportCache:
+    """
+    Size-bounded, TTL-expiring LRU cache of generated clinical report sections.
+
+    Entries hold the report fields that depend only on the clinical profile;
+    the patient-specific fields are re-applied from the request on a hit.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        """
+        Initialize the cache
+
+        Args:
+            ttl: Seconds an entry stays valid
+            max_size: Maximum number of entries before the least recently used is
+                evicted
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached sections for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, sections: Dict[str, Any]) -> None:
+        """Store sections under key, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, sections)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,383 @@
+# Built-in imports
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Local imports
+from config.logging_info import setup_logger
+
+# Set up logger
+logger = setup_logger("report_jobs")
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+class ReportJobStore:
+    """
+    SQLite-backed persistence for report generation jobs.
+
+    A running job is leased to the store that claimed it. Several processes
+    (e.g. uvicorn workers) can share one database: each job is claimed by
+    exactly one of them, and a job is only re-queued once its owner stopped
+    renewing the lease.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the job database
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS report_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                lease_until REAL
+            )
+            """
+        )
+        self._migrate()
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_report_jobs_status "
+            "ON report_jobs (status, created_at)"
+        )
+
+    def _migrate(self) -> None:
+        """Add the lease columns to a database made before them"""
+        rows = self._conn.execute("PRAGMA table_info(report_jobs)").fetchall()
+        columns = {row["name"] for row in rows}
+        for column in ("owner TEXT", "lease_until REAL"):
+            if column.split()[0] not in columns:
+                self._conn.execute(f"ALTER TABLE report_jobs ADD COLUMN {column}")
+
+    def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a new queued job and return it"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO report_jobs (id, status, payload, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job by id, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM report_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim(self, job_id: str, lease: float) -> Optional[Dict[str, Any]]:
+        """
+        Mark a queued job running under this store's lease
+
+        Args:
+            job_id: Job identifier
+            lease: Seconds the claim holds unless renewed
+
+        Returns:
+            Optional[Dict]: The claimed job, or None if it is gone or another
+            process claimed it first
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE report_jobs SET status = ?, started_at = ?, owner = ?, "
+                "lease_until = ? WHERE id = ? AND status = ?",
+                (RUNNING, now, self.owner, now + lease, job_id, QUEUED),
+            )
+        return self.get(job_id) if cursor.rowcount else None
+
+    def renew(self, job_id: str, lease: float) -> None:
+        """Extend this store's lease on a running job"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET lease_until = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (time.time() + lease, job_id, RUNNING, self.owner),
+            )
+
+    def mark_finished(
+        self,
+        job_id: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Store the job's result or error"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET status = ?, result = ?, error = ?, "
+                "finished_at = ? WHERE id = ?",
+                (
+                    FAILED if error else SUCCEEDED,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def requeue_unfinished(self) -> List[str]:
+        """
+        Reset interrupted jobs to queued and return all queued ids, oldest first
+
+        Only running jobs whose lease expired are reset; jobs another live
+        process is still working on are left alone.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET status = ?, started_at = NULL, owner = NULL, "
+                "lease_until = NULL WHERE status = ? "
+                "AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, RUNNING, time.time()),
+            )
+            rows = self._conn.execute(
+                "SELECT id FROM report_jobs WHERE status = ? ORDER BY created_at",
+                (QUEUED,),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs that finished before the given timestamp"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM report_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED_STATUSES, older_than),
+            )
+        return cursor.rowcount
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Count stored jobs per status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM report_jobs GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class ReportJobQueue:
+    """
+    Asynchronous report generation queue processed by a bounded worker pool.
+
+    Jobs are persisted in a ReportJobStore, so queued and interrupted jobs are
+    picked up again when the service restarts. Store calls run in a thread so
+    SQLite never blocks the event loop. While a job runs its lease is renewed
+    every third of the lease period.
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[], Any],
+        db_path: str,
+        workers: int,
+        job_ttl: float,
+        lease: float = 60,
+    ):
+        """
+        Initialize the job queue
+
+        Args:
+            service_factory: Callable returning the MedicalReportService
+            db_path: Path of the SQLite database file
+            workers: Number of concurrent workers
+            job_ttl: Seconds finished jobs are kept before being pruned
+            lease: Seconds a running job stays claimed without a renewal
+        """
+        self.service_factory = service_factory
+        self.db_path = db_path
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self.lease = lease
+        self.store: Optional[ReportJobStore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._events: Dict[str, asyncio.Event] = {}
+        self._running = 0
+        self._wait_times: Deque[float] = deque(maxlen=500)
+        self._last_prune = 0.0
+
+    async def start(self) -> None:
+        """Open the store, re-enqueue unfinished jobs and start the workers"""
+        self.store = await asyncio.to_thread(ReportJobStore, self.db_path)
+        self._queue = asyncio.Queue()
+        await self._prune()
+
+        pending = await asyncio.to_thread(self.store.requeue_unfinished)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(
+            f"Report job queue started with {self.workers} workers, "
+            f"{len(pending)} pending jobs"
+        )
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs are re-run on next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store:
+            await asyncio.to_thread(self.store.close)
+            self.store = None
+        logger.info("Report job queue stopped")
+
+    async def submit(self, patient_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enqueue a report generation job
+
+        Args:
+            patient_info: Dictionary containing patient information
+
+        Returns:
+            Dict: The stored job
+        """
+        job = await asyncio.to_thread(self.store.create, patient_info)
+        self._queue.put_nowait(job["id"])
+        logger.info(
+            f"Queued report job {job['id']} (queue depth {self._queue.qsize()})"
+        )
+        return job
+
+    async def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a job, optionally long-polling until it finishes
+
+        Args:
+            job_id: Job identifier
+            wait: Maximum seconds to wait for the job to finish
+
+        Returns:
+            Optional[Dict]: The job, or None if it does not exist
+        """
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] in FINISHED_STATUSES or wait <= 0:
+            return job
+
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Report queue depth, worker utilisation and queue wait times"""
+        wait_times = sorted(self._wait_times)
+        jobs_by_status = (
+            await asyncio.to_thread(self.store.count_by_status) if self.store else {}
+        )
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "workers": self.workers,
+            "jobs_by_status": jobs_by_status,
+            "wait_time_avg": sum(wait_times) / len(wait_times) if wait_times else 0.0,
+            "wait_time_p95": (
+                wait_times[int(0.95 * (len(wait_times) - 1))] if wait_times else 0.0
+            ),
+            "wait_time_max": wait_times[-1] if wait_times else 0.0,
+        }
+
+    async def _worker(self, worker_id: int) -> None:
+        """Process queued jobs until cancelled"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(
+                    f"Worker {worker_id} failed to process job {job_id}: {str(e)}"
+                )
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        """Generate the report for one job and store the outcome"""
+        job = await asyncio.to_thread(self.store.claim, job_id, self.lease)
+        if job is None:
+            return
+
+        self._wait_times.append(job["started_at"] - job["created_at"])
+        self._running += 1
+        heartbeat = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            report = await self.service_factory().agenerate_report(job["payload"])
+            await asyncio.to_thread(
+                self.store.mark_finished, job_id, result=report.model_dump()
+            )
+            logger.info(f"Report job {job_id} succeeded")
+        except Exception as e:
+            await asyncio.to_thread(self.store.mark_finished, job_id, error=str(e))
+            logger.error(f"Report job {job_id} failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            self._running -= 1
+            event = self._events.pop(job_id, None)
+            if event:
+                event.set()
+            await self._prune()
+
+    async def _renew_lease(self, job_id: str) -> None:
+        """Keep renewing the lease on a running job until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, job_id, self.lease)
+            except Exception as e:
+                logger.warning(f"Failed to renew lease on report job {job_id}: {e}")
+
+    async def _prune(self) -> None:
+        """Delete expired finished jobs, at most once a minute"""
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        removed = await asyncio.to_thread(self.store.prune, now - self.job_ttl)
+        if removed:
+            logger.info(f"Pruned {removed} expired report jobs")
@@ -0,0 +1,194 @@
+# Built-in imports
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+
+class PhraseMatch(NamedTuple):
+    """A phrase found in a text; start/end are offsets into the original text"""
+    start: int
+    end: int
+    phrase: str
+    values: Tuple[Any, ...]
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """
+    Lowercase text and collapse punctuation and whitespace to single spaces
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Tuple[str, List[int]]: Normalized text and, for each of its characters,
+        the offset of the corresponding character in the original text
+    """
+    chars: List[str] = []
+    offsets: List[int] = []
+    pending_space = False
+    for index, ch in enumerate(text):
+        low = ch.lower()
+        if len(low) != 1 or not low.isalnum():
+            pending_space = bool(chars)
+            continue
+        if pending_space:
+            chars.append(" ")
+            offsets.append(index - 1)
+            pending_space = False
+        chars.append(low)
+        offsets.append(index)
+    return "".join(chars), offsets
+
+
+def normalize(text: str) -> str:
+    """Lowercase text and collapse punctuation and whitespace to single spaces"""
+    return normalize_with_offsets(text)[0]
+
+
+def plural_variants(phrase: str) -> Set[str]:
+    """Return phrase and its regular plurals (berry -> berries, peach -> peaches)"""
+    variants = {phrase}
+    if phrase.endswith(("s", "x", "z", "ch", "sh")):
+        variants.add(phrase + "es")
+    elif phrase.endswith("y") and len(phrase) > 1 and phrase[-2] not in "aeiou":
+        variants.add(phrase[:-1] + "ies")
+    else:
+        variants.add(phrase + "s")
+    return variants
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton matching many phrases in one pass over a text.
+
+    Matching is case-insensitive, ignores punctuation and only reports
+    whole-word matches. Each phrase carries one or more values (e.g. the
+    condition or allergen it belongs to).
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[List[int]] = [[]]
+        self._out: List[List[int]] = [[]]
+        self._phrases: List[str] = []
+        self._values: List[List[Any]] = []
+        self._phrase_ids: Dict[str, int] = {}
+        self._built = True
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def add(self, phrase: str, value: Any = None) -> None:
+        """
+        Add a phrase to the matcher
+
+        Args:
+            phrase: Phrase to match (normalized like the searched text)
+            value: Value reported with matches of the phrase
+        """
+        phrase = normalize(phrase)
+        if not phrase:
+            return
+
+        phrase_id = self._phrase_ids.get(phrase)
+        if phrase_id is None:
+            phrase_id = self._phrase_ids[phrase] = len(self._phrases)
+            self._phrases.append(phrase)
+            self._values.append([])
+
+            state = 0
+            for ch in phrase:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._terminal.append([])
+                    self._goto[state][ch] = next_state
+                state = next_state
+            self._terminal[state].append(phrase_id)
+            self._built = False
+
+        if value is not None and value not in self._values[phrase_id]:
+            self._values[phrase_id].append(value)
+
+    def add_all(self, phrases: Iterable[str], value: Any = None) -> None:
+        """Add several phrases with the same value"""
+        for phrase in phrases:
+            self.add(phrase, value)
+
+    def build(self) -> None:
+        """Compute failure links; called automatically before the first search"""
+        self._fail = [0] * len(self._goto)
+        self._out = [list(terminal) for terminal in self._terminal]
+
+        # Breadth-first, so a state's failure target is final before its children are
+        # visited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state].extend(self._out[self._fail[next_state]])
+        self._built = True
+
+    def find_all(self, text: str) -> List[PhraseMatch]:
+        """
+        Find every whole-word phrase occurrence, including overlapping ones
+
+        Args:
+            text: Text to search
+
+        Returns:
+            List[PhraseMatch]: Matches ordered by end offset
+        """
+        if not self._built:
+            self.build()
+
+        normalized, offsets = normalize_with_offsets(text)
+        length = len(normalized)
+        matches: List[PhraseMatch] = []
+        state = 0
+        for index, ch in enumerate(normalized):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if not self._out[state]:
+                continue
+            if index + 1 < length and normalized[index + 1] != " ":
+                continue
+            for phrase_id in self._out[state]:
+                start = index - len(self._phrases[phrase_id]) + 1
+                if start > 0 and normalized[start - 1] != " ":
+                    continue
+                matches.append(PhraseMatch(
+                    start=offsets[start],
+                    end=offsets[index] + 1,
+                    phrase=self._phrases[phrase_id],
+                    values=tuple(self._values[phrase_id]),
+                ))
+        return matches
+
+    def find(self, text: str) -> List[PhraseMatch]:
+        """
+        Find non-overlapping matches, preferring the leftmost and then the longest
+
+        Args:
+            text: Text to search
+
+        Returns:
+            List[PhraseMatch]: Matches ordered by start offset
+        """
+        selected: List[PhraseMatch] = []
+        last_end = -1
+        for match in sorted(
+            self.find_all(text), key=lambda m: (m.start, -(m.end - m.start))
+        ):
+            if match.start >= last_end:
+                selected.append(match)
+                last_end = match.end
+        return selected
@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from api import admission
+from api.admission import AdmissionMiddleware, TokenBucket
+from config.settings import config
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_starts_full_and_reports_the_wait(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst_seconds=3)
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(1.0)
+
+
+def test_bucket_refills_at_the_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst_seconds=3)
+    for _ in range(3):
+        bucket.try_acquire()
+
+    clock.now += 0.5
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0.0
+
+    clock.now += 60
+    waits = [bucket.try_acquire() for _ in range(4)]
+    assert waits == [0.0, 0.0, 0.0, pytest.approx(1.0)]
+
+
+def test_refund_returns_a_token_without_exceeding_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst_seconds=2)
+    bucket.try_acquire()
+    bucket.refund()
+    bucket.refund()
+
+    assert bucket.tokens == bucket.capacity
+
+
+def test_bucket_holds_at_least_one_request(clock):
+    assert TokenBucket(rate_per_minute=1, burst_seconds=1).capacity == 1.0
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    monkeypatch.setattr(config, "_api_rate_limit", 2)
+    monkeypatch.setattr(config, "_api_global_rate_limit", 0)
+    monkeypatch.setattr(config, "_api_rate_limit_burst_seconds", 60)
+    monkeypatch.setattr(config, "_api_max_in_flight", 0)
+    report = Route("/api/v1/report", ok, methods=["GET", "POST"])
+    app = Starlette(routes=[report, Route("/health", ok)])
+    return AdmissionMiddleware(app)
+
+
+def statuses(app, paths):
+    async def send_all():
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://test")
+        async with client:
+            return [await client.get(path) for path in paths]
+
+    return asyncio.run(send_all())
+
+
+def test_client_over_its_limit_gets_429_with_retry_after(limited_app):
+    responses = statuses(limited_app, ["/api/v1/report"] * 3)
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert int(responses[-1].headers["Retry-After"]) >= 1
+
+
+def test_non_api_paths_are_not_limited(limited_app):
+    assert [r.status_code for r in statuses(limited_app, ["/health"] * 5)] == [200] * 5
+
+
+@pytest.fixture
+def slot_limited(monkeypatch):
+    """Middleware with one slot, and an app whose requests hold it until released"""
+    monkeypatch.setattr(config, "_api_rate_limit", 0)
+    monkeypatch.setattr(config, "_api_global_rate_limit", 0)
+    monkeypatch.setattr(config, "_api_max_in_flight", 1)
+    monkeypatch.setattr(config, "_api_queue_timeout", 0.05)
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    async def slow(request):
+        started.set()
+        await release.wait()
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/api/v1/report", slow, methods=["POST"])])
+    return AdmissionMiddleware(app), started, release
+
+
+async def hold_slot(client, started):
+    """Start a request that occupies the only slot until released"""
+    holder = asyncio.create_task(client.post("/api/v1/report"))
+    await started.wait()
+    return holder
+
+
+def run_with_client(app, scenario):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await scenario(c)
+
+    return asyncio.run(main())
+
+
+def test_request_waiting_past_the_queue_timeout_gets_503(slot_limited):
+    middleware, started, release = slot_limited
+
+    async def scenario(client):
+        holder = await hold_slot(client, started)
+        shed = await client.post("/api/v1/report")
+        release.set()
+        return shed, await holder, await client.post("/api/v1/report")
+
+    shed, held, after = run_with_client(middleware, scenario)
+
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert [held.status_code, after.status_code] == [200, 200]
+    assert middleware._slots._value == 1
+
+
+def test_request_is_shed_at_once_when_the_expected_wait_is_too_long(slot_limited):
+    middleware, started, release = slot_limited
+    middleware._service_time = 30.0
+
+    async def scenario(client):
+        holder = await hold_slot(client, started)
+        begin = time.monotonic()
+        shed = await client.post("/api/v1/report")
+        waited = time.monotonic() - begin
+        release.set()
+        await holder
+        return shed, waited
+
+    shed, waited = run_with_client(middleware, scenario)
+
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "30"
+    assert waited < middleware.queue_timeout
+
+
+def test_cancelled_waiter_does_not_leak_its_slot(slot_limited):
+    middleware, _, _ = slot_limited
+    middleware.queue_timeout = 5
+
+    async def scenario():
+        await middleware._slots.acquire()
+        waiter = asyncio.create_task(middleware._acquire_slot())
+        while not middleware._slots._waiters:
+            await asyncio.sleep(0)
+        # The slot is handed to the waiter in the same step it is cancelled
+        middleware._slots.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return waiter.cancelled()
+
+    assert asyncio.run(scenario())
+    assert middleware._slots._value == 1
@@ -0,0 +1,163 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.diet_validator import DEFAULT_LEXICON_FILE, DietValidator
+from services.medical_report import MedicalReportService
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return DietValidator.from_file()
+
+
+def scanned(validator, text, allergies, preferences=()):
+    constraints = validator.constraints_for(list(allergies), list(preferences))
+    hits = validator.scan(text, constraints)
+    return [(group, ingredient) for _, group, ingredient in hits]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Oatmeal with almond milk",
+        "Toast with peanut butter",
+        "Vegan cheese on rice cakes",
+        "Coconut yogurt",
+    ],
+)
+def test_safe_phrases_shadow_the_ingredient_inside(validator, text):
+    assert scanned(validator, text, ["dairy"]) == []
+
+
+def test_butter_alone_is_dairy(validator):
+    assert scanned(validator, "Toast with butter", ["dairy"]) == [("milk", "butter")]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Dairy-free cheese sandwich", []),
+        ("Dairy free cheese", []),
+        ("Dairy-free bread with cheese", [("milk", "cheese")]),
+        ("Dairy free, cheese", [("milk", "cheese")]),
+    ],
+)
+def test_safe_prefix_only_covers_the_adjacent_ingredient(validator, text, expected):
+    assert scanned(validator, text, ["dairy"]) == expected
+
+
+def test_preferences_exclude_groups(validator):
+    found = scanned(validator, "Scrambled eggs", [], ["vegan"])
+    assert found == [("egg", "scrambled eggs")]
+
+
+@pytest.mark.parametrize(
+    "allergy, text",
+    [
+        ("kiwi", "Kiwis with oats"),
+        ("kiwi", "Kiwi slices"),
+        ("strawberries", "Strawberry smoothie"),
+        ("peaches", "Peach slices"),
+    ],
+)
+def test_custom_allergies_match_singular_and_plural(validator, allergy, text):
+    constraints = validator.constraints_for([allergy], [])
+    assert len(validator.scan(text, constraints)) == 1
+
+
+def test_substitution_keeps_casing_and_number(validator):
+    constraints = validator.constraints_for(["dairy"], [])
+    description = "Cheese toast with Butter and 2 yogurts"
+    meal_plan = {"Day 1": [{"meal": "Breakfast", "description": description}]}
+
+    repair = validator.repair(meal_plan, constraints)
+
+    assert repair.meal_plan["Day 1"][0]["description"] == (
+        "Dairy-free cheese toast with Olive oil and 2 coconut yogurts"
+    )
+    assert [v.text for v in repair.substituted] == ["Cheese", "Butter", "yogurts"]
+    assert repair.unresolved == []
+
+
+def test_chocolate_substitute_is_dairy_free(validator):
+    constraints = validator.constraints_for(["dairy"], [])
+    meal_plan = {"Day 1": [{"meal": "Snack", "description": "Milk chocolate squares"}]}
+
+    repair = validator.repair(meal_plan, constraints)
+
+    description = repair.meal_plan["Day 1"][0]["description"]
+    assert description == "Dairy-free dark chocolate squares"
+    assert validator.scan(description, constraints) == []
+    assert repair.unresolved == []
+
+
+def test_dark_chocolate_is_not_presumed_dairy_free():
+    # Plain dark chocolate often contains milk
+    with open(DEFAULT_LEXICON_FILE, encoding="utf-8") as f:
+        groups = {group["id"]: group for group in json.load(f)["groups"]}
+    assert "dark chocolate" not in groups["milk"]["safe"]
+
+
+def test_ingredients_without_substitute_are_unresolved(validator):
+    constraints = validator.constraints_for(["egg"], [])
+    meal_plan = {"Day 1": [{"meal": "Lunch", "description": "Spinach quiche"}]}
+    repair = validator.repair(meal_plan, constraints)
+
+    unresolved = [(v.day, v.meal_index, v.ingredient) for v in repair.unresolved]
+    assert unresolved == [("Day 1", 0, "quiche")]
+
+
+class StubMealLLM:
+    """Returns the given replacement meals in order, raising any exception among them"""
+
+    def __init__(self, *replacements):
+        self.replacements = list(replacements)
+        self.calls = 0
+
+    def invoke(self, messages, config=None):
+        self.calls += 1
+        replacement = self.replacements.pop(0)
+        if isinstance(replacement, Exception):
+            raise replacement
+        return SimpleNamespace(meal=replacement)
+
+
+def enforce(validator, meal_llm, meal_plan, allergies):
+    service = MedicalReportService.__new__(MedicalReportService)
+    service.diet_validator = validator
+    service.meal_llm = meal_llm
+    return service._enforce_diet(meal_plan, {"allergies": allergies}, callbacks=[])
+
+
+MEAL_PLAN = {
+    "Day 1": [
+        {"meal": "Breakfast", "description": "Oatmeal with berries"},
+        {"meal": "Lunch", "description": "Spinach quiche"},
+    ]
+}
+
+
+def test_unresolved_meal_is_regenerated(validator):
+    replacement = {"meal": "Lunch", "description": "Lentil soup"}
+    meal_llm = StubMealLLM(replacement)
+
+    enforced = enforce(validator, meal_llm, MEAL_PLAN, ["egg"])
+    assert enforced == {"Day 1": [MEAL_PLAN["Day 1"][0], replacement]}
+    assert meal_llm.calls == 1
+
+
+@pytest.mark.parametrize(
+    "replacement",
+    [{"meal": "Lunch", "description": "Mini quiche"}, RuntimeError("LLM unavailable")],
+)
+def test_meal_is_removed_when_no_safe_replacement(validator, replacement):
+    enforced = enforce(validator, StubMealLLM(replacement), MEAL_PLAN, ["egg"])
+    assert enforced == {"Day 1": [MEAL_PLAN["Day 1"][0]]}
+
+
+def test_safe_plan_makes_no_llm_call(validator):
+    meal_llm = StubMealLLM()
+    assert enforce(validator, meal_llm, MEAL_PLAN, ["dairy"]) == MEAL_PLAN
+    assert meal_llm.calls == 0
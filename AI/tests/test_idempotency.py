@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import patient_report
+from models.request_models import PatientReportResponse
+from services.idempotency import (
+    IdempotencyKeyReused, IdempotencyStore, IdempotentRequests, request_fingerprint
+)
+
+PATIENT = {
+    "name": "Sarah Johnson",
+    "condition": "Type 2 Diabetes",
+    "age": 12,
+    "gender": "Female",
+    "weight": 45.5,
+    "height": 150.3,
+}
+
+
+def run(requests, key, fingerprint, produce, should_store=lambda response: True):
+    return asyncio.run(requests.run(key, fingerprint, produce, should_store))
+
+
+def producer(calls):
+    async def produce():
+        calls.append(1)
+        return {"success": True, "n": len(calls)}
+
+    return produce
+
+
+def test_stored_response_is_replayed():
+    requests, calls = IdempotentRequests(IdempotencyStore(":memory:", ttl=60)), []
+
+    first = run(requests, "k", "f", producer(calls))
+    retry = run(requests, "k", "f", producer(calls))
+
+    assert first == ({"success": True, "n": 1}, False)
+    assert retry == ({"success": True, "n": 1}, True)
+    assert len(calls) == 1
+
+
+def test_key_reused_for_another_request_is_rejected():
+    requests, calls = IdempotentRequests(IdempotencyStore(":memory:", ttl=60)), []
+    run(requests, "k", "f", producer(calls))
+
+    with pytest.raises(IdempotencyKeyReused):
+        run(requests, "k", "other", producer(calls))
+
+
+def test_unstored_failure_runs_again():
+    requests, calls = IdempotentRequests(IdempotencyStore(":memory:", ttl=60)), []
+    run(requests, "k", "f", producer(calls), should_store=lambda response: False)
+
+    retry = run(requests, "k", "f", producer(calls))
+    assert retry == ({"success": True, "n": 2}, False)
+
+
+def test_concurrent_retry_awaits_the_first_request():
+    requests, calls = IdempotentRequests(IdempotencyStore(":memory:", ttl=60)), []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"success": True}
+
+    async def both():
+        first = requests.run("k", "f", slow, bool)
+        retry = requests.run("k", "f", slow, bool)
+        return await asyncio.gather(first, retry)
+
+    assert [replayed for _, replayed in asyncio.run(both())] == [False, True]
+    assert len(calls) == 1
+
+
+def test_fingerprint_ignores_key_order():
+    fingerprint = request_fingerprint({"a": 1, "b": [2]})
+    assert fingerprint == request_fingerprint({"b": [2], "a": 1})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def generate_report_response(patient_info, use_cache, mode):
+        report = {"name": patient_info["name"]}
+        return PatientReportResponse(success=True, message="ok", report=report)
+
+    requests = IdempotentRequests(IdempotencyStore(":memory:", ttl=60))
+    monkeypatch.setattr(
+        patient_report, "generate_report_response", generate_report_response
+    )
+    monkeypatch.setattr(patient_report, "_idempotent_requests", requests)
+    app = FastAPI()
+    app.include_router(patient_report.router)
+    return TestClient(app)
+
+
+def test_endpoint_replays_and_rejects_reused_keys(client):
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/api/v1/generate_report", json=PATIENT, headers=headers)
+    replay = client.post("/api/v1/generate_report", json=PATIENT, headers=headers)
+    other = dict(PATIENT, name="Other")
+    reused = client.post("/api/v1/generate_report", json=other, headers=headers)
+
+    assert first.status_code == 200 and "Idempotent-Replayed" not in first.headers
+    assert replay.json() == first.json()
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert reused.status_code == 422
@@ -0,0 +1,76 @@
+import pytest
+
+from services.ingredient_aggregator import IngredientAggregator
+
+
+@pytest.fixture(scope="module")
+def aggregator():
+    return IngredientAggregator.from_file()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("150g salmon and broccoli", [("Salmon", ("g", 150.0)), ("Broccoli", None)]),
+        ("150g salmon with rice", [("Salmon", ("g", 150.0)), ("Rice", None)]),
+        ("1 cup of oats with banana", [("Oats", ("ml", 240.0)), ("Bananas", None)]),
+        ("2 eggs on toast", [("Eggs", ("count", 2.0)), ("Bread", None)]),
+        ("1 tbsp honey and berries", [("Berries", None)]),
+        (
+            "two eggs and 1 banana",
+            [("Eggs", ("count", 2)), ("Bananas", ("count", 1.0))],
+        ),
+    ],
+)
+def test_quantity_never_carries_over_to_the_next_food(aggregator, text, expected):
+    assert [(name, quantity) for name, _, quantity in aggregator.scan(text)] == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2 large eggs", ("count", 2.0)),
+        ("2 cups of cooked quinoa", ("ml", 480.0)),
+        ("½ cup blueberries", ("ml", 120.0)),
+        ("1 slice of whole grain toast", ("slice", 1.0)),
+        ("a side of broccoli", None),
+    ],
+)
+def test_quantity_before_food(aggregator, text, expected):
+    assert aggregator.scan(text)[0][2] == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Chicken breast (120g) with rice", ("g", 120.0)),
+        ("Boiled eggs (2) on toast", ("count", 2.0)),
+        ("Salmon (350 kcal)", None),
+        ("150g salmon (grilled)", ("g", 150.0)),
+    ],
+)
+def test_quantity_in_parentheses_after_food(aggregator, text, expected):
+    assert aggregator.scan(text)[0][2] == expected
+
+
+def meal(name, description, calories):
+    return {"meal": name, "description": description, "calories": calories}
+
+
+def test_aggregate_sums_quantities_across_days(aggregator):
+    meal_plan = {
+        "Day 1": [
+            meal("Dinner", "150g salmon with rice", "500"),
+            meal("Breakfast", "2 eggs on toast", "300"),
+        ],
+        "Day 2": [
+            meal("Dinner", "6 oz salmon and broccoli", "450"),
+            meal("Breakfast", "Two eggs, 2 slices whole grain bread", "350"),
+        ],
+    }
+
+    ingredients = aggregator.aggregate(meal_plan)
+
+    assert ingredients.produce == ["Broccoli"]
+    assert ingredients.groceries == ["Eggs (4)", "Salmon (320 g)"]
+    assert ingredients.dry_goods == ["Bread", "Rice", "Whole grain bread (2 slices)"]
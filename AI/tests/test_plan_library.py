@@ -0,0 +1,136 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import patient_report
+from services.plan_library import ApprovedPlanLibrary, medication_key
+
+MEAL_PLAN = {
+    "Day 1": [
+        {"meal": "Breakfast", "description": "Oatmeal with berries", "calories": "300"}
+    ]
+}
+APPROVED = {
+    "condition": "IBS",
+    "age": 10,
+    "allergies": ["milk"],
+    "dietary_preferences": ["low-fodmap"],
+    "medications": [],
+}
+
+
+def test_plans_are_only_reused_for_the_same_medications():
+    library = ApprovedPlanLibrary(":memory:")
+    library.add(APPROVED, MEAL_PLAN, plan_id="plan-1")
+
+    assert library.find(dict(APPROVED, medications=["Warfarin"]), 0.5) is None
+    assert library.find(APPROVED, 0.5)["id"] == "plan-1"
+
+
+def test_medication_key_is_normalized():
+    key = medication_key(["Warfarin ", "metformin"])
+    assert key == medication_key(["Metformin", "warfarin"])
+    assert medication_key(None) == medication_key([])
+
+
+def test_older_library_is_migrated(tmp_path):
+    db_path = str(tmp_path / "plans.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE approved_plans (id TEXT PRIMARY KEY, "
+        "condition_key TEXT NOT NULL, "
+        "age_band TEXT NOT NULL, features TEXT NOT NULL, profile TEXT NOT NULL, "
+        "meal_plan TEXT NOT NULL, created_at REAL NOT NULL)"
+    )
+    profile = dict(APPROVED, medications=["Warfarin"])
+    conn.execute(
+        "INSERT INTO approved_plans VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            "old", "ibs", "child", json.dumps(["medication:warfarin"]),
+            json.dumps(profile), json.dumps(MEAL_PLAN), 0,
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+    library = ApprovedPlanLibrary(db_path)
+
+    assert library.find(APPROVED, 0.0) is None
+    assert library.find(profile, 0.5)["similarity"] == 1.0
+
+
+# An approved_recommendation as stored by BACKEND: the markdown report
+APPROVED_RECOMMENDATION = """# Medical Report for Jane Doe
+
+## Patient Details
+- Condition: Type 2 Diabetes
+- Allergies: dairy, shellfish
+
+## Recommended Meal Plan
+
+| Day | Breakfast (kcal) | Lunch (kcal) | Dinner (kcal) |
+|-----|------------------|--------------|---------------|
+| Monday | Almond Pancakes (350 kcal) | Chicken Salad (400 kcal) | Salmon (450 kcal) |
+| Tuesday | Scrambled Eggs with Spinach (300 kcal) | Tuna Salad Lettuce Wraps \
+(350 kcal) |  Chicken Stir-Fry (450 kcal)|
+
+## Ingredients
+
+| Item | Quantity |
+|------|----------|
+| Quinoa | 200 g |
+"""
+
+
+def test_backend_approval_payload_is_indexed(monkeypatch):
+    library = ApprovedPlanLibrary(":memory:")
+    monkeypatch.setattr(
+        patient_report,
+        "get_report_service",
+        lambda: SimpleNamespace(plan_library=library),
+    )
+    app = FastAPI()
+    app.include_router(patient_report.router)
+
+    # Same fields as BACKEND's index_approved_plan sends
+    response = TestClient(app).post(
+        "/api/v1/approved_plans",
+        json={
+            "plan_id": "request-1",
+            "condition": "Type 2 Diabetes",
+            "age": 42,
+            "allergies": ["dairy", "shellfish"],
+            "medications": ["Metformin"],
+            "dietary_preferences": ["low-carb"],
+            "recommendation": APPROVED_RECOMMENDATION,
+        },
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {"plan_id": "request-1", "days": 2}
+    plan = library.find(
+        {
+            "condition": "Type 2 Diabetes",
+            "age": 40,
+            "allergies": ["dairy", "shellfish"],
+            "medications": ["metformin"],
+            "dietary_preferences": ["low-carb"],
+        },
+        0.5,
+    )
+    assert plan["meal_plan"]["Tuesday"] == [
+        {
+            "meal": "Breakfast",
+            "description": "Scrambled Eggs with Spinach",
+            "calories": "300",
+        },
+        {"meal": "Lunch", "description": "Tuna Salad Lettuce Wraps", "calories": "350"},
+        {"meal": "Dinner", "description": "Chicken Stir-Fry", "calories": "450"},
+    ]
+
+
+def test_report_without_a_meal_table_is_rejected():
+    assert patient_report.extract_meal_plan("# Report\n\nNo plan today.") is None
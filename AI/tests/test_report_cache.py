@@ -0,0 +1,68 @@
+import pytest
+
+from services.report_cache import ReportCache, profile_key
+
+PATIENT = {
+    "name": "Sarah Johnson",
+    "condition": "Type 2 Diabetes",
+    "age": 12,
+    "gender": "Female",
+    "weight": 45.5,
+    "height": 150.3,
+    "allergies": ["dairy", "shellfish"],
+    "medications": ["Metformin 500mg"],
+    "symptoms": ["fatigue"],
+    "dietary_preferences": ["low-carb"],
+}
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"name": "Another Patient", "gender": "Male", "symptoms": ["thirst"]},
+        {"condition": "type 2 diabetes!"},
+        {"allergies": ["Shellfish", "DAIRY", "dairy"]},
+        {"age": 13, "weight": 49.9, "height": 154.9},
+    ],
+)
+def test_same_clinical_profile_shares_a_key(changes):
+    assert profile_key(dict(PATIENT, **changes)) == profile_key(PATIENT)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"condition": "IBS"},
+        {"allergies": ["dairy"]},
+        {"medications": []},
+        {"dietary_preferences": ["vegan"]},
+        {"age": 14},
+        {"weight": 50.0},
+        {"height": 155.0},
+    ],
+)
+def test_different_clinical_profile_gets_another_key(changes):
+    assert profile_key(dict(PATIENT, **changes)) != profile_key(PATIENT)
+
+
+def test_missing_measurements_do_not_fail():
+    assert profile_key({"condition": "IBS", "age": None, "weight": "unknown"})
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ReportCache(ttl=60, max_size=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.get("a")
+    cache.set("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_are_misses():
+    cache = ReportCache(ttl=-1, max_size=2)
+    cache.set("a", {"n": 1})
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
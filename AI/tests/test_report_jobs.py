@@ -0,0 +1,71 @@
+import asyncio
+
+from services.report_jobs import (
+    QUEUED, RUNNING, SUCCEEDED, ReportJobQueue, ReportJobStore
+)
+
+
+class Report:
+    def model_dump(self):
+        return {"title": "report"}
+
+
+class Service:
+    def __init__(self):
+        self.calls = 0
+
+    async def agenerate_report(self, payload):
+        self.calls += 1
+        return Report()
+
+
+def test_a_job_is_claimed_only_once(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    first, second = ReportJobStore(db_path), ReportJobStore(db_path)
+    job = first.create({"name": "Sarah"})
+
+    assert first.claim(job["id"], lease=60)["owner"] == first.owner
+    assert second.claim(job["id"], lease=60) is None
+
+
+def test_requeue_leaves_jobs_with_a_live_lease_alone(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    first, second = ReportJobStore(db_path), ReportJobStore(db_path)
+    live, expired = first.create({}), first.create({})
+    first.claim(live["id"], lease=60)
+    first.claim(expired["id"], lease=-1)
+
+    assert second.requeue_unfinished() == [expired["id"]]
+    assert second.get(live["id"])["status"] == RUNNING
+    assert second.get(expired["id"])["status"] == QUEUED
+
+
+def test_renew_extends_only_the_owners_lease(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    first, second = ReportJobStore(db_path), ReportJobStore(db_path)
+    job = first.create({})
+    first.claim(job["id"], lease=-1)
+
+    second.renew(job["id"], lease=60)
+    assert second.requeue_unfinished() == [job["id"]]
+
+
+def test_queue_runs_submitted_jobs(tmp_path):
+    service = Service()
+    queue = ReportJobQueue(
+        lambda: service, str(tmp_path / "jobs.sqlite3"), workers=2, job_ttl=60
+    )
+
+    async def scenario():
+        await queue.start()
+        try:
+            job = await queue.submit({"name": "Sarah"})
+            return await queue.get(job["id"], wait=5), await queue.metrics()
+        finally:
+            await queue.stop()
+
+    job, metrics = asyncio.run(scenario())
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"title": "report"}
+    assert metrics["jobs_by_status"] == {SUCCEEDED: 1}
+    assert service.calls == 1
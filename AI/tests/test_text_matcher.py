@@ -0,0 +1,68 @@
+import pytest
+
+from services.condition_engine import get_condition_engine
+from services.text_matcher import (
+    PhraseMatcher,
+    normalize,
+    normalize_with_offsets,
+    plural_variants,
+)
+
+
+@pytest.fixture
+def matcher():
+    matcher = PhraseMatcher()
+    matcher.add("butter", "butter")
+    matcher.add("peanut butter", "peanut butter")
+    matcher.add("pea", "pea")
+    matcher.add_all(["milk", "Milk"], "dairy")
+    matcher.add("milk", "milk")
+    matcher.build()
+    return matcher
+
+
+def test_find_prefers_leftmost_longest(matcher):
+    text = "Peanut-Butter and butter"
+    found = [(text[m.start:m.end], m.values) for m in matcher.find(text)]
+    assert found == [("Peanut-Butter", ("peanut butter",)), ("butter", ("butter",))]
+
+
+def test_find_all_reports_overlapping_matches(matcher):
+    phrases = [m.phrase for m in matcher.find_all("peanut butter")]
+    assert phrases == ["peanut butter", "butter"]
+
+
+@pytest.mark.parametrize("text", ["peas", "buttermilk", "sweetpea"])
+def test_only_whole_words_match(matcher, text):
+    assert matcher.find(text) == []
+
+
+def test_values_of_the_same_phrase_are_merged(matcher):
+    assert matcher.find("MILK")[0].values == ("dairy", "milk")
+
+
+def test_offsets_point_into_the_original_text(matcher):
+    text = "Oats; with   MILK!"
+    match = matcher.find(text)[0]
+    assert text[match.start:match.end] == "MILK"
+
+
+def test_normalize_collapses_punctuation_and_case():
+    assert normalize("  Cow's   MILK, (whole) ") == "cow s milk whole"
+    assert normalize_with_offsets("A,  b!") == ("a b", [0, 3, 4])
+
+
+@pytest.mark.parametrize(
+    "phrase, plural",
+    [
+        ("berry", "berries"), ("peach", "peaches"), ("day", "days"), ("egg", "eggs"),
+        ("glass", "glasses"),
+    ],
+)
+def test_plural_variants(phrase, plural):
+    assert plural_variants(phrase) == {phrase, plural}
+
+
+def test_condition_engine_identifies_conditions_in_free_text():
+    found = get_condition_engine().identify_conditions("Type 2 diabetes and IBS")
+    assert found == ["diabetes", "ibs"]
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from config import tracing
+from config.tracing import SampledTraceHandler
+
+
+class Observation:
+    def __init__(self, id):
+        self.id = id
+        self.updates = []
+
+    def update(self, **kwargs):
+        self.updates.append(kwargs)
+
+
+class Exporter:
+    """Mimics the Langfuse CallbackHandler: stamps everything with the current time"""
+
+    def __init__(self):
+        self.runs = {}
+        self.trace = None
+        self.observations = {}
+
+    def _start(self, run_id, parent_run_id):
+        if parent_run_id is None:
+            self.trace = Observation(str(run_id))
+        observation = self.runs[run_id] = Observation(str(run_id))
+        self.observations[run_id] = observation
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None):
+        self._start(run_id, parent_run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None):
+        self._start(run_id, parent_run_id)
+
+    def on_llm_new_token(self, token, *, run_id, parent_run_id=None):
+        pass
+
+    def on_llm_end(self, response, *, run_id, parent_run_id=None):
+        del self.runs[run_id]
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None):
+        del self.runs[run_id]
+
+
+def at(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def test_replayed_events_keep_their_recorded_times(monkeypatch):
+    clock = iter([100.0, 101.0, 101.5, 103.0, 104.0])
+    monkeypatch.setattr(tracing.time, "time", lambda: next(clock))
+    exporter = Exporter()
+    handler = SampledTraceHandler(
+        exporter, sample_rate=1.0, slow_seconds=60, buffer_size=10
+    )
+    root, llm = uuid4(), uuid4()
+
+    handler.on_chain_start({}, {}, run_id=root, parent_run_id=None)
+    handler.on_llm_start({}, ["hi"], run_id=llm, parent_run_id=root)
+    handler.on_llm_new_token("a", run_id=llm, parent_run_id=root)
+    handler.on_llm_end(None, run_id=llm, parent_run_id=root)
+    handler.on_chain_end({}, run_id=root, parent_run_id=None)
+    handler.shutdown()
+
+    assert exporter.trace.updates == [{"timestamp": at(100.0)}]
+    assert exporter.observations[root].updates == [
+        {"start_time": at(100.0)}, {"end_time": at(104.0)},
+    ]
+    assert exporter.observations[llm].updates == [
+        {"start_time": at(101.0)},
+        {"completion_start_time": at(101.5)},
+        {"end_time": at(103.0)},
+    ]
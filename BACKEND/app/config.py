@@ -14,6 +14,9 @@ class Settings(BaseSettings):
     CLERK_API_KEY: str | None = os.environ.get('CLERK_API_KEY')
     
     NEVIN: str = os.environ.get('NEVIN')
+    
+    # AI service endpoint indexing approved plans for reuse (optional)
+    AI_APPROVED_PLANS_URL: str | None = os.environ.get('AI_APPROVED_PLANS_URL')
 
     # Database Settings
     SUPABASE_URL: str | None = os.environ.get('SUPABASE_URL')
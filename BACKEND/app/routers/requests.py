@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from ..models.requests import (
     NutritionRequest, 
     NutritionRequestCreate, 
@@ -10,6 +10,9 @@ from ..services.users import UserService
 from ..config import settings
 from typing import List, Dict
 import httpx
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 request_service = NutritionRequestService()
@@ -48,7 +51,7 @@ async def create_request(request: NutritionRequestCreate):
         )
 
 @router.post("/approve", response_model=NutritionRequest)
-async def approve_request(request: RequestAction):
+async def approve_request(request: RequestAction, background_tasks: BackgroundTasks):
     """Approve a request and move nevin_suggest to approved_recommendation"""
     try:
         # Verify doctor role
@@ -74,6 +77,9 @@ async def approve_request(request: RequestAction):
             approved_recommendation=suggestion_to_approve
         )
         
+        # Let the AI service reuse the vetted plan for similar patients, after the response is sent
+        background_tasks.add_task(index_approved_plan, current_request, suggestion_to_approve)
+        
         return result
             
     except Exception as e:
@@ -83,6 +89,32 @@ async def approve_request(request: RequestAction):
             detail=f"Failed to approve request: {str(e)}"
         )
 
+async def index_approved_plan(nutrition_request: NutritionRequest, recommendation: str) -> None:
+    """Send an approved plan to the AI service's plan library; best effort, never fails the approval"""
+    if not settings.AI_APPROVED_PLANS_URL:
+        return
+    
+    demographics = nutrition_request.demographics
+    payload = {
+        "plan_id": str(nutrition_request.id),
+        "condition": nutrition_request.conditions[0] if nutrition_request.conditions else "",
+        "age": demographics.age if demographics else None,
+        "allergies": nutrition_request.allergies or [],
+        "medications": nutrition_request.medications or [],
+        "dietary_preferences": (nutrition_request.dietary_preferences or []) + (nutrition_request.diet_restriction or []),
+        "recommendation": recommendation,
+    }
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(settings.AI_APPROVED_PLANS_URL, json=payload, timeout=10)
+        if response.status_code != 201:
+            logger.warning(
+                f"Approved plan {nutrition_request.id} not indexed: "
+                f"{response.status_code} {response.text}"
+            )
+    except Exception as e:
+        logger.error(f"Error indexing approved plan {nutrition_request.id}: {str(e)}")
+
 @router.post("/deny", response_model=NutritionRequest)
 async def deny_request(request: RequestAction):
     """Deny a request"""
@@ -0,0 +1 @@
+"""Puts the RAGPIPELINE directory on sys.path so tests can import retrieval.*"""
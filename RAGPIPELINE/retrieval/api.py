@@ -1,9 +1,14 @@
 import os
+import json
 import openai
 import supabase
 from fastapi import FastAPI, Query
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
-from typing import List
+from typing import List, Optional
+from retrieval.query_engine import (
+    CACHE_ENABLED, MULTI_QUERY_ENABLED, answer_cache, stream_answer
+)
 
 # Load environment variables
 load_dotenv()
@@ -45,6 +50,47 @@ def search_documents(query: str, top_k: int = 5):
 
     return {"query": query, "results": results}
 
+@app.get("/index_version")
+def index_version():
+    """Return a version string that changes whenever documents are added or removed."""
+    response = (
+        supabase_client.table("documents")
+        .select("id", count="exact")
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+    )
+    latest_id = response.data[0]["id"] if response.data else 0
+    return {"version": f"{response.count}:{latest_id}"}
+
+@app.get("/answer/stream")
+def stream_answer_events(query: str, use_cache: Optional[bool] = None,
+                         multi_query: Optional[bool] = None):
+    """
+    Answer a query with retrieved context, streaming tokens as server-sent events.
+
+    use_cache and multi_query default to the RAG_CACHE_ENABLED and
+    RAG_MULTI_QUERY settings, like generate_answer and stream_answer.
+    """
+    if use_cache is None:
+        use_cache = CACHE_ENABLED
+    if multi_query is None:
+        multi_query = MULTI_QUERY_ENABLED
+
+    def events():
+        timings = {}
+        for token in stream_answer(query, timings, use_cache=use_cache,
+                                   multi_query=multi_query):
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield f"event: done\ndata: {json.dumps(timings)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Report semantic answer cache hit/miss metrics."""
+    return answer_cache.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8005)
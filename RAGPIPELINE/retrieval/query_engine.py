@@ -1,38 +1,383 @@
+import re
+import json
+import time
+import logging
+import openai
 import requests
 import os
+import tiktoken
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from retrieval.semantic_cache import SemanticCache
 
 # Load environment variables
 load_dotenv()
 RAG_API_URL = os.getenv("RAG_API_URL", "http://rag-pipeline:8005/search")  # Use service name inside Docker
+CHAT_MODEL = os.getenv("RAG_CHAT_MODEL", "gpt-4")
+# Max tokens of retrieved context per prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+# Hits below this similarity are dropped
+MIN_SIMILARITY = float(os.getenv("RAG_MIN_SIMILARITY", "0.75"))
+RAG_INDEX_VERSION_URL = os.getenv(
+    "RAG_INDEX_VERSION_URL", "http://rag-pipeline:8005/index_version"
+)
+EMBEDDING_MODEL = "text-embedding-ada-002"
 
-def get_rag_context(query, top_k=5):
-    """Send query to RAG API and retrieve contextual documents."""
-    response = requests.get(RAG_API_URL, params={"query": query, "top_k": top_k})
+# Semantic answer cache settings. Off by default: ada-002 embeddings of questions
+# that differ in one medical term ("gluten with IBS" vs "dairy with IBS") are often
+# above 0.92 cosine similarity, so a loose threshold serves one question's answer
+# for the other. Enable only with a strict threshold.
+CACHE_ENABLED = os.getenv("RAG_CACHE_ENABLED", "False").lower() in ("true", "1", "t")
+# Min cosine similarity to reuse an answer
+CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", "0.98"))
+CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "256"))
+# Seconds between index version checks
+INDEX_VERSION_TTL = float(os.getenv("RAG_INDEX_VERSION_TTL", "60"))
+
+# Multi-query retrieval settings
+MULTI_QUERY_ENABLED = (
+    os.getenv("RAG_MULTI_QUERY", "False").lower() in ("true", "1", "t")
+)
+LLM_DECOMPOSITION = (
+    os.getenv("RAG_LLM_DECOMPOSITION", "False").lower() in ("true", "1", "t")
+)
+MAX_SUBQUERIES = int(os.getenv("RAG_MAX_SUBQUERIES", "4"))
+RRF_K = 60  # Reciprocal rank fusion damping constant
+
+CONTEXT_SEPARATOR = "\n\n"
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+SYSTEM_PROMPT = "You are an AI researcher."
+# Clause-level connectors a compound question is split on
+# (captured, to tell ";"/"?" from "and")
+SUBQUERY_SPLIT = re.compile(
+    r"\s*([;?]|,\s*and\b|\b(?:and also|as well as|also|and)\b)\s*",
+    re.IGNORECASE
+)
+# Words that open a new clause; after "and", anything else continues a list
+# ("peanuts and tree nuts")
+CLAUSE_START = re.compile(
+    r"^(?:what|which|how|why|when|where|who|whose|is|are|was|were|can|could|"
+    r"should|would|will|does|do|did|"
+    r"has|have|may|might|must|i|my|we|our|you|your|he|she|they|their|it|its|there|"
+    r"please|tell|list|explain|give|suggest|recommend|compare)\b",
+    re.IGNORECASE
+)
+MIN_SUBQUERY_WORDS = 2
+DECOMPOSITION_PROMPT = (
+    "Split the user's question into at most {max_subqueries} short, "
+    "self-contained search queries, "
+    "one per distinct topic (condition, medication, allergy, food, ...). "
+    "Reply with a JSON array of strings only."
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared HTTP sessions keep connections to the RAG API and OpenAI alive between queries
+rag_session = requests.Session()
+openai_session = requests.Session()
+openai.requestssession = openai_session
+
+# Background threads for work that overlaps with retrieval
+_executor = ThreadPoolExecutor(max_workers=8)
+
+answer_cache = SemanticCache(threshold=CACHE_THRESHOLD, max_entries=CACHE_MAX_ENTRIES)
+_index_version = {"value": None, "checked_at": 0.0}
+
+# Tokenizer is loaded lazily once and reused for every count
+_encoding = None
+
+def get_encoding():
+    """Return the tiktoken encoding for CHAT_MODEL, loading it on first use."""
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(CHAT_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+def count_tokens(text):
+    """Count the tokens in text using the chat model's encoding."""
+    return len(get_encoding().encode(text))
+
+def trim_to_token_limit(text, max_tokens):
+    """Keep the leading whole sentences of text that fit in max_tokens."""
+    kept = []
+    trimmed = ""
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        candidate = " ".join(kept + [sentence])
+        if count_tokens(candidate) > max_tokens:
+            break
+        kept.append(sentence)
+        trimmed = candidate
+    return trimmed
+
+def build_context(results, token_budget=CONTEXT_TOKEN_BUDGET,
+                  min_similarity=MIN_SIMILARITY, rank_by="similarity"):
+    """
+    Pack search results into a token budget, best ranked first.
+
+    Results are ranked by the rank_by field (similarity, or the fused score of
+    multi-query retrieval); those below min_similarity are dropped. A result
+    that does not fit the remaining budget is trimmed on sentence boundaries;
+    if not even its first sentence fits, it is skipped. Returns the packed
+    pieces, each with its content, metadata, similarity and token count.
+    """
+    candidates = [doc for doc in results if doc.get("similarity", 0) >= min_similarity]
+    candidates.sort(key=lambda doc: doc.get(rank_by, 0), reverse=True)
+
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    remaining = token_budget
+    packed = []
+
+    for doc in candidates:
+        available = remaining - (separator_tokens if packed else 0)
+        if available <= 0:
+            break
+
+        content = doc["content"].strip()
+        tokens = count_tokens(content)
+        if tokens > available:
+            content = trim_to_token_limit(content, available)
+            if not content:
+                continue
+            tokens = count_tokens(content)
+
+        packed.append({
+            "content": content,
+            "metadata": doc.get("metadata", {}),
+            "similarity": doc.get("similarity"),
+            "tokens": tokens,
+        })
+        remaining = available - tokens
+
+    return packed
+
+def search(query, top_k=5):
+    """Send query to RAG API and return the raw search results."""
+    response = rag_session.get(RAG_API_URL, params={"query": query, "top_k": top_k})
     data = response.json()
-    
-    if "results" in data:
-        context = "\n".join([doc["content"][:500] for doc in data["results"]])  # Limit length
-        return context
-    return "No relevant context found."
-
-def generate_answer(query):
-    """Generate an AI response with retrieved context."""
-    context = get_rag_context(query)
-    
+    return data.get("results", [])
+
+def embed(text):
+    """Generate an embedding for text with the same model used to index documents."""
+    response = openai.Embedding.create(input=text, model=EMBEDDING_MODEL)
+    return response["data"][0]["embedding"]
+
+def get_index_version():
+    """Return the document index version, re-checked every INDEX_VERSION_TTL seconds."""
+    now = time.monotonic()
+    if now - _index_version["checked_at"] >= INDEX_VERSION_TTL:
+        try:
+            response = rag_session.get(RAG_INDEX_VERSION_URL, timeout=5)
+            _index_version["value"] = response.json()["version"]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning(
+                f"Could not fetch index version, keeping {_index_version['value']}: {e}"
+            )
+        _index_version["checked_at"] = now
+    return _index_version["value"]
+
+def decompose_query(query, use_llm=LLM_DECOMPOSITION):
+    """
+    Split a compound query into sub-queries, keeping the full query first.
+
+    Rule-based splitting on clause connectors is used by default. ";" and
+    "?" always split; after "and"-style connectors a fragment only becomes
+    its own sub-query if it opens a new clause (a question word, auxiliary
+    verb, pronoun or imperative) and has at least MIN_SUBQUERY_WORDS words.
+    Otherwise it is joined back, so lists like "allergic to peanuts and tree
+    nuts" stay together. With use_llm the model proposes the sub-queries,
+    falling back to the rules on any failure.
+    """
+    parts = None
+    if use_llm:
+        try:
+            response = openai.ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=[
+                    {"role": "system", "content": DECOMPOSITION_PROMPT.format(
+                        max_subqueries=MAX_SUBQUERIES)},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0
+            )
+            content = response["choices"][0]["message"]["content"]
+            parts = [str(part).strip() for part in json.loads(content)]
+        except Exception as e:
+            logger.warning(f"LLM query decomposition failed, using rules: {e}")
+
+    if parts is None:
+        parts = []
+        pieces = SUBQUERY_SPLIT.split(query)
+        # split() alternates fragments and the connectors between them
+        for connector, fragment in zip([";"] + pieces[1::2], pieces[0::2]):
+            fragment = fragment.strip(" ,.")
+            if not fragment:
+                continue
+            new_clause = connector in (";", "?") or (
+                CLAUSE_START.match(fragment)
+                and len(fragment.split()) >= MIN_SUBQUERY_WORDS
+            )
+            if parts and not new_clause:
+                joiner = "" if connector.startswith(",") else " "
+                parts[-1] = f"{parts[-1]}{joiner}{connector.strip()} {fragment}"
+            else:
+                parts.append(fragment)
+
+    subqueries = [query]
+    for part in parts:
+        if part and part.lower() not in (q.lower() for q in subqueries):
+            subqueries.append(part)
+    return subqueries[:MAX_SUBQUERIES + 1]
+
+def fuse_results(result_lists, k=RRF_K):
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Duplicate documents are merged on their content, keeping the best
+    similarity; each result gets a "score" of sum(1 / (k + rank)).
+    """
+    fused = {}
+    for results in result_lists:
+        ranked = sorted(results, key=lambda doc: doc.get("similarity", 0),
+                        reverse=True)
+        for rank, doc in enumerate(ranked, start=1):
+            entry = fused.get(doc["content"])
+            if entry is None:
+                entry = fused[doc["content"]] = {**doc, "score": 0.0}
+            else:
+                entry["similarity"] = max(entry.get("similarity", 0),
+                                          doc.get("similarity", 0))
+            entry["score"] += 1 / (k + rank)
+    return sorted(fused.values(), key=lambda doc: doc["score"], reverse=True)
+
+def multi_query_search(query, top_k=5, use_llm=LLM_DECOMPOSITION):
+    """Decompose query, search all sub-queries concurrently and fuse their results."""
+    subqueries = decompose_query(query, use_llm)
+    if len(subqueries) == 1:
+        return search(query, top_k)
+
+    start = time.perf_counter()
+    result_lists = list(_executor.map(lambda subquery: search(subquery, top_k),
+                                      subqueries))
+    elapsed = time.perf_counter() - start
+    logger.info(f"Retrieved {len(subqueries)} sub-queries in {elapsed:.2f}s")
+    return fuse_results(result_lists)
+
+def get_rag_context(query, top_k=5, token_budget=CONTEXT_TOKEN_BUDGET,
+                    min_similarity=MIN_SIMILARITY, multi_query=MULTI_QUERY_ENABLED):
+    """Send query to RAG API and pack the relevant documents into a context string."""
+    if multi_query:
+        pieces = build_context(multi_query_search(query, top_k), token_budget,
+                               min_similarity, rank_by="score")
+    else:
+        pieces = build_context(search(query, top_k), token_budget, min_similarity)
+    return CONTEXT_SEPARATOR.join(piece["content"] for piece in pieces)
+
+def build_messages(query, context):
+    """Build the chat messages for query, grounded in context when there is any."""
     if context:
         prompt = f"Using the following research context, answer the query:\n\n{context}\n\nQuery: {query}"
     else:
         prompt = query  # Fallback to original query
 
+    return [{"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}]
+
+def warm_openai_connection():
+    """Open a pooled OpenAI connection so the completion request skips the handshake."""
+    try:
+        openai_session.head(openai.api_base, timeout=5)
+    except requests.RequestException as e:
+        logger.warning(f"OpenAI connection warm-up failed: {e}")
+
+def lookup_cached_answer(query):
+    """
+    Look query up in the semantic answer cache.
+
+    Returns (answer, embedding, version); answer is None on a miss, and the
+    embedding and version are reused to store the fresh answer.
+    """
+    embedding = embed(query)
+    version = get_index_version()
+    return answer_cache.lookup(embedding, version), embedding, version
+
+def generate_answer(query, use_cache=CACHE_ENABLED,
+                    multi_query=MULTI_QUERY_ENABLED):
+    """Generate an AI response with retrieved context, reusing cached answers."""
+    if use_cache:
+        cached, embedding, version = lookup_cached_answer(query)
+        if cached is not None:
+            logger.info("Semantic cache hit")
+            return cached
+
+    context = get_rag_context(query, multi_query=multi_query)
+
     response = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[{"role": "system", "content": "You are an AI researcher."},
-                  {"role": "user", "content": prompt}]
+        model=CHAT_MODEL,
+        messages=build_messages(query, context)
+    )
+    answer = response["choices"][0]["message"]["content"]
+
+    if use_cache:
+        answer_cache.store(embedding, query, answer, version)
+    return answer
+
+def stream_answer(query, timings=None, use_cache=CACHE_ENABLED,
+                  multi_query=MULTI_QUERY_ENABLED):
+    """
+    Generate an AI response with retrieved context, yielding tokens as they arrive.
+
+    The OpenAI connection is warmed up in the background while retrieval and
+    prompt assembly run. A semantic cache hit is yielded as a single chunk. If
+    a timings dict is passed it is filled with retrieval, time_to_first_token
+    and total durations in seconds.
+    """
+    timings = timings if timings is not None else {}
+    start = time.perf_counter()
+
+    _executor.submit(warm_openai_connection)
+    if use_cache:
+        cached, embedding, version = lookup_cached_answer(query)
+        if cached is not None:
+            timings["cache_hit"] = True
+            elapsed = time.perf_counter() - start
+            timings["time_to_first_token"] = timings["total"] = elapsed
+            yield cached
+            return
+
+    messages = build_messages(query, get_rag_context(query, multi_query=multi_query))
+    timings["retrieval"] = time.perf_counter() - start
+
+    response = openai.ChatCompletion.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        stream=True
+    )
+
+    tokens = []
+    for chunk in response:
+        token = chunk["choices"][0]["delta"].get("content")
+        if not token:
+            continue
+        if "time_to_first_token" not in timings:
+            timings["time_to_first_token"] = time.perf_counter() - start
+        tokens.append(token)
+        yield token
+
+    if use_cache:
+        answer_cache.store(embedding, query, "".join(tokens), version)
+
+    timings["total"] = time.perf_counter() - start
+    logger.info(
+        f"Streamed answer: retrieval {timings['retrieval']:.2f}s, "
+        f"first token {timings.get('time_to_first_token', timings['total']):.2f}s, "
+        f"total {timings['total']:.2f}s"
     )
-    
-    return response["choices"][0]["message"]["content"]
 
 if __name__ == "__main__":
     user_query = input("Ask a question: ")
-    print(generate_answer(user_query))
+    for token in stream_answer(user_query):
+        print(token, end="", flush=True)
+    print()
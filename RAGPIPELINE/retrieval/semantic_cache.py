@@ -0,0 +1,82 @@
+import math
+import threading
+from operator import mul
+
+
+def normalize(vector):
+    """Scale vector to unit length so a dot product gives cosine similarity."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+class SemanticCache:
+    """
+    In-process cache of answers keyed by question embedding.
+
+    A lookup returns the answer of the most similar cached question if its
+    cosine similarity reaches the threshold. Entries are scoped to an index
+    version: when the version changes (new documents were ingested) the cache
+    is emptied so answers built on stale context are never served. The oldest
+    entries are evicted once max_entries is reached.
+    """
+
+    def __init__(self, threshold=0.98, max_entries=256):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # [unit embedding, question, answer], least recently used first
+        self._entries = []
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def lookup(self, embedding, version):
+        """Return the cached answer for a near-duplicate question, or None on a miss."""
+        query = normalize(embedding)
+        with self._lock:
+            self._check_version(version)
+
+            best_index, best_score = None, self.threshold
+            for index, (cached, _, _) in enumerate(self._entries):
+                score = sum(map(mul, query, cached))
+                if score >= best_score:
+                    best_index, best_score = index, score
+
+            if best_index is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entry = self._entries.pop(best_index)
+            self._entries.append(entry)
+            return entry[2]
+
+    def store(self, embedding, question, answer, version):
+        """Cache answer for question under the given index version."""
+        with self._lock:
+            self._check_version(version)
+            self._entries.append([normalize(embedding), question, answer])
+            if len(self._entries) > self.max_entries:
+                del self._entries[:len(self._entries) - self.max_entries]
+
+    def clear(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "index_version": self._version,
+            }
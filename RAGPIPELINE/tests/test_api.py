@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+supabase = pytest.importorskip("supabase")
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(supabase, "create_client", lambda url, key: None)
+    from retrieval import api
+
+    return api
+
+
+@pytest.fixture
+def calls(api, monkeypatch):
+    calls = []
+
+    def fake_stream_answer(query, timings, use_cache, multi_query):
+        calls.append({"use_cache": use_cache, "multi_query": multi_query})
+        yield "answer"
+
+    monkeypatch.setattr(api, "stream_answer", fake_stream_answer)
+    return calls
+
+
+def stream(api, **params):
+    response = TestClient(api.app).get(
+        "/answer/stream", params={"query": "low sodium diet", **params}
+    )
+    assert response.status_code == 200
+    return response.text
+
+
+def test_stream_skips_the_cache_unless_it_is_enabled(api, calls, monkeypatch):
+    monkeypatch.setattr(api, "CACHE_ENABLED", False)
+    monkeypatch.setattr(api, "MULTI_QUERY_ENABLED", False)
+
+    assert 'data: {"token": "answer"}' in stream(api)
+    assert calls == [{"use_cache": False, "multi_query": False}]
+
+
+def test_stream_defaults_follow_the_settings(api, calls, monkeypatch):
+    monkeypatch.setattr(api, "CACHE_ENABLED", True)
+    monkeypatch.setattr(api, "MULTI_QUERY_ENABLED", True)
+
+    stream(api)
+    assert calls == [{"use_cache": True, "multi_query": True}]
+
+
+def test_stream_query_parameters_override_the_settings(api, calls, monkeypatch):
+    monkeypatch.setattr(api, "CACHE_ENABLED", False)
+    monkeypatch.setattr(api, "MULTI_QUERY_ENABLED", True)
+
+    stream(api, use_cache="true", multi_query="false")
+    assert calls == [{"use_cache": True, "multi_query": False}]